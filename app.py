@@ -1,44 +1,28 @@
 import html
-import hashlib
 import json
-import os
-import re
-import shutil
 import sqlite3
-import ssl
+import sys
 from pathlib import Path
-import time
-import urllib.error
-import urllib.parse
-import urllib.request
+from dataclasses import dataclass
 
 from dotenv import load_dotenv
 load_dotenv()
-try:
-    import certifi
-except Exception:
-    certifi = None
 
 import pandas as pd
-import requests
 import streamlit as st
-from openai import OpenAI
 # -----------------------------
 # Config / Paths
 # -----------------------------
 ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "src"))
+from dailypaper import jobs
+from dailypaper.db import data_version, dates_version, search_papers, similar_papers
+from dailypaper.migrations import migrate
+from dailypaper.pdfcache import favorite_pdf_path
+
 DB_PATH = ROOT / "data" / "db" / "dailypaper.sqlite3"
-FAVORITES_ROOT = ROOT.parent / "DailyPaperFavorite"
-ZOTERO_API_KEY = os.environ.get("ZOTERO_API_KEY", "").strip()
-ZOTERO_USER_ID = os.environ.get("ZOTERO_USER_ID", "").strip()
-ZOTERO_COLLECTION = os.environ.get("ZOTERO_COLLECTION", "").strip()
-SSL_CONTEXT = ssl.create_default_context(cafile=certifi.where()) if certifi else ssl.create_default_context()
 APP_LABEL_CONFIDENCE_THRESHOLD = 0.60
-
-class ZoteroSyncError(RuntimeError):
-    def __init__(self, message: str, logs: list[str] | None = None):
-        super().__init__(message)
-        self.logs = logs or []
+JOB_WORKERS = 4
 
 st.set_page_config(
     page_title="Daily Papers",
@@ -111,6 +95,11 @@ span.badge--nolink { color: var(--muted); cursor: default; }
   margin-top: -20px !important;
   margin-bottom: 2px !important;
 }
+/* 자세히 토글도 카드에 가깝게 */
+[class*="st-key-more_"] {
+  margin-top: -20px !important;
+  margin-bottom: 2px !important;
+}
 [data-testid="stExpander"] summary,
 [data-testid="stExpander"] summary p,
 [data-testid="stExpander"] summary span {
@@ -206,71 +195,39 @@ span.badge--nolink { color: var(--muted); cursor: default; }
 # -----------------------------
 # DB helpers
 # -----------------------------
+@st.cache_resource
+def ensure_schema() -> int:
+    # 프로세스당 한 번만: 스키마 마이그레이션 (CLI와 같은 migrations 사용)
+    con = sqlite3.connect(str(DB_PATH), timeout=30)
+    try:
+        return migrate(con)
+    finally:
+        con.close()
+
 def connect():
     if not DB_PATH.exists():
         st.error(f"DB not found: {DB_PATH}\n먼저 run-yesterday를 돌려서 data/db/dailypaper.sqlite3를 만들어줘.")
         st.stop()
-    con = sqlite3.connect(str(DB_PATH))
-    # migration: submitted_by, organization
-    cur = con.cursor()
-    cur.execute("PRAGMA table_info(papers)")
-    cols = {r[1] for r in cur.fetchall()}
-    if "submitted_by" not in cols:
-        cur.execute("ALTER TABLE papers ADD COLUMN submitted_by TEXT DEFAULT ''")
-    if "organization" not in cols:
-        cur.execute("ALTER TABLE papers ADD COLUMN organization TEXT DEFAULT ''")
-    if "published_at" not in cols:
-        cur.execute("ALTER TABLE papers ADD COLUMN published_at TEXT DEFAULT ''")
-    con.commit()
-    return con
-@st.cache_data(ttl=60*60*24)
-def translate_keywords_to_en(kws: list[str]) -> list[str]:
-    # 한글이 없으면 그대로 반환
-    joined = " | ".join(kws)
-    if not any("가" <= ch <= "힣" for ch in joined):
-        return kws
-
-    api_key = os.environ.get("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        return kws  # 키 없으면 그냥 원본
-
-    client = OpenAI(api_key=api_key)
-
-    prompt = f"""
-Translate the following keyword phrases into natural, concise English keywords.
-Rules:
-- Output ONLY a JSON array of strings.
-- Keep each item short (1~4 words).
-- Use lowercase.
-- Preserve technical terms (e.g., egocentric, slam, state-space).
-Input: {kws}
-"""
-
-    try:
-        r = client.chat.completions.create(
-            model=os.environ.get("OPENAI_MODEL", "gpt-5.2"),
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0,
-            response_format={"type": "json_object"}  # 혹시 안 먹으면 지워도 됨
-        )
-        txt = r.choices[0].message.content.strip()
-
-        # response_format이 json_object라 dict로 올 수 있어 방어
-        import json
-        obj = json.loads(txt)
-        if isinstance(obj, list):
-            return obj
-        if isinstance(obj, dict):
-            # {"keywords":[...]} 형태로 올 수도 있어서 방어
-            for v in obj.values():
-                if isinstance(v, list):
-                    return v
-    except Exception:
-        pass
+    ensure_schema()
+    # 페이지 렌더링은 읽기 전용 연결만 사용 (write lock / 스키마 확인 없음)
+    return sqlite3.connect(f"{DB_PATH.as_uri()}?mode=ro", uri=True)
+
+@st.cache_resource
+def job_runner() -> jobs.JobRunner:
+    # 프로세스당 한 번: Zotero 동기화 / PDF 저장을 백그라운드 thread에서 실행 (큐는 data/db/jobs.sqlite3)
+    return jobs.JobRunner(jobs.default_handlers(), workers=JOB_WORKERS)
+
+@st.fragment(run_every="2s")
+def watch_jobs():
+    # 마지막 전체 실행 이후 작업 상태가 바뀌었으면 카드 상태 표시를 갱신하려고 전체 rerun
+    if st.session_state.get("jobs_version") != jobs.version():
+        st.rerun()
+    n = jobs.counts()
+    if n.get(jobs.QUEUED) or n.get(jobs.RUNNING):
+        st.caption(f"작업: 대기 {n.get(jobs.QUEUED, 0)} · 실행 중 {n.get(jobs.RUNNING, 0)}")
 
-    return kws
-@st.cache_data(ttl=60)
-def get_dates(limit=60):
+@st.cache_data(max_entries=4)
+def get_dates(version: tuple, limit=60):
     with connect() as con:
         df = pd.read_sql_query(
             "SELECT DISTINCT date FROM papers ORDER BY date DESC LIMIT ?",
@@ -279,8 +236,35 @@ def get_dates(limit=60):
         )
     return df["date"].tolist()
 
-@st.cache_data(ttl=60)
-def load_rows(date: str):
+def current_dates_version() -> tuple:
+    # 파이프라인이 쓰는 meta 테이블 버전 (바뀌었을 때만 다시 읽음)
+    with connect() as con:
+        return dates_version(con)
+
+def current_data_version(date: str) -> int:
+    with connect() as con:
+        return data_version(date, con)
+
+@dataclass(slots=True, frozen=True)
+class CardRow:
+    date: str
+    pid: str
+    title: str
+    url: str
+    submitted_by: str
+    organization: str
+    published_at: str
+    labels: tuple
+    card: dict
+    raw_summary: str
+
+    def as_dict(self) -> dict:
+        # 얕은 복사 (Zotero/즐겨찾기 helper는 dict를 받음)
+        return {name: getattr(self, name) for name in self.__slots__}
+
+@st.cache_resource(max_entries=32)
+def load_cards(date: str, version: int) -> list[CardRow]:
+    # 날짜+버전당 한 번만 JSON 파싱/라벨 필터링. cache_resource라 rerun마다 복사(unpickle)도 없음
     q = """
     SELECT
       p.date, p.pid, p.title, p.summary, p.url,
@@ -296,8 +280,22 @@ def load_rows(date: str):
     ORDER BY p.title ASC
     """
     with connect() as con:
-        df = pd.read_sql_query(q, con, params=(date,))
-    return df
+        rows = con.execute(q, (date,)).fetchall()
+    return [build_card(*r) for r in rows]
+
+def search_rank(date: str, q: str) -> dict:
+    # FTS5(BM25) 검색 결과: pid -> 순위
+    with connect() as con:
+        rows = search_papers(q, limit=10000, start=date, end=date, con=con)
+    return {pid: i for i, (_, pid, _, _, _) in enumerate(rows)}
+
+def related_papers(date: str, pid: str, k: int = 5) -> list:
+    # 임베딩은 파이프라인에서 미리 계산됨. 렌더링 중에는 네트워크 호출 없이 저장된 벡터만 사용
+    try:
+        with connect() as con:
+            return similar_papers(date, pid, k=k, con=con, embed_query=False)
+    except Exception:
+        return []
 
 def safe_json(s, default):
     try:
@@ -311,383 +309,38 @@ def _is_confident_score(value, threshold: float) -> bool:
     except Exception:
         return False
 
-INVALID_FILENAME_RE = re.compile(r'[<>:"/\\|?*\x00-\x1F]')
-
-def sanitize_filename(name: str, fallback: str = "paper") -> str:
-    cleaned = INVALID_FILENAME_RE.sub("_", (name or "").strip())
-    cleaned = re.sub(r"\s+", " ", cleaned).rstrip(" .")
-    if not cleaned:
-        cleaned = INVALID_FILENAME_RE.sub("_", fallback).strip() or "paper"
-    return cleaned[:180]
-
-def to_pdf_url(pid: str, url: str) -> str:
-    raw = (url or "").strip()
-    if not raw and pid:
-        return f"https://arxiv.org/pdf/{pid}.pdf"
-    if not raw:
-        return ""
-    if not raw.startswith(("http://", "https://")):
-        raw = "https://" + raw
-
-    if "arxiv.org/abs/" in raw:
-        aid = raw.split("arxiv.org/abs/", 1)[1]
-        aid = aid.split("?", 1)[0].split("#", 1)[0].strip("/")
-        return f"https://arxiv.org/pdf/{aid}.pdf"
-
-    if "arxiv.org/pdf/" in raw:
-        base = raw.split("?", 1)[0].split("#", 1)[0]
-        return base if base.endswith(".pdf") else f"{base}.pdf"
-
-    return raw
-
-def favorite_pdf_path(card: dict, fallback_date: str) -> Path:
-    paper_date = str(card.get("date") or fallback_date)
-    pid = str(card.get("pid") or "").strip()
-    title = str(card.get("title") or "").strip()
-    stem = sanitize_filename(title or pid, fallback=(pid or "paper"))
-    return FAVORITES_ROOT / paper_date / f"{stem}.pdf"
-
-def save_favorite_pdf(card: dict, fallback_date: str):
-    target = favorite_pdf_path(card, fallback_date)
-    if target.exists():
-        return
-
-    pid = str(card.get("pid") or "").strip()
-    url = str(card.get("url") or "").strip()
-    pdf_url = to_pdf_url(pid, url)
-    if not pdf_url:
-        return
-
-    target.parent.mkdir(parents=True, exist_ok=True)
-    req = urllib.request.Request(pdf_url, headers={"User-Agent": "DailyPaper/1.0"})
-    with urllib.request.urlopen(req, timeout=90, context=SSL_CONTEXT) as resp, open(target, "wb") as f:
-        shutil.copyfileobj(resp, f)
-
-ZOTERO_FAVORITE_COLLECTION = "DailyPaperFavorite"
-
-def _zotero_fetch_collections(parent_key: str | None = None) -> list:
-    """Fetch collections (top-level if parent_key is None, else subcollections)."""
-    if not (ZOTERO_API_KEY and ZOTERO_USER_ID):
-        return []
-    if parent_key:
-        path = f"/collections/{parent_key}/collections?limit=100"
-    else:
-        path = "/collections?limit=100"
-    req = urllib.request.Request(
-        f"https://api.zotero.org/users/{ZOTERO_USER_ID}{path}",
-        headers={
-            "Zotero-API-Key": ZOTERO_API_KEY,
-            "Zotero-API-Version": "3",
-        },
-    )
-    with urllib.request.urlopen(req, timeout=30, context=SSL_CONTEXT) as resp:
-        return json.loads(resp.read().decode("utf-8"))
-
-def zotero_collection_key_by_name(name: str, parent_key: str | None = None) -> str:
-    collection_name = (name or "").strip()
-    if not collection_name:
-        return ""
-    rows = _zotero_fetch_collections(parent_key)
-    for row in rows:
-        data = row.get("data", {}) if isinstance(row, dict) else {}
-        if str(data.get("name") or "").strip() == collection_name:
-            return str(data.get("key") or "").strip()
-    return ""
-
-def zotero_get_or_create_collection(name: str, parent_key: str | None, logs: list[str]) -> str:
-    """Get existing collection key or create it. parent_key=None means top-level."""
-    name = (name or "").strip()
-    if not name:
-        return ""
-    key = zotero_collection_key_by_name(name, parent_key)
-    if key:
-        logs.append(f"collection:found name={name} key={key}")
-        return key
-    payload = {"name": name, "parentCollection": parent_key if parent_key else False}
-    logs.append(f"collection:create name={name} parent={parent_key or 'root'}")
-    res = _zotero_post_json("/collections", [payload], timeout=30)
-    key = _zotero_created_key(res)
-    if key:
-        logs.append(f"collection:created key={key}")
-    return key
-
-def _zotero_api_headers(extra: dict | None = None) -> dict:
-    headers = {
-        "Zotero-API-Key": ZOTERO_API_KEY,
-        "Zotero-API-Version": "3",
-    }
-    if extra:
-        headers.update(extra)
-    return headers
-
-def _zotero_post_json(path: str, payload, timeout: int = 30):
-    req = urllib.request.Request(
-        f"https://api.zotero.org/users/{ZOTERO_USER_ID}{path}",
-        data=json.dumps(payload).encode("utf-8"),
-        headers=_zotero_api_headers({"Content-Type": "application/json"}),
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=timeout, context=SSL_CONTEXT) as resp:
-            body = resp.read().decode("utf-8", errors="ignore")
-            return json.loads(body) if body.strip() else {}
-    except urllib.error.HTTPError as e:
-        detail = e.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(detail or f"Zotero HTTP {e.code}") from e
-
-def _zotero_delete_item(item_key: str, timeout: int = 20):
-    if not item_key:
-        return
-    req = urllib.request.Request(
-        f"https://api.zotero.org/users/{ZOTERO_USER_ID}/items/{item_key}",
-        headers=_zotero_api_headers(),
-        method="DELETE",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=timeout, context=SSL_CONTEXT) as resp:
-            _ = resp.read()
-    except urllib.error.HTTPError as e:
-        detail = e.read().decode("utf-8", errors="ignore")
-        raise RuntimeError(detail or f"Zotero delete HTTP {e.code}") from e
-
-def _zotero_created_key(write_result: dict) -> str:
-    successful = write_result.get("successful", {}) if isinstance(write_result, dict) else {}
-    row = successful.get("0")
-    if isinstance(row, str):
-        return row
-    if isinstance(row, dict):
-        data = row.get("data", {}) if isinstance(row.get("data"), dict) else {}
-        return str(row.get("key") or data.get("key") or "").strip()
-    return ""
-
-def _download_pdf_bytes(pdf_url: str) -> bytes:
-    req = urllib.request.Request(pdf_url, headers={"User-Agent": "DailyPaper/1.0"})
-    with urllib.request.urlopen(req, timeout=90, context=SSL_CONTEXT) as resp:
-        return resp.read()
-
-def _zotero_upload_attachment_bytes(attachment_key: str, filename: str, pdf_bytes: bytes, logs: list[str] | None = None):
-    logs = logs if logs is not None else []
-    if not attachment_key:
-        raise RuntimeError("Missing Zotero attachment key")
-    if not pdf_bytes:
-        raise RuntimeError("Empty PDF bytes")
-
-    md5_hex = hashlib.md5(pdf_bytes).hexdigest()
-    verify_path = certifi.where() if certifi else True
-    logs.append(f"upload_auth:start attachment={attachment_key} bytes={len(pdf_bytes)}")
-    try:
-        r = requests.post(
-            f"https://api.zotero.org/users/{ZOTERO_USER_ID}/items/{attachment_key}/file",
-            headers=_zotero_api_headers({"If-None-Match": "*"}),
-            data={
-                "md5": md5_hex,
-                "filename": filename,
-                "filesize": str(len(pdf_bytes)),
-                "mtime": str(int(time.time() * 1000)),
-            },
-            timeout=30,
-            verify=verify_path,
-        )
-        r.raise_for_status()
-        auth = r.json() if r.text.strip() else {}
-        logs.append(f"upload_auth:ok exists={bool(auth.get('exists'))}")
-    except requests.RequestException as e:
-        detail = ""
-        if getattr(e, "response", None) is not None:
-            detail = e.response.text
-        raise RuntimeError(detail or f"Zotero upload auth failed: {e}") from e
-
-    if auth.get("exists"):
-        logs.append("upload_auth:exists (already uploaded)")
-        return
-
-    upload_url = str(auth.get("url") or "").strip()
-    upload_key = str(auth.get("uploadKey") or "").strip()
-    if not upload_url or not upload_key:
-        raise RuntimeError(f"Invalid Zotero upload auth response: {auth}")
-
-    prefix = auth.get("prefix", "")
-    suffix = auth.get("suffix", "")
-    content_type = str(auth.get("contentType") or "application/octet-stream")
-    upload_body = (
-        (prefix.encode("utf-8") if isinstance(prefix, str) else bytes(prefix))
-        + pdf_bytes
-        + (suffix.encode("utf-8") if isinstance(suffix, str) else bytes(suffix))
+def build_card(date, pid, title, summary, url, submitted_by, organization, published_at, labels_json, card_json) -> CardRow:
+    labels = safe_json(labels_json, [])
+    if not isinstance(labels, list) or len(labels) == 0:
+        labels = ["Unlabeled"]
+    card = safe_json(card_json, {})
+    if isinstance(card, dict):
+        conf = card.get("label_confidence", {})
+        if isinstance(conf, dict) and conf:
+            filtered_labels = []
+            for lb in labels:
+                try:
+                    score = float(conf.get(lb, 0))
+                except Exception:
+                    score = 0.0
+                if score >= APP_LABEL_CONFIDENCE_THRESHOLD:
+                    filtered_labels.append(lb)
+            if filtered_labels:
+                labels = filtered_labels
+            else:
+                labels = ["Unlabeled"]
+    return CardRow(
+        date=date,
+        pid=pid,
+        title=title or "",
+        url=url or "",
+        submitted_by=submitted_by or "",
+        organization=organization or "",
+        published_at=published_at or "",
+        labels=tuple(labels),
+        card=card if isinstance(card, dict) else {},
+        raw_summary=summary or "",
     )
-    logs.append("upload_binary:start")
-    try:
-        r = requests.post(
-            upload_url,
-            headers={"Content-Type": content_type},
-            data=upload_body,
-            timeout=120,
-            verify=verify_path,
-        )
-        r.raise_for_status()
-        logs.append(f"upload_binary:ok status={r.status_code}")
-    except requests.RequestException as e:
-        detail = ""
-        if getattr(e, "response", None) is not None:
-            detail = e.response.text
-        raise RuntimeError(detail or f"Zotero file upload failed: {e}") from e
-
-    logs.append("upload_register:start")
-    try:
-        r = requests.post(
-            f"https://api.zotero.org/users/{ZOTERO_USER_ID}/items/{attachment_key}/file",
-            headers=_zotero_api_headers({"If-None-Match": "*"}),
-            data={"upload": upload_key},
-            timeout=30,
-            verify=verify_path,
-        )
-        r.raise_for_status()
-        logs.append(f"upload_register:ok status={r.status_code}")
-    except requests.RequestException as e:
-        detail = ""
-        if getattr(e, "response", None) is not None:
-            detail = e.response.text
-        raise RuntimeError(detail or f"Zotero file register failed: {e}") from e
-
-def add_to_zotero(card: dict, fallback_date: str):
-    if not (ZOTERO_API_KEY and ZOTERO_USER_ID):
-        raise RuntimeError("Zotero env is not configured")
-
-    logs: list[str] = []
-    parent_key = ""
-    attachment_key = ""
-    pid = str(card.get("pid") or "").strip()
-    title = str(card.get("title") or "").strip() or (pid or "Untitled")
-    raw_url = str(card.get("url") or "").strip()
-    pdf_url = to_pdf_url(pid, raw_url)
-    abs_url = raw_url.strip()
-    if not abs_url and pid:
-        abs_url = f"https://arxiv.org/abs/{pid}"
-    if abs_url and not abs_url.startswith(("http://", "https://")):
-        abs_url = "https://" + abs_url
-    doi = f"10.48550/arXiv.{pid}" if pid else ""
-    analyzed = card.get("card") if isinstance(card.get("card"), dict) else {}
-    one_liner = str(analyzed.get("one_liner") or "").strip()
-    raw_summary = str(card.get("raw_summary") or "").strip()
-    abstract_note = "\n\n".join(s for s in [one_liner, raw_summary] if s)[:20000]
-    tags = [{"tag": str(lb)} for lb in (card.get("labels") or []) if str(lb).strip()]
-
-    item = {
-        "itemType": "preprint",
-        "title": title,
-        "abstractNote": abstract_note,
-        "repository": "arXiv" if pid else "",
-        "archiveID": f"arXiv:{pid}" if pid else "",
-        "date": str(card.get("published_at") or card.get("date") or fallback_date or ""),
-        "DOI": doi,
-        "url": abs_url,
-        "accessDate": "CURRENT_TIMESTAMP",
-        "libraryCatalog": "arXiv.org" if pid else "",
-        "language": "en",
-        "extra": f"arXiv: {pid}" if pid else "",
-        "tags": tags,
-    }
-
-    # 내 라이브러리/DailyPaperFavorite/날짜 구조로 저장
-    paper_date = str(card.get("date") or fallback_date or "").strip()
-    if paper_date:
-        logs.append("collection:DailyPaperFavorite/date structure")
-        parent_coll = zotero_get_or_create_collection(ZOTERO_FAVORITE_COLLECTION, None, logs)
-        if parent_coll:
-            date_coll = zotero_get_or_create_collection(paper_date, parent_coll, logs)
-            if date_coll:
-                item["collections"] = [date_coll]
-                logs.append(f"collection:assigned date_key={date_coll}")
-
-    try:
-        logs.append("parent_create:start")
-        parent_res = _zotero_post_json("/items", [item], timeout=30)
-        parent_key = _zotero_created_key(parent_res)
-        if not parent_key:
-            raise RuntimeError(f"Failed to create Zotero item: {parent_res}")
-        logs.append(f"parent_create:ok key={parent_key}")
-
-        if not pdf_url:
-            logs.append("pdf_url:missing (metadata-only item)")
-            return {"parent": parent_res, "attachment": None, "logs": logs}
-
-        logs.append(f"pdf_download:start url={pdf_url}")
-        pdf_bytes = _download_pdf_bytes(pdf_url)
-        logs.append(f"pdf_download:ok bytes={len(pdf_bytes)}")
-        filename = sanitize_filename(title or pid, fallback=(pid or "paper")) + ".pdf"
-        attachment = {
-            "itemType": "attachment",
-            "linkMode": "imported_file",
-            "title": "PDF",
-            "parentItem": parent_key,
-            "accessDate": "CURRENT_TIMESTAMP",
-            "contentType": "application/pdf",
-            "filename": filename,
-        }
-        logs.append("attachment_create:start")
-        attach_res = _zotero_post_json("/items", [attachment], timeout=30)
-        attachment_key = _zotero_created_key(attach_res)
-        if not attachment_key:
-            raise RuntimeError(f"Failed to create Zotero attachment item: {attach_res}")
-        logs.append(f"attachment_create:ok key={attachment_key}")
-
-        _zotero_upload_attachment_bytes(attachment_key, filename, pdf_bytes, logs=logs)
-        logs.append("zotero_sync:done")
-        return {"parent": parent_res, "attachment": attach_res, "logs": logs}
-    except Exception as e:
-        rollback_errors = []
-        if attachment_key:
-            try:
-                _zotero_delete_item(attachment_key)
-                logs.append(f"rollback:deleted attachment={attachment_key}")
-            except Exception as de:
-                rollback_errors.append(f"attachment={attachment_key}: {de}")
-        if parent_key:
-            try:
-                _zotero_delete_item(parent_key)
-                logs.append(f"rollback:deleted parent={parent_key}")
-            except Exception as de:
-                rollback_errors.append(f"parent={parent_key}: {de}")
-        if rollback_errors:
-            logs.append("rollback:failed " + " | ".join(rollback_errors))
-        raise ZoteroSyncError(str(e), logs=logs) from e
-
-def explode_cards(df: pd.DataFrame):
-    cards = []
-    for _, r in df.iterrows():
-        labels = safe_json(r["labels_json"], [])
-        if not isinstance(labels, list) or len(labels) == 0:
-            labels = ["Unlabeled"]
-        card = safe_json(r["card_json"], {})
-        if isinstance(card, dict):
-            conf = card.get("label_confidence", {})
-            if isinstance(conf, dict) and conf:
-                filtered_labels = []
-                for lb in labels:
-                    try:
-                        score = float(conf.get(lb, 0))
-                    except Exception:
-                        score = 0.0
-                    if score >= APP_LABEL_CONFIDENCE_THRESHOLD:
-                        filtered_labels.append(lb)
-                if filtered_labels:
-                    labels = filtered_labels
-                else:
-                    labels = ["Unlabeled"]
-        cards.append(
-            {
-                "date": r["date"],
-                "pid": r["pid"],
-                "title": r["title"] or "",
-                "url": r["url"] or "",
-                "submitted_by": r.get("submitted_by") or "",
-                "organization": r.get("organization") or "",
-                "published_at": r.get("published_at") or "",
-                "labels": labels,
-                "card": card if isinstance(card, dict) else {},
-                "raw_summary": r["summary"] or "",
-            }
-        )
-    return cards
 
 def label_color(label: str):
     # 색은 CSS에서 직접 안 박고, 뱃지 스타일 통일 (너무 알록달록하면 구려짐)
@@ -713,21 +366,24 @@ st.markdown(
 # -----------------------------
 with st.sidebar:
     st.markdown("### 설정")
-    dates = get_dates()
+    dates = get_dates(current_dates_version())
     if not dates:
         st.warning("저장된 날짜가 없어. 먼저 `run-yesterday`를 돌려줘.")
         st.stop()
 
     date = st.selectbox("날짜", dates, index=0)
-    df = load_rows(date)
-    cards = explode_cards(df)
+    cards = load_cards(date, current_data_version(date))
 
-    all_labels = sorted({lb for c in cards for lb in c["labels"]})
+    all_labels = sorted({lb for c in cards for lb in c.labels})
     label = st.selectbox("라벨", ["(전체)"] + all_labels, index=0)
 
-    q = st.text_input("검색", placeholder="제목/키워드/요약 내용 검색")
+    q = st.text_input("검색", placeholder="제목/키워드/요약/방법 검색")
     only_done = st.toggle("분석 완료만 보기", value=True)
 
+    job_runner()
+    st.session_state["jobs_version"] = jobs.version()
+    watch_jobs()
+
 # rerun 직후 토스트 표시 (st.rerun 전에 st.toast 호출하면 사라지므로, 세션에 저장 후 다음 로드에서 표시)
 if "toast_msg" in st.session_state:
     msg = st.session_state.pop("toast_msg")
@@ -736,21 +392,21 @@ if "toast_msg" in st.session_state:
 # -----------------------------
 # Filter
 # -----------------------------
+rank = search_rank(date, q) if q.strip() else None
+
 def matches(c):
-    if only_done and not c["card"]:
+    if only_done and not c.card:
         return False
-    if label != "(전체)" and label not in c["labels"]:
+    if label != "(전체)" and label not in c.labels:
+        return False
+    if rank is not None and c.pid not in rank:
         return False
-    if q:
-        qq = q.lower().strip()
-        title = c["title"].lower()
-        kws = " ".join(c["card"].get("keywords", [])).lower() if c["card"] else ""
-        raw = (c["raw_summary"] or "").lower()
-        if qq not in title and qq not in kws and qq not in raw:
-            return False
     return True
 
 cards_f = [c for c in cards if matches(c)]
+if rank is not None:
+    # 검색 중이면 관련도 순
+    cards_f.sort(key=lambda c: rank[c.pid])
 
 # -----------------------------
 # Top summary row
@@ -774,24 +430,23 @@ else:
     ordered_labels = [label]
 
 @st.fragment
-def render_card(c, render_key: str):
-    card = c["card"]
-    pid = c["pid"]
-    title = c["title"]
-    url = (c.get("url") or "").strip()
+def render_card(c: CardRow, render_key: str):
+    card = c.card
+    pid = c.pid
+    title = c.title
+    url = c.url.strip()
     if not url and pid:
         url = f"https://arxiv.org/abs/{pid}"
     if url and not url.startswith(("http://", "https://")):
         url = "https://" + url
-    labels = c["labels"]
+    labels = c.labels
 
     one = card.get("one_liner", "") if card else ""
     kws = card.get("keywords", []) if card else []
-    kws = translate_keywords_to_en(kws) if kws else kws
 
     labels_txt = " · ".join(labels)
-    published_at = (c.get("published_at") or "").strip()
-    organization = (c.get("organization") or "").strip()
+    published_at = c.published_at.strip()
+    organization = c.organization.strip()
     segs = [labels_txt]
     if published_at:
         segs.append(published_at)
@@ -823,86 +478,157 @@ def render_card(c, render_key: str):
         unsafe_allow_html=True,
     )
 
+    job_key = jobs.job_key(c.date or date, pid)
+    job_state = jobs.for_key(job_key)
+    fav_status, fav_err = job_state.get("favorite", ("", ""))
+    zot_status, zot_err = job_state.get("zotero", ("", ""))
+    busy = (jobs.QUEUED, jobs.RUNNING)
+
     _, heart_col, zotero_col = st.columns([0.90, 0.05, 0.05], vertical_alignment="center")
     with heart_col:
-        is_saved = favorite_pdf_path(c, date).exists()
-        heart_icon = "❤️" if is_saved else "♡"
+        is_saved = favorite_pdf_path(c.as_dict(), date).exists()
+        if fav_status in busy:
+            heart_icon, heart_help = "⏳", f"PDF 저장 {fav_status}"
+        elif fav_status == jobs.FAILED and not is_saved:
+            heart_icon, heart_help = "⚠️", f"PDF 저장 실패: {fav_err}"
+        else:
+            heart_icon, heart_help = ("❤️" if is_saved else "♡"), "Save PDF"
         clicked = st.button(
             heart_icon,
             key=f"fav_{render_key}_{pid}",
             type="tertiary",
             width="content",
-            help="Save PDF",
+            help=heart_help,
+            disabled=fav_status in busy,
         )
     with zotero_col:
+        if zot_status in busy:
+            zot_icon, zot_help = "⏳", f"Zotero {zot_status}"
+        elif zot_status == jobs.DONE:
+            zot_icon, zot_help = "✅", "Zotero에 저장됨"
+        elif zot_status == jobs.FAILED:
+            zot_icon, zot_help = "⚠️", f"Zotero 실패: {zot_err} (다시 누르면 재시도)"
+        else:
+            zot_icon, zot_help = "Z", "Add to Zotero"
         zotero_clicked = st.button(
-            "Z",
+            zot_icon,
             key=f"zot_{render_key}_{pid}",
             type="tertiary",
             width="content",
-            help="Add to Zotero",
+            help=zot_help,
+            disabled=zot_status in busy or zot_status == jobs.DONE,
         )
-    if clicked:
-        try:
-            save_favorite_pdf(c, date)
-            st.session_state["toast_msg"] = "저장됨"
-        except Exception:
-            pass
+    # 버튼은 큐에 넣기만 하고 바로 돌아온다 (실제 작업은 job_runner thread에서)
+    if clicked and not is_saved:
+        jobs.enqueue("favorite", job_key, {"card": c.as_dict(), "date": date}, redo_done=True)
+        st.session_state["toast_msg"] = "PDF 저장 대기열에 추가됨"
         st.rerun()
     if zotero_clicked:
-        try:
-            add_to_zotero(c, date)
-            st.session_state["toast_msg"] = "Zotero에 저장됨"
-            st.rerun()
-        except Exception as e:
-            st.toast(f"Zotero 실패: {e}", icon="⚠️", duration=3)
-
-    with st.expander("자세히", expanded=False):
-        if not card:
-            st.info("아직 분석 카드가 없어. `run-yesterday`를 다시 돌리면 채워질 거야.")
-            if c["raw_summary"]:
-                st.markdown("**원본 summary**")
-                st.write(c["raw_summary"])
-            return
-
-        st.markdown("##### 구조화 요약")
-        colA, colB = st.columns(2)
-        with colA:
-            st.markdown("**배경**")
-            st.write(card.get("problem", ""))
-            st.markdown("**기존의 한계**")
-            st.write(card.get("what_is_new", ""))
-        with colB:
-            st.markdown("**방법**")
-            st.write(card.get("method", ""))
-            st.markdown("**근거 및 성능 주장**")
-            st.write(card.get("evidence", ""))
-            st.markdown("**한계 및 적용 범위**")
-            st.write(card.get("limitations", ""))
-
-        # confidence table (있으면)
-        conf = card.get("label_confidence", {})
-        if isinstance(conf, dict) and conf:
-            conf = {
-                k: v for k, v in conf.items()
-                if _is_confident_score(v, APP_LABEL_CONFIDENCE_THRESHOLD)
-            }
-        if isinstance(conf, dict) and conf:
-            st.markdown("**라벨 확신도**")
-            conf_df = pd.DataFrame({"label": list(conf.keys()), "score": list(conf.values())})
-            st.dataframe(conf_df.sort_values("score", ascending=False), width="stretch", hide_index=True)
+        jobs.enqueue("zotero", job_key, {"card": c.as_dict(), "date": date})
+        st.session_state["toast_msg"] = "Zotero 대기열에 추가됨"
+        st.rerun()
+
+    # 자세히: 열었을 때만 상세 위젯을 만든다 (expander는 닫혀 있어도 내용을 전부 렌더링함)
+    if st.toggle("자세히", key=f"more_{render_key}_{pid}"):
+        render_card_details(c)
+
+def render_card_details(c: CardRow):
+    card = c.card
+    pid = c.pid
+    if not card:
+        st.info("아직 분석 카드가 없어. `run-yesterday`를 다시 돌리면 채워질 거야.")
+        if c.raw_summary:
+            st.markdown("**원본 summary**")
+            st.write(c.raw_summary)
+        return
+
+    st.markdown("##### 구조화 요약")
+    colA, colB = st.columns(2)
+    with colA:
+        st.markdown("**배경**")
+        st.write(card.get("problem", ""))
+        st.markdown("**기존의 한계**")
+        st.write(card.get("what_is_new", ""))
+    with colB:
+        st.markdown("**방법**")
+        st.write(card.get("method", ""))
+        st.markdown("**근거 및 성능 주장**")
+        st.write(card.get("evidence", ""))
+        st.markdown("**한계 및 적용 범위**")
+        st.write(card.get("limitations", ""))
+
+    # confidence table (있으면)
+    conf = card.get("label_confidence", {})
+    if isinstance(conf, dict) and conf:
+        conf = {
+            k: v for k, v in conf.items()
+            if _is_confident_score(v, APP_LABEL_CONFIDENCE_THRESHOLD)
+        }
+    if isinstance(conf, dict) and conf:
+        st.markdown("**라벨 확신도**")
+        conf_df = pd.DataFrame({"label": list(conf.keys()), "score": list(conf.values())})
+        st.dataframe(conf_df.sort_values("score", ascending=False), width="stretch", hide_index=True)
+
+    related = related_papers(c.date, pid)
+    if related:
+        st.markdown("**비슷한 논문**")
+        lines = []
+        for r_date, r_pid, r_title, r_url, score in related:
+            r_url = (r_url or "").strip() or f"https://arxiv.org/abs/{r_pid}"
+            lines.append(
+                f'- <a href="{html.escape(r_url, quote=True)}" target="_blank" rel="noopener noreferrer">'
+                f'{html.escape(r_title or r_pid)}</a> <span class="small">{r_date} · {score:.2f}</span>'
+            )
+        st.markdown("\n".join(lines), unsafe_allow_html=True)
 
 # -----------------------------
 # Render sections
 # -----------------------------
+PAGE_SIZE = 12
+
+def render_bulk_zotero(lb: str, section_cards: list[CardRow]):
+    # 섹션 전체를 Zotero로: 작업 하나로 큐에 넣으면 이미 collection에 있는 논문은 건너뛰고 일괄 생성/업로드
+    key = jobs.job_key(date, f"label:{lb}")
+    status, err = jobs.for_key(key).get("zotero_bulk", ("", ""))
+    busy = status in (jobs.QUEUED, jobs.RUNNING)
+    help_txt = {
+        jobs.QUEUED: "대기 중", jobs.RUNNING: "보내는 중", jobs.DONE: "완료 (다시 누르면 새 논문만 추가)",
+        jobs.FAILED: f"실패: {err}",
+    }.get(status, f"{lb} {len(section_cards)}편을 Zotero로")
+    if st.button("⏳ Zotero" if busy else "전부 Zotero로", key=f"zot_bulk_{date}_{lb}", disabled=busy, help=help_txt):
+        jobs.enqueue("zotero_bulk", key, {"cards": [c.as_dict() for c in section_cards], "date": date}, redo_done=True)
+        st.session_state["toast_msg"] = f"{lb} {len(section_cards)}편 Zotero 대기열에 추가됨"
+        st.rerun()
+
+# 멀티라벨 논문은 처음 나오는 섹션에서만 카드로 그리고, 뒤 섹션에는 제목만 표시
+rendered_pids = set()
 for lb in ordered_labels:
-    section_cards = [c for c in cards_f if lb in c["labels"]]
+    section_cards = [c for c in cards_f if lb in c.labels]
     if not section_cards:
         continue
 
-    st.markdown(f"## {lb}  <span class='small'>({len(section_cards)})</span>", unsafe_allow_html=True)
+    head_col, bulk_col = st.columns([0.85, 0.15], vertical_alignment="bottom")
+    head_col.markdown(f"## {lb}  <span class='small'>({len(section_cards)})</span>", unsafe_allow_html=True)
+    with bulk_col:
+        render_bulk_zotero(lb, section_cards)
+
+    own_cards = [c for c in section_cards if c.pid not in rendered_pids]
+    dup_cards = [c for c in section_cards if c.pid in rendered_pids]
+
+    page_key = f"shown_{date}_{lb}"
+    shown = st.session_state.get(page_key, PAGE_SIZE)
+    for c in own_cards[:shown]:
+        render_card(c, lb)
+    rendered_pids.update(c.pid for c in own_cards[:shown])
+
+    if len(own_cards) > shown:
+        rest = len(own_cards) - shown
+        if st.button(f"더 보기 (+{min(PAGE_SIZE, rest)} / 남은 {rest})", key=f"more_page_{date}_{lb}"):
+            st.session_state[page_key] = shown + PAGE_SIZE
+            st.rerun()
 
-    for idx, c in enumerate(section_cards):
-        render_card(c, f"{lb}_{idx}")
+    if dup_cards:
+        titles = " · ".join(html.escape(c.title) for c in dup_cards)
+        st.markdown(f"<div class='small'>위 섹션에도 있는 논문: {titles}</div>", unsafe_allow_html=True)
 
 st.markdown("<div class='footerHint'>© minju · Daily Papers dashboard</div>", unsafe_allow_html=True)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Paper 레코드 micro-benchmark: 합성 10k 논문 payload로 parse + DB load 처리량 비교.
+  - legacy: 모든 곳에서 pydantic BaseModel Paper
+  - current: HF JSON 경계에서만 pydantic(HFPaper), 내부는 slots dataclass Paper
+
+  PYTHONPATH=src python scripts/bench_paper.py [--n 10000] [--repeat 5]
+"""
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from dailypaper import db  # noqa: E402
+from dailypaper.config import PATHS  # noqa: E402
+from dailypaper.parse import parse_hf_raw  # noqa: E402
+
+DATE = "2026-01-01"
+
+class LegacyPaper(BaseModel):
+    pid: str
+    title: str
+    summary: str = ""
+    url: str = ""
+
+def legacy_parse(raw: str):
+    out = []
+    for item in json.loads(raw):
+        pp = item["paper"] if isinstance(item, dict) and isinstance(item.get("paper"), dict) else item
+        pid = str(pp.get("id", "")).strip()
+        title = str(pp.get("title", "")).strip()
+        summary = str(pp.get("summary", "")).strip()
+        url = str(pp.get("url", "")).strip() or f"https://arxiv.org/abs/{pid}"
+        if title:
+            out.append(LegacyPaper(pid=pid or title, title=title, summary=summary, url=url))
+    return out
+
+def legacy_load(rows):
+    return [LegacyPaper(pid=r[0], title=r[1] or "", summary=r[2] or "", url=r[3] or "") for r in rows]
+
+def synthetic_payload(n: int) -> str:
+    return json.dumps([
+        {"paper": {
+            "id": f"2601.{i:05d}",
+            "title": f"Scaling robot foundation model number {i}",
+            "summary": "We study grasping and manipulation with large pretrained policies. " * 8,
+            "upvotes": i % 97,
+        }, "numComments": i % 7}
+        for i in range(n)
+    ])
+
+def best_of(repeat: int, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=10000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    raw = synthetic_payload(args.n)
+    tmp = Path(tempfile.mkdtemp())
+    db.PATHS = type(PATHS)(data=tmp, raw=tmp / "raw", db=tmp / "bench.sqlite3", batches=tmp / "batches", llm_cache=tmp / "c.sqlite3")
+    db.init_db()
+    db.upsert_papers(DATE, parse_hf_raw(raw))
+
+    def rows():
+        with db._connect() as con:
+            return con.execute("SELECT pid, title, summary, url FROM papers WHERE date=?", (DATE,)).fetchall()
+
+    results = {
+        "legacy": (best_of(args.repeat, lambda: legacy_parse(raw)), best_of(args.repeat, lambda: legacy_load(rows()))),
+        "current": (best_of(args.repeat, lambda: parse_hf_raw(raw)), best_of(args.repeat, lambda: db.list_unannotated(DATE))),
+    }
+
+    print(f"papers={args.n} repeat={args.repeat} (best of)")
+    for name, (parse_s, load_s) in results.items():
+        total = parse_s + load_s
+        print(f"{name:8s} parse {parse_s * 1000:8.1f} ms  load {load_s * 1000:8.1f} ms  "
+              f"total {total * 1000:8.1f} ms  {args.n / total:10.0f} papers/s")
+    old, new = (sum(results[k]) for k in ("legacy", "current"))
+    print(f"speedup  {old / new:.2f}x")
+
+if __name__ == "__main__":
+    main()
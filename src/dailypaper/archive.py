@@ -0,0 +1,162 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .config import PATHS
+
+# HF raw 응답 보관소: 월별 segment 파일(YYYY-MM.seg)에 날짜별 gzip member를 이어 붙이고,
+# YYYY-MM.idx(JSON lines, append-only)에 date -> (offset, length)를 기록한다. 같은 날짜는 마지막 기록이 유효.
+
+_LOCK = threading.RLock()
+# month -> (idx 파일 크기, {date: entry})
+_INDEX_CACHE: Dict[Tuple[str, str], Tuple[int, Dict[str, dict]]] = {}
+
+
+def _month(date: str) -> str:
+    return date[:7]
+
+
+def _seg_path(month: str) -> Path:
+    return PATHS.raw / f"{month}.seg"
+
+
+def _idx_path(month: str) -> Path:
+    return PATHS.raw / f"{month}.idx"
+
+
+def _load_index(month: str) -> Dict[str, dict]:
+    path = _idx_path(month)
+    try:
+        size = path.stat().st_size
+    except FileNotFoundError:
+        return {}
+
+    key = (str(PATHS.raw), month)
+    with _LOCK:
+        cached = _INDEX_CACHE.get(key)
+        if cached is not None and cached[0] == size:
+            return cached[1]
+
+        entries: Dict[str, dict] = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    e = json.loads(line)
+                except ValueError:
+                    # 쓰다 만 마지막 줄은 무시
+                    continue
+                entries[e["date"]] = e
+        _INDEX_CACHE[key] = (size, entries)
+        return entries
+
+
+def put_raw(date: str, raw: str) -> bool:
+    """raw를 archive에 추가. 직전 기록과 내용이 같으면 아무것도 쓰지 않고 False."""
+    data = raw.encode("utf-8")
+    digest = hashlib.sha256(data).hexdigest()
+    month = _month(date)
+
+    with _LOCK:
+        prev = _load_index(month).get(date)
+        if prev is not None and prev.get("sha256") == digest:
+            return False
+
+        PATHS.raw.mkdir(parents=True, exist_ok=True)
+        blob = gzip.compress(data, compresslevel=6)
+        with open(_seg_path(month), "ab") as seg:
+            seg.seek(0, os.SEEK_END)
+            offset = seg.tell()
+            seg.write(blob)
+            seg.flush()
+            os.fsync(seg.fileno())
+
+        entry = {
+            "date": date,
+            "offset": offset,
+            "length": len(blob),
+            "size": len(data),
+            "sha256": digest,
+            "stored_at": datetime.utcnow().isoformat(),
+        }
+        # index는 segment가 디스크에 쓰인 뒤에 기록 (중간에 죽어도 index가 깨진 데이터를 가리키지 않음)
+        with open(_idx_path(month), "a", encoding="utf-8") as idx:
+            idx.write(json.dumps(entry) + "\n")
+        return True
+
+
+def _read_blob(date: str) -> Optional[bytes]:
+    month = _month(date)
+    entry = _load_index(month).get(date)
+    if entry is None:
+        return None
+    with open(_seg_path(month), "rb") as seg:
+        seg.seek(entry["offset"])
+        return seg.read(entry["length"])
+
+
+def open_raw(date: str) -> Optional[BinaryIO]:
+    """압축 해제 스트림 (전체를 메모리에 풀지 않고 읽을 수 있음). 없으면 None."""
+    blob = _read_blob(date)
+    if blob is None:
+        return None
+    return gzip.GzipFile(fileobj=io.BytesIO(blob), mode="rb")
+
+
+def get_raw(date: str) -> Optional[str]:
+    blob = _read_blob(date)
+    return gzip.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+def archived_dates(start: str = "", end: str = "") -> List[str]:
+    out = []
+    for idx in sorted(PATHS.raw.glob("*.idx")) if PATHS.raw.exists() else []:
+        month = idx.stem
+        if (start and month < start[:7]) or (end and month > end[:7]):
+            continue
+        out.extend(d for d in _load_index(month) if (not start or d >= start) and (not end or d <= end))
+    return sorted(out)
+
+
+def iter_raw(start: str = "", end: str = "") -> Iterator[Tuple[str, str]]:
+    """(date, raw)를 날짜 순으로 하나씩 (재처리용). 월 segment는 한 번만 연다."""
+    month = None
+    seg = None
+    try:
+        for date in archived_dates(start, end):
+            if _month(date) != month:
+                if seg is not None:
+                    seg.close()
+                month = _month(date)
+                seg = open(_seg_path(month), "rb")
+            entry = _load_index(month)[date]
+            seg.seek(entry["offset"])
+            yield date, gzip.decompress(seg.read(entry["length"])).decode("utf-8")
+    finally:
+        if seg is not None:
+            seg.close()
+
+
+def migrate_legacy(delete: bool = True) -> int:
+    """data/raw/YYYY-MM-DD.json 파일들을 archive로 옮긴다. 옮긴 파일 수 반환."""
+    if not PATHS.raw.exists():
+        return 0
+    moved = 0
+    for path in sorted(PATHS.raw.glob("????-??-??.json")):
+        date = path.stem
+        raw = path.read_text(encoding="utf-8")
+        put_raw(date, raw)
+        if get_raw(date) != raw:
+            raise RuntimeError(f"archive verify failed: {date}")
+        if delete:
+            path.unlink()
+        moved += 1
+    return moved
@@ -0,0 +1,105 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+from openai import AsyncOpenAI
+
+from .config import SETTINGS
+from .openai_agent import BACKOFFS, build_messages, cached_card, parse_card, retry_after_seconds, store_card
+from .parse import Paper
+from .ratelimit import RateLimiter
+
+# 응답 JSON 카드 길이 대략치 (TPM 예약용)
+EST_OUTPUT_TOKENS = 1200
+
+OnDone = Callable[[Paper, Optional[Dict[str, Any]], Optional[Exception]], None]
+
+
+def estimate_tokens(messages: List[Dict[str, str]]) -> int:
+    # 한글 비중이 높아서 보수적으로 2글자=1토큰으로 잡는다
+    chars = sum(len(m["content"]) for m in messages)
+    return chars // 2 + EST_OUTPUT_TOKENS
+
+
+async def analyze_paper_async(client: AsyncOpenAI, paper: Paper, limiter: RateLimiter) -> Dict[str, Any]:
+    messages = build_messages(paper)
+    est = estimate_tokens(messages)
+    last_err = None
+    delay = None
+
+    for sec in BACKOFFS:
+        if delay is not None:
+            limiter.pause(delay)
+        elif sec:
+            await asyncio.sleep(sec)
+
+        await limiter.acquire(est)
+        try:
+            resp = await client.chat.completions.create(
+                model=SETTINGS.model,
+                messages=messages,
+                temperature=0,
+                response_format={"type": "json_object"},
+            )
+        except Exception as e:
+            last_err = e
+            delay = retry_after_seconds(e)
+            continue
+
+        delay = None
+        usage = getattr(resp, "usage", None)
+        if usage is not None and getattr(usage, "total_tokens", None):
+            limiter.settle(est, usage.total_tokens)
+
+        try:
+            card = parse_card(resp.choices[0].message.content)
+        except Exception as e:
+            last_err = e
+            continue
+        store_card(paper, card)
+        return card
+
+    raise RuntimeError(f"OpenAI analyze failed: {last_err}")
+
+
+async def analyze_many_async(
+    papers: List[Paper],
+    on_done: OnDone,
+    concurrency: Optional[int] = None,
+    rpm: Optional[int] = None,
+    tpm: Optional[int] = None,
+):
+    # 캐시 hit은 네트워크/rate limit 없이 바로 처리
+    pending = []
+    for p in papers:
+        card = cached_card(p)
+        if card is not None:
+            on_done(p, card, None)
+        else:
+            pending.append(p)
+    if not pending:
+        return
+
+    if not SETTINGS.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY is missing (.env 확인)")
+
+    limiter = RateLimiter(rpm or SETTINGS.openai_rpm, tpm or SETTINGS.openai_tpm)
+    sem = asyncio.Semaphore(concurrency or SETTINGS.openai_concurrency)
+
+    # 재시도는 여기서 직접 (Retry-After 반영), SDK 자체 재시도는 끈다
+    async with AsyncOpenAI(api_key=SETTINGS.openai_api_key, max_retries=0) as client:
+
+        async def one(p: Paper):
+            async with sem:
+                try:
+                    return p, await analyze_paper_async(client, p, limiter), None
+                except Exception as e:
+                    return p, None, e
+
+        tasks = [asyncio.create_task(one(p)) for p in pending]
+        for fut in asyncio.as_completed(tasks):
+            p, card, err = await fut
+            on_done(p, card, err)
+
+
+def analyze_many(papers: List[Paper], on_done: OnDone, **kwargs):
+    asyncio.run(analyze_many_async(papers, on_done, **kwargs))
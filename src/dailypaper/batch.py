@@ -0,0 +1,103 @@
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from openai import OpenAI
+
+from .config import SETTINGS
+from .openai_agent import build_messages, parse_card
+from .parse import Paper
+
+ENDPOINT = "/v1/chat/completions"
+# OpenAI Batch API 한 파일당 최대 요청 수
+MAX_BATCH_REQUESTS = 50000
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def custom_id(date: str, pid: str) -> str:
+    return f"{date}|{pid}"
+
+
+def split_custom_id(cid: str) -> Tuple[str, str]:
+    date, _, pid = cid.partition("|")
+    return date, pid
+
+
+def build_batch_file(items: List[Tuple[str, Paper]], path: Path) -> int:
+    if len(items) > MAX_BATCH_REQUESTS:
+        raise ValueError(f"too many requests for one batch: {len(items)} > {MAX_BATCH_REQUESTS}")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for date, p in items:
+            line = {
+                "custom_id": custom_id(date, p.pid),
+                "method": "POST",
+                "url": ENDPOINT,
+                "body": {
+                    "model": SETTINGS.model,
+                    "messages": build_messages(p),
+                    "temperature": 0,
+                    "response_format": {"type": "json_object"},
+                },
+            }
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+    return len(items)
+
+
+def submit_batch(client: OpenAI, path: Path) -> str:
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint=ENDPOINT,
+        completion_window="24h",
+        metadata={"source": "dailypaper-backfill", "file": path.name},
+    )
+    return batch.id
+
+
+def wait_batch(client: OpenAI, batch_id: str, poll_sec: float = 30.0):
+    last = None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        progress = ""
+        if counts is not None:
+            progress = f" done={counts.completed}/{counts.total} failed={counts.failed}"
+        line = f"batch={batch_id} status={batch.status}{progress}"
+        if line != last:
+            print(line)
+            last = line
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        time.sleep(poll_sec)
+
+
+def _read_file_lines(client: OpenAI, file_id: Optional[str]) -> Iterator[Dict[str, Any]]:
+    if not file_id:
+        return
+    text = client.files.content(file_id).text
+    for line in text.splitlines():
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_batch_results(client: OpenAI, batch) -> Iterator[Tuple[str, str, Optional[Dict[str, Any]], Optional[str]]]:
+    """(date, pid, card, error) — card가 None이면 error에 이유가 들어있다."""
+    for row in _read_file_lines(client, getattr(batch, "output_file_id", None)):
+        date, pid = split_custom_id(row.get("custom_id", ""))
+        response = row.get("response") or {}
+        if row.get("error") or response.get("status_code") != 200:
+            yield date, pid, None, str(row.get("error") or response.get("body"))
+            continue
+        try:
+            content = response["body"]["choices"][0]["message"]["content"]
+            yield date, pid, parse_card(content), None
+        except Exception as e:
+            yield date, pid, None, str(e)
+
+    for row in _read_file_lines(client, getattr(batch, "error_file_id", None)):
+        date, pid = split_custom_id(row.get("custom_id", ""))
+        yield date, pid, None, str(row.get("error") or (row.get("response") or {}).get("body"))
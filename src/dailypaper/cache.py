@@ -0,0 +1,131 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .config import PATHS, SETTINGS
+from .db import tune_connection
+
+
+def cache_key(model: str, prompt_version: str, title: str, summary: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, prompt_version, title, summary):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    """분석 카드(JSON)를 content hash로 저장하는 SQLite 캐시."""
+
+    def __init__(self, path: Path = PATHS.llm_cache, max_entries: int = 0, max_age_days: int = 0):
+        self.path = path
+        self.max_entries = max_entries or SETTINGS.llm_cache_max_entries
+        self.max_age_days = max_age_days or SETTINGS.llm_cache_max_age_days
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as con:
+            con.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+
+                CREATE TABLE IF NOT EXISTS responses (
+                  key TEXT PRIMARY KEY,
+                  model TEXT,
+                  card_json TEXT NOT NULL,
+                  created_at TEXT NOT NULL,
+                  last_used_at TEXT NOT NULL,
+                  hits INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used_at);
+
+                CREATE TABLE IF NOT EXISTS counters (
+                  name TEXT PRIMARY KEY,
+                  value INTEGER NOT NULL DEFAULT 0
+                );
+                """
+            )
+
+    def _connect(self):
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = tune_connection(sqlite3.connect(str(self.path), timeout=30))
+            self._local.con = con
+        return con
+
+    def _bump(self, con, name: str):
+        con.execute(
+            "INSERT INTO counters(name,value) VALUES(?,1) ON CONFLICT(name) DO UPDATE SET value=value+1",
+            (name,),
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow().isoformat()
+        with self._connect() as con:
+            row = con.execute("SELECT card_json FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None:
+                self._bump(con, "misses")
+                return None
+            con.execute("UPDATE responses SET hits=hits+1, last_used_at=? WHERE key=?", (now, key))
+            self._bump(con, "hits")
+        try:
+            return json.loads(row[0])
+        except Exception:
+            return None
+
+    def put(self, key: str, model: str, card: Dict[str, Any]):
+        now = datetime.utcnow().isoformat()
+        with self._connect() as con:
+            con.execute(
+                """
+                INSERT INTO responses(key,model,card_json,created_at,last_used_at) VALUES(?,?,?,?,?)
+                ON CONFLICT(key) DO UPDATE SET card_json=excluded.card_json, last_used_at=excluded.last_used_at
+                """,
+                (key, model, json.dumps(card, ensure_ascii=False), now, now),
+            )
+
+    def evict(self) -> int:
+        cutoff = (datetime.utcnow() - timedelta(days=self.max_age_days)).isoformat()
+        with self._connect() as con:
+            cur = con.execute("DELETE FROM responses WHERE last_used_at < ?", (cutoff,))
+            removed = cur.rowcount
+            cur = con.execute(
+                """
+                DELETE FROM responses WHERE key IN (
+                  SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            removed += cur.rowcount
+            if removed:
+                con.execute(
+                    "INSERT INTO counters(name,value) VALUES('evictions',?) ON CONFLICT(name) DO UPDATE SET value=value+?",
+                    (removed, removed),
+                )
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._connect() as con:
+            out = {name: value for name, value in con.execute("SELECT name, value FROM counters")}
+            out["entries"] = con.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        for name in ("hits", "misses", "evictions"):
+            out.setdefault(name, 0)
+        return out
+
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache() -> Optional[ResponseCache]:
+    global _CACHE
+    if not SETTINGS.llm_cache:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        return _CACHE
@@ -1,29 +1,119 @@
 import argparse
-from .pipeline import run_for_date, show_for_date, run_yesterday, show_yesterday
+from .pipeline import run_for_date, show_for_date, run_yesterday, show_yesterday, backfill, cache_stats, show_label, search, embed, show_similar, translate_keywords_for_date, fetch_range_cmd, archive_migrate, reparse_cmd, jobs_cmd, zotero_sync_cmd
+
+def _add_run_options(p: argparse.ArgumentParser):
+    p.add_argument("--workers", type=int, default=1, help="동시에 분석할 논문 수 (기본 1 = 순차)")
+    p.add_argument("--batch-size", type=int, default=1, help="요청 하나에 묶어 보낼 논문 수 (기본 1)")
+    p.add_argument("--async", dest="use_async", action="store_true", help="asyncio 엔진 + RPM/TPM rate limit 사용")
+    p.add_argument("--rpm", type=int, default=0, help="async: 분당 요청 수 (기본 OPENAI_RPM)")
+    p.add_argument("--tpm", type=int, default=0, help="async: 분당 토큰 수 (기본 OPENAI_TPM)")
+
+def _run_kwargs(args) -> dict:
+    return {"workers": args.workers, "batch_size": args.batch_size, "use_async": args.use_async, "rpm": args.rpm, "tpm": args.tpm}
 
 def main():
     ap = argparse.ArgumentParser()
     sub = ap.add_subparsers(dest="cmd", required=True)
 
     p1 = sub.add_parser("run-yesterday")
+    _add_run_options(p1)
     p2 = sub.add_parser("show-yesterday")
 
     p3 = sub.add_parser("run")
     p3.add_argument("date", help="YYYY-MM-DD")
+    _add_run_options(p3)
 
     p4 = sub.add_parser("show")
     p4.add_argument("date", help="YYYY-MM-DD")
 
+    p5 = sub.add_parser("backfill", help="날짜 범위를 OpenAI Batch API로 한 번에 분석")
+    p5.add_argument("start", help="YYYY-MM-DD")
+    p5.add_argument("end", help="YYYY-MM-DD")
+    p5.add_argument("--no-fetch", action="store_true", help="HF에서 다시 받지 않고 DB에 있는 논문만 사용")
+    p5.add_argument("--poll", type=float, default=30.0, help="batch 상태 확인 주기(초)")
+    p5.add_argument("--batch-id", default="", help="이미 제출한 batch를 이어서 기다리고 결과만 반영")
+
+    p6 = sub.add_parser("cache-stats", help="LLM 응답 캐시 통계")
+    p6.add_argument("--evict", action="store_true", help="오래된/초과 항목 정리 후 출력")
+
+    p7 = sub.add_parser("show-label", help="라벨 하나의 최근 N일 논문 목록 (라벨 생략 시 라벨별 논문 수)")
+    p7.add_argument("label", nargs="?", default="", help="예: Robotics")
+    p7.add_argument("--days", type=int, default=90)
+    p7.add_argument("--min-confidence", type=float, default=0.0)
+
+    p8 = sub.add_parser("search", help="전체 날짜 full-text 검색 (BM25)")
+    p8.add_argument("query")
+    p8.add_argument("--limit", type=int, default=20)
+    p8.add_argument("--start", default="", help="YYYY-MM-DD")
+    p8.add_argument("--end", default="", help="YYYY-MM-DD")
+
+    p9 = sub.add_parser("embed", help="임베딩이 없는 논문만 계산 (EMBED_BACKEND)")
+    p9.add_argument("--date", default="", help="YYYY-MM-DD (생략하면 전체)")
+
+    p10 = sub.add_parser("similar", help="비슷한 논문 top-k")
+    p10.add_argument("pid", help="arXiv id")
+    p10.add_argument("--date", default="", help="YYYY-MM-DD (생략하면 가장 최근 날짜)")
+    p10.add_argument("--k", type=int, default=10)
+
+    p11 = sub.add_parser("translate-keywords", help="영어가 아닌 keywords를 한 번에 번역해서 저장")
+    p11.add_argument("date", help="YYYY-MM-DD")
+
+    p12 = sub.add_parser("fetch-range", help="날짜 범위를 동시에 fetch만 (분석 없음)")
+    p12.add_argument("start", help="YYYY-MM-DD")
+    p12.add_argument("end", help="YYYY-MM-DD")
+    p12.add_argument("--workers", type=int, default=8, help="동시 요청 수")
+
+    p13 = sub.add_parser("archive-migrate", help="data/raw/*.json을 월별 압축 archive로 옮김 (1회)")
+    p13.add_argument("--keep", action="store_true", help="옮긴 뒤 원본 json 파일을 지우지 않음")
+
+    p14 = sub.add_parser("reparse", help="네트워크 없이 archive의 raw를 다시 parse해서 DB 반영")
+    p14.add_argument("start", help="YYYY-MM-DD")
+    p14.add_argument("end", help="YYYY-MM-DD")
+    p14.add_argument("--workers", type=int, default=0, help="parse process 수 (기본 CPU 수, 1 = 단일 프로세스)")
+
+    p15 = sub.add_parser("jobs", help="Zotero/PDF 저장 작업 큐 상태")
+    p15.add_argument("--work", action="store_true", help="남은 작업을 이 프로세스에서 실행하고 끝냄")
+    p15.add_argument("--workers", type=int, default=4)
+
+    p16 = sub.add_parser("zotero-sync", help="한 날짜(또는 그 날짜의 라벨 하나)를 Zotero로 일괄 전송")
+    p16.add_argument("date", help="YYYY-MM-DD")
+    p16.add_argument("--label", default="", help="이 라벨만")
+    p16.add_argument("--workers", type=int, default=4, help="동시 PDF 다운로드/업로드 수")
+
     args = ap.parse_args()
 
     if args.cmd == "run-yesterday":
-        run_yesterday()
+        run_yesterday(**_run_kwargs(args))
     elif args.cmd == "show-yesterday":
         show_yesterday()
     elif args.cmd == "run":
-        run_for_date(args.date)
+        run_for_date(args.date, **_run_kwargs(args))
     elif args.cmd == "show":
         show_for_date(args.date)
+    elif args.cmd == "backfill":
+        backfill(args.start, args.end, fetch=not args.no_fetch, poll_sec=args.poll, batch_id=args.batch_id)
+    elif args.cmd == "show-label":
+        show_label(args.label, days=args.days, min_confidence=args.min_confidence)
+    elif args.cmd == "search":
+        search(args.query, limit=args.limit, start=args.start, end=args.end)
+    elif args.cmd == "embed":
+        embed(args.date)
+    elif args.cmd == "similar":
+        show_similar(args.pid, date=args.date, k=args.k)
+    elif args.cmd == "translate-keywords":
+        translate_keywords_for_date(args.date)
+    elif args.cmd == "fetch-range":
+        fetch_range_cmd(args.start, args.end, workers=args.workers)
+    elif args.cmd == "reparse":
+        reparse_cmd(args.start, args.end, workers=args.workers)
+    elif args.cmd == "zotero-sync":
+        zotero_sync_cmd(args.date, label=args.label, workers=args.workers)
+    elif args.cmd == "jobs":
+        jobs_cmd(work=args.work, workers=args.workers)
+    elif args.cmd == "archive-migrate":
+        archive_migrate(keep=args.keep)
+    elif args.cmd == "cache-stats":
+        cache_stats(evict=args.evict)
 
 if __name__ == "__main__":
     main()
@@ -11,6 +11,12 @@ class Paths:
     data: Path = root / "data"
     raw: Path = data / "raw"
     db: Path = data / "db" / "dailypaper.sqlite3"
+    llm_cache: Path = data / "db" / "llm_cache.sqlite3"
+    batches: Path = data / "batches"
+    pdfs: Path = data / "pdfs"
+    jobs: Path = data / "db" / "jobs.sqlite3"
+    zotero_collections: Path = data / "db" / "zotero_collections.json"
+    favorites: Path = root.parent / "DailyPaperFavorite"
     logs: Path = root / "logs"
 
 @dataclass(frozen=True)
@@ -18,7 +24,23 @@ class Settings:
     hf_api_base: str = "https://huggingface.co/api/daily_papers?date="
     openai_api_key: str = os.environ.get("OPENAI_API_KEY", "").strip()
     model: str = os.environ.get("OPENAI_MODEL", "gpt-5.2")
-    
+    # async 엔진용 rate limit (요청/분, 토큰/분)
+    openai_rpm: int = int(os.environ.get("OPENAI_RPM", "500"))
+    openai_tpm: int = int(os.environ.get("OPENAI_TPM", "200000"))
+    openai_concurrency: int = int(os.environ.get("OPENAI_CONCURRENCY", "32"))
+    # LLM 응답 캐시 (LLM_CACHE=0이면 끔)
+    llm_cache: bool = os.environ.get("LLM_CACHE", "1").strip() not in ("0", "false", "no")
+    llm_cache_max_entries: int = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "50000"))
+    llm_cache_max_age_days: int = int(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "180"))
+
+    # related papers 임베딩: auto(키 있으면 openai, 없으면 hash) | openai | hash
+    embed_backend: str = os.environ.get("EMBED_BACKEND", "auto").strip().lower()
+    embed_model: str = os.environ.get("EMBED_MODEL", "text-embedding-3-small")
+
+    zotero_api_key: str = os.environ.get("ZOTERO_API_KEY", "").strip()
+    zotero_user_id: str = os.environ.get("ZOTERO_USER_ID", "").strip()
+    zotero_api_base: str = os.environ.get("ZOTERO_API_BASE", "https://api.zotero.org").strip()
+
     taxonomy: tuple = (
         "Robotics",
         "LLM",
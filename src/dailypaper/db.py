@@ -1,51 +1,163 @@
 import sqlite3
 import json
+import re
+import threading
+import time
 from datetime import datetime
-from typing import List, Optional
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
 
 from .config import PATHS
+from .migrations import FTS_SOURCE_SELECT, migrate
 from .parse import Paper
 
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-32000",  # KiB 단위 (약 32MB)
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=30000",
+)
+
+# 스레드마다 연결 하나를 재사용 (sqlite3 연결은 스레드 간 공유 불가)
+_local = threading.local()
+
+def tune_connection(con: sqlite3.Connection) -> sqlite3.Connection:
+    for pragma in PRAGMAS:
+        con.execute(pragma)
+    return con
+
 def _connect():
+    path = str(PATHS.db)
+    con = getattr(_local, "con", None)
+    if con is not None and getattr(_local, "path", None) == path:
+        return con
+    if con is not None:
+        con.close()
+
     PATHS.db.parent.mkdir(parents=True, exist_ok=True)
-    return sqlite3.connect(str(PATHS.db))
+    con = tune_connection(sqlite3.connect(path, timeout=30))
+    _local.con = con
+    _local.path = path
+    return con
+
+def close_db():
+    con = getattr(_local, "con", None)
+    if con is not None:
+        con.close()
+        _local.con = None
 
 def init_db():
-    with _connect() as con:
-        cur = con.cursor()
-        cur.executescript(
-            """
-            PRAGMA journal_mode=WAL;
-
-            CREATE TABLE IF NOT EXISTS papers (
-              date TEXT NOT NULL,
-              pid TEXT NOT NULL,
-              title TEXT,
-              summary TEXT,
-              url TEXT,
-              fetched_at TEXT,
-              PRIMARY KEY(date, pid)
-            );
-
-            CREATE TABLE IF NOT EXISTS annotations (
-              date TEXT NOT NULL,
-              pid TEXT NOT NULL,
-              labels_json TEXT,
-              card_json TEXT,
-              created_at TEXT,
-              PRIMARY KEY(date, pid)
-            );
+    migrate(_connect())
+
+def _sync_fts(cur, keys: List[Tuple[str, str]]):
+    # papers_fts의 rowid는 papers.rowid (papers는 ON CONFLICT DO UPDATE라 rowid가 유지됨)
+    cur.executemany(
+        "DELETE FROM papers_fts WHERE rowid IN (SELECT rowid FROM papers WHERE date=? AND pid=?)",
+        keys,
+    )
+    cur.executemany(
+        f"INSERT INTO papers_fts(rowid, title, summary, one_liner, method, keywords) {FTS_SOURCE_SELECT} WHERE p.date=? AND p.pid=?",
+        keys,
+    )
+
+def _bump_versions(cur, dates, now: str):
+    cur.executemany(
+        """
+        INSERT INTO meta(date, data_version, updated_at) VALUES(?, 1, ?)
+        ON CONFLICT(date) DO UPDATE SET data_version=data_version+1, updated_at=excluded.updated_at
+        """,
+        [(d, now) for d in sorted(set(dates))],
+    )
+
+def data_version(date: str, con: Optional[sqlite3.Connection] = None) -> int:
+    con = con or _connect()
+    row = con.execute("SELECT data_version FROM meta WHERE date=?", (date,)).fetchone()
+    return row[0] if row else 0
+
+def dates_version(con: Optional[sqlite3.Connection] = None) -> Tuple[int, int]:
+    """(날짜 수, 전체 버전 합) — 어떤 날짜든 바뀌면 값이 커진다."""
+    con = con or _connect()
+    return tuple(con.execute("SELECT COUNT(*), COALESCE(SUM(data_version), 0) FROM meta").fetchone())
+
+def _write_papers(cur: sqlite3.Cursor, date: str, papers: Iterable[Paper], now: str, batch: int = 500) -> int:
+    cur.execute("SELECT pid, title, summary, url FROM papers WHERE date=?", (date,))
+    existing = {r[0]: (r[1], r[2], r[3]) for r in cur.fetchall()}
+    it = iter(papers)
+    written = 0
+
+    while True:
+        chunk = list(islice(it, batch))
+        if not chunk:
+            break
+        changed = {}
+        for p in chunk:
+            row = (p.title, p.summary, p.url)
+            if existing.get(p.pid) != row:
+                changed[p.pid] = p
+                existing[p.pid] = row
+        if not changed:
+            continue
+
+        cur.executemany(
             """
+            INSERT INTO papers(date,pid,title,summary,url,fetched_at) VALUES(?,?,?,?,?,?)
+            ON CONFLICT(date,pid) DO UPDATE SET
+              title=excluded.title, summary=excluded.summary, url=excluded.url, fetched_at=excluded.fetched_at
+            """,
+            [(date, p.pid, p.title, p.summary, p.url, now) for p in changed.values()],
         )
-        con.commit()
+        _sync_fts(cur, [(date, pid) for pid in changed])
+        written += len(changed)
+    return written
 
-def upsert_papers(date: str, papers: List[Paper]):
+def upsert_papers(date: str, papers: Iterable[Paper], batch: int = 500) -> int:
+    """내용이 바뀌었거나 새로 생긴 논문만 쓴다. 쓴 행 수 반환 (0이면 DB write 없음).
+    papers는 generator여도 됨: batch개씩 끊어서 쓰고 commit은 마지막에 한 번."""
     now = datetime.utcnow().isoformat()
     with _connect() as con:
         cur = con.cursor()
-        cur.executemany(
-            "INSERT OR REPLACE INTO papers(date,pid,title,summary,url,fetched_at) VALUES(?,?,?,?,?,?)",
-            [(date, p.pid, p.title, p.summary, p.url, now) for p in papers],
+        written = _write_papers(cur, date, papers, now, batch)
+        if not written:
+            return 0
+        _bump_versions(cur, [date], now)
+        con.commit()
+    return written
+
+def upsert_papers_bulk(items: Iterable[Tuple[str, Iterable[Paper]]], dates_per_tx: int = 16) -> Dict[str, int]:
+    """여러 날짜를 dates_per_tx개씩 한 transaction으로 upsert. {date: 쓴 행 수} 반환."""
+    out: Dict[str, int] = {}
+    it = iter(items)
+    with _connect() as con:
+        cur = con.cursor()
+        while True:
+            chunk = list(islice(it, dates_per_tx))
+            if not chunk:
+                break
+            now = datetime.utcnow().isoformat()
+            for date, papers in chunk:
+                out[date] = _write_papers(cur, date, papers, now)
+            _bump_versions(cur, [d for d, _ in chunk if out[d]], now)
+            con.commit()
+    return out
+
+def get_fetch_state(date: str) -> Tuple[str, str, str]:
+    """(etag, last_modified, content_hash) — 없으면 빈 문자열."""
+    with _connect() as con:
+        row = con.execute("SELECT etag, last_modified, content_hash FROM fetch_state WHERE date=?", (date,)).fetchone()
+    return tuple(row) if row else ("", "", "")
+
+def put_fetch_state(date: str, etag: str, last_modified: str, content_hash: str):
+    now = datetime.utcnow().isoformat()
+    with _connect() as con:
+        con.execute(
+            """
+            INSERT INTO fetch_state(date, etag, last_modified, content_hash, changed_at) VALUES(?,?,?,?,?)
+            ON CONFLICT(date) DO UPDATE SET
+              etag=excluded.etag, last_modified=excluded.last_modified,
+              content_hash=excluded.content_hash, changed_at=excluded.changed_at
+            """,
+            (date, etag, last_modified, content_hash, now),
         )
         con.commit()
 
@@ -64,27 +176,103 @@ def list_unannotated(date: str) -> List[Paper]:
         )
         rows = cur.fetchall()
 
-    return [Paper(pid=r[0], title=r[1] or "", summary=r[2] or "", url=r[3] or "") for r in rows]
+    return [Paper(r[0], r[1] or "", r[2] or "", r[3] or "") for r in rows]
+
+def _label_rows(date: str, pid: str, labels_json: str, card_json: str):
+    try:
+        labels = json.loads(labels_json) if labels_json else []
+    except Exception:
+        labels = []
+    try:
+        conf = json.loads(card_json).get("label_confidence", {}) if card_json else {}
+    except Exception:
+        conf = {}
+    if not isinstance(conf, dict):
+        conf = {}
+
+    out = []
+    for lb in labels if isinstance(labels, list) else []:
+        if not isinstance(lb, str):
+            continue
+        try:
+            score = float(conf[lb]) if lb in conf else None
+        except Exception:
+            score = None
+        out.append((date, pid, lb, score))
+    return out
 
 def upsert_annotation(date: str, pid: str, labels_json: str, card_json: str):
+    upsert_annotations([(date, pid, labels_json, card_json)])
+
+def upsert_annotations(rows: List[Tuple[str, str, str, str]]):
+    """rows: (date, pid, labels_json, card_json) 여러 개를 한 트랜잭션으로 저장 (paper_labels도 같이 갱신)."""
+    if not rows:
+        return
     now = datetime.utcnow().isoformat()
     with _connect() as con:
         cur = con.cursor()
-        cur.execute(
+        cur.executemany(
             "INSERT OR REPLACE INTO annotations(date,pid,labels_json,card_json,created_at) VALUES(?,?,?,?,?)",
-            (date, pid, labels_json, card_json, now),
+            [(date, pid, labels_json, card_json, now) for date, pid, labels_json, card_json in rows],
+        )
+        cur.executemany(
+            "DELETE FROM paper_labels WHERE date=? AND pid=?",
+            [(date, pid) for date, pid, _, _ in rows],
+        )
+        cur.executemany(
+            "INSERT OR REPLACE INTO paper_labels(date,pid,label,confidence) VALUES(?,?,?,?)",
+            [lr for row in rows for lr in _label_rows(*row)],
         )
+        _sync_fts(cur, [(date, pid) for date, pid, _, _ in rows])
+        _bump_versions(cur, [date for date, _, _, _ in rows], now)
         con.commit()
 
+def load_annotations(date: str) -> List[Tuple[str, str, str]]:
+    """(pid, labels_json, card_json) 목록."""
+    with _connect() as con:
+        cur = con.cursor()
+        cur.execute("SELECT pid, labels_json, card_json FROM annotations WHERE date=?", (date,))
+        return cur.fetchall()
+
+class AnnotationWriter:
+    """annotation을 모아서 한 트랜잭션으로 저장. flush_every개가 쌓이거나 flush_sec초가 지나면 flush."""
+
+    def __init__(self, flush_every: int = 8, flush_sec: float = 2.0):
+        self.flush_every = flush_every
+        self.flush_sec = flush_sec
+        self.rows: List[Tuple[str, str, str, str]] = []
+        self.last_flush = time.monotonic()
+        self.written = 0
+
+    def add(self, date: str, pid: str, labels_json: str, card_json: str):
+        self.rows.append((date, pid, labels_json, card_json))
+        if len(self.rows) >= self.flush_every or time.monotonic() - self.last_flush >= self.flush_sec:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            upsert_annotations(self.rows)
+            self.written += len(self.rows)
+            self.rows = []
+        self.last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # 예외로 빠져나가도 이미 끝난 카드는 저장
+        self.flush()
+        return False
+
 def load_grouped_titles(date: str):
     with _connect() as con:
         cur = con.cursor()
         cur.execute(
             """
-            SELECT p.pid, p.title, COALESCE(a.labels_json, '[]')
+            SELECT p.pid, p.title, COALESCE(l.label, 'Unlabeled')
             FROM papers p
-            LEFT JOIN annotations a
-            ON p.date=a.date AND p.pid=a.pid
+            LEFT JOIN paper_labels l
+            ON p.date=l.date AND p.pid=l.pid
             WHERE p.date=?
             ORDER BY p.title ASC
             """,
@@ -93,18 +281,104 @@ def load_grouped_titles(date: str):
         rows = cur.fetchall()
 
     buckets = {}
-    for pid, title, labels_json in rows:
-        try:
-            labels = json.loads(labels_json) if labels_json else []
-            if not isinstance(labels, list) or not labels:
-                labels = ["Unlabeled"]
-        except Exception:
-            labels = ["Unlabeled"]
-
-        for lb in labels:
-            buckets.setdefault(lb, []).append(f"{title}  ({pid})")
+    for pid, title, label in rows:
+        buckets.setdefault(label, []).append(f"{title}  ({pid})")
     return buckets
 
+def list_papers_by_label(label: str, start: Optional[str] = None, end: Optional[str] = None, min_confidence: float = 0.0):
+    """라벨 하나의 (date, pid, title, url, confidence) 목록, 최신 날짜 먼저. (label, date) 인덱스 사용."""
+    with _connect() as con:
+        cur = con.cursor()
+        cur.execute(
+            """
+            SELECT l.date, l.pid, p.title, p.url, l.confidence
+            FROM paper_labels l
+            JOIN papers p
+            ON p.date=l.date AND p.pid=l.pid
+            WHERE l.label=? AND l.date>=? AND l.date<=? AND COALESCE(l.confidence, 1.0)>=?
+            ORDER BY l.date DESC, p.title ASC
+            """,
+            (label, start or "", end or "9999-99-99", min_confidence),
+        )
+        return cur.fetchall()
+
+def label_counts(start: Optional[str] = None, end: Optional[str] = None):
+    with _connect() as con:
+        cur = con.cursor()
+        cur.execute(
+            """
+            SELECT label, COUNT(*)
+            FROM paper_labels
+            WHERE date>=? AND date<=?
+            GROUP BY label
+            ORDER BY COUNT(*) DESC
+            """,
+            (start or "", end or "9999-99-99"),
+        )
+        return cur.fetchall()
+
+def fts_query(text: str) -> str:
+    """사용자 입력 -> FTS5 MATCH 식. 단어마다 prefix 검색, 모두 포함(AND)."""
+    tokens = re.findall(r"\w+", text or "")
+    return " ".join(f'"{t}"*' for t in tokens)
+
+def search_papers(
+    query: str,
+    limit: int = 20,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    con: Optional[sqlite3.Connection] = None,
+):
+    """전체 날짜 대상 BM25 순위 검색. (date, pid, title, url, score) — score는 낮을수록 관련도 높음."""
+    match = fts_query(query)
+    if not match:
+        return []
+    con = con or _connect()
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT p.date, p.pid, p.title, p.url,
+               bm25(papers_fts, 10.0, 1.0, 3.0, 1.0, 5.0) AS score
+        FROM papers_fts
+        JOIN papers p ON p.rowid = papers_fts.rowid
+        WHERE papers_fts MATCH ? AND p.date>=? AND p.date<=?
+        ORDER BY score
+        LIMIT ?
+        """,
+        (match, start or "", end or "9999-99-99", limit),
+    )
+    return cur.fetchall()
+
+def embed_new(date: Optional[str] = None, embedder=None) -> int:
+    from .embeddings import embed_missing, get_embedder
+
+    return embed_missing(_connect(), embedder or get_embedder(), date=date)
+
+def similar_papers(
+    date: str,
+    pid: str,
+    k: int = 10,
+    con: Optional[sqlite3.Connection] = None,
+    embedder=None,
+    embed_query: bool = True,
+):
+    """비슷한 논문 (date, pid, title, url, cosine) 목록."""
+    from .embeddings import similar
+
+    con = con or _connect()
+    hits = similar(con, date, pid, k=k, embedder=embedder, embed_query=embed_query)
+    out = []
+    for d, p, score in hits:
+        row = con.execute("SELECT title, url FROM papers WHERE date=? AND pid=?", (d, p)).fetchone()
+        if row is not None:
+            out.append((d, p, row[0], row[1], score))
+    return out
+
+def latest_date_for(pid: str) -> Optional[str]:
+    with _connect() as con:
+        row = con.execute("SELECT MAX(date) FROM papers WHERE pid=?", (pid,)).fetchone()
+    return row[0] if row else None
+
 def list_dates(limit: int = 30):
     with _connect() as con:
         cur = con.cursor()
@@ -114,13 +388,50 @@ def list_dates(limit: int = 30):
         )
         return [r[0] for r in cur.fetchall()]
 
+def load_card_dicts(date: str, label: Optional[str] = None) -> List[dict]:
+    """Zotero 일괄 전송용 카드 dict 목록 (label을 주면 그 라벨이 붙은 논문만)."""
+    sql = """
+        SELECT p.pid, p.title, p.summary, p.url, p.submitted_by, p.organization, p.published_at,
+               COALESCE(a.labels_json,'[]'), COALESCE(a.card_json,'{}')
+        FROM papers p
+        LEFT JOIN annotations a
+        ON p.date=a.date AND p.pid=a.pid
+    """
+    params: tuple = (date,)
+    if label:
+        sql += " JOIN paper_labels l ON l.date=p.date AND l.pid=p.pid AND l.label=?"
+        params = (label, date)
+    sql += " WHERE p.date=? ORDER BY p.title ASC"
+    with _connect() as con:
+        rows = con.execute(sql, params).fetchall()
+
+    out = []
+    for pid, title, summary, url, submitted_by, organization, published_at, labels_json, card_json in rows:
+        try:
+            labels = json.loads(labels_json)
+            card = json.loads(card_json)
+        except Exception:
+            labels, card = [], {}
+        out.append({
+            "date": date,
+            "pid": pid,
+            "title": title or "",
+            "url": url or "",
+            "submitted_by": submitted_by or "",
+            "organization": organization or "",
+            "published_at": published_at or "",
+            "labels": labels if isinstance(labels, list) else [],
+            "card": card if isinstance(card, dict) else {},
+            "raw_summary": summary or "",
+        })
+    return out
+
 def list_cards_by_label(date: str):
-    import json as _json
     with _connect() as con:
         cur = con.cursor()
         cur.execute(
             """
-            SELECT p.pid, p.title, p.url, COALESCE(a.labels_json,'[]'), COALESCE(a.card_json,'{}')
+            SELECT p.pid, p.title, p.url, COALESCE(a.card_json,'{}')
             FROM papers p
             LEFT JOIN annotations a
             ON p.date=a.date AND p.pid=a.pid
@@ -130,18 +441,15 @@ def list_cards_by_label(date: str):
             (date,),
         )
         rows = cur.fetchall()
+        cur.execute("SELECT pid, label FROM paper_labels WHERE date=?", (date,))
+        labels_by_pid = {}
+        for pid, label in cur.fetchall():
+            labels_by_pid.setdefault(pid, []).append(label)
 
     buckets = {}
-    for pid, title, url, labels_json, card_json in rows:
-        try:
-            labels = _json.loads(labels_json) if labels_json else []
-            if not isinstance(labels, list) or not labels:
-                labels = ["Unlabeled"]
-        except Exception:
-            labels = ["Unlabeled"]
-
+    for pid, title, url, card_json in rows:
         try:
-            card = _json.loads(card_json) if card_json else {}
+            card = json.loads(card_json) if card_json else {}
         except Exception:
             card = {}
 
@@ -152,6 +460,6 @@ def list_cards_by_label(date: str):
             "card": card,
         }
 
-        for lb in labels:
+        for lb in labels_by_pid.get(pid) or ["Unlabeled"]:
             buckets.setdefault(lb, []).append(item)
     return buckets
@@ -0,0 +1,191 @@
+import hashlib
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .config import SETTINGS
+
+
+class HashEmbedder:
+    """네트워크 없이 쓰는 결정적 임베딩 (단어 unigram/bigram feature hashing)."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        words = re.findall(r"\w+", text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for feat in self._features(text):
+                h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "little")
+                out[i, h % self.dim] += 1.0 if (h >> 63) else -1.0
+        return _normalize(out)
+
+
+class OpenAIEmbedder:
+    def __init__(self, model: str = "", batch_size: int = 100):
+        self.model = model or SETTINGS.embed_model
+        self.name = f"openai:{self.model}"
+        self.batch_size = batch_size
+        self._client = None
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        from openai import OpenAI
+
+        if self._client is None:
+            self._client = OpenAI(api_key=SETTINGS.openai_api_key)
+        rows = []
+        for i in range(0, len(texts), self.batch_size):
+            resp = self._client.embeddings.create(model=self.model, input=list(texts[i:i + self.batch_size]))
+            rows.extend(d.embedding for d in sorted(resp.data, key=lambda d: d.index))
+        return _normalize(np.asarray(rows, dtype=np.float32))
+
+
+def get_embedder(backend: str = ""):
+    backend = backend or SETTINGS.embed_backend
+    if backend == "auto":
+        backend = "openai" if SETTINGS.openai_api_key else "hash"
+    if backend == "openai":
+        return OpenAIEmbedder()
+    if backend == "hash":
+        return HashEmbedder()
+    raise ValueError(f"unknown embed backend: {backend}")
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (m / norms).astype(np.float32, copy=False)
+
+
+def paper_text(title: str, summary: str) -> str:
+    return f"{title or ''}\n{summary or ''}".strip()
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def embed_missing(con: sqlite3.Connection, embedder, date: Optional[str] = None, chunk: int = 256) -> int:
+    """임베딩이 없거나, 계산한 뒤로 title/summary가 바뀐 논문만 계산해서 저장 (date를 주면 그 날짜만)."""
+    cur = con.cursor()
+    cur.execute(
+        """
+        SELECT p.date, p.pid, p.title, p.summary, e.text_hash
+        FROM papers p
+        LEFT JOIN embeddings e
+        ON p.date=e.date AND p.pid=e.pid AND e.model=?
+        WHERE ? IS NULL OR p.date=?
+        """,
+        (embedder.name, date, date),
+    )
+    rows = []
+    for d, pid, title, summary, old_hash in cur.fetchall():
+        text = paper_text(title, summary)
+        h = text_hash(text)
+        if h != old_hash:
+            rows.append((d, pid, text, h))
+
+    for i in range(0, len(rows), chunk):
+        part = rows[i:i + chunk]
+        vecs = embedder.embed([r[2] for r in part])
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO embeddings(date,pid,model,dim,vec,text_hash) VALUES(?,?,?,?,?,?)",
+                [(r[0], r[1], embedder.name, vecs.shape[1], vecs[j].tobytes(), r[3]) for j, r in enumerate(part)],
+            )
+    return len(rows)
+
+
+class EmbeddingIndex:
+    """한 모델의 임베딩 전체를 (N, dim) float32 행렬로 메모리에 올려서 cosine top-k."""
+
+    def __init__(self, keys: List[Tuple[str, str]], matrix: np.ndarray, stamp: Tuple[int, int]):
+        self.keys = keys
+        self.matrix = matrix
+        self.stamp = stamp
+        self.pos: Dict[Tuple[str, str], int] = {k: i for i, k in enumerate(keys)}
+
+    def vector(self, date: str, pid: str) -> Optional[np.ndarray]:
+        i = self.pos.get((date, pid))
+        return None if i is None else self.matrix[i]
+
+    def top_k(self, query: np.ndarray, k: int = 10, exclude_pid: str = "") -> List[Tuple[str, str, float]]:
+        """pid별로 점수가 가장 높은 (date, pid) 하나씩만 (여러 날짜에 올라온 논문이 중복되지 않게)."""
+        if not self.keys:
+            return []
+        scores = self.matrix @ query
+        n = min(len(scores), k + 8)
+        while True:
+            idx = np.argpartition(-scores, n - 1)[:n]
+            idx = idx[np.argsort(-scores[idx])]
+            out, seen = [], {exclude_pid}
+            for i in idx:
+                d, pid = self.keys[i]
+                if pid in seen:
+                    continue
+                seen.add(pid)
+                out.append((d, pid, float(scores[i])))
+                if len(out) >= k:
+                    return out
+            if n == len(scores):
+                return out
+            # 같은 pid가 많아서 후보가 모자라면 후보를 넓혀서 다시
+            n = min(len(scores), n * 4)
+
+
+_INDEXES: Dict[Tuple[str, str], EmbeddingIndex] = {}
+_INDEX_LOCK = threading.Lock()
+
+
+def _db_file(con: sqlite3.Connection) -> str:
+    return con.execute("PRAGMA database_list").fetchone()[2]
+
+
+def load_index(con: sqlite3.Connection, model: str) -> EmbeddingIndex:
+    # 새로 추가된 행이 없으면 메모리에 올린 행렬을 그대로 재사용
+    stamp = tuple(con.execute("SELECT COUNT(*), COALESCE(MAX(rowid), 0) FROM embeddings WHERE model=?", (model,)).fetchone())
+    key = (_db_file(con), model)
+    with _INDEX_LOCK:
+        idx = _INDEXES.get(key)
+        if idx is not None and idx.stamp == stamp:
+            return idx
+
+        rows = con.execute("SELECT date, pid, dim, vec FROM embeddings WHERE model=?", (model,)).fetchall()
+        if rows:
+            matrix = np.frombuffer(b"".join(r[3] for r in rows), dtype=np.float32).reshape(len(rows), rows[0][2])
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        idx = EmbeddingIndex([(r[0], r[1]) for r in rows], matrix, stamp)
+        _INDEXES[key] = idx
+        return idx
+
+
+def similar(
+    con: sqlite3.Connection,
+    date: str,
+    pid: str,
+    k: int = 10,
+    embedder=None,
+    embed_query: bool = True,
+) -> List[Tuple[str, str, float]]:
+    """(date, pid) 논문과 비슷한 논문 (date, pid, cosine). 같은 arXiv id는 제외.
+    embed_query=False면 저장된 임베딩이 없을 때 새로 계산하지 않고 빈 목록."""
+    embedder = embedder or get_embedder()
+    idx = load_index(con, embedder.name)
+    query = idx.vector(date, pid)
+    if query is None:
+        if not embed_query:
+            return []
+        row = con.execute("SELECT title, summary FROM papers WHERE date=? AND pid=?", (date, pid)).fetchone()
+        if row is None:
+            return []
+        query = embedder.embed([paper_text(row[0], row[1])])[0]
+    return idx.top_k(query, k=k, exclude_pid=pid)
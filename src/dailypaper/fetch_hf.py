@@ -1,44 +1,78 @@
-import json
-import time
-from pathlib import Path
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
 import requests
 
+from .archive import get_raw, put_raw
 from .config import SETTINGS, PATHS
+from .httpclient import session
 
-def fetch_hf_daily(date_yyyy_mm_dd: str, save_raw: bool = True) -> str:
+@dataclass(frozen=True)
+class FetchResult:
+    raw: Optional[str]  # None이면 변경 없음 (304 또는 이전과 같은 내용)
+    status: int
+    etag: str = ""
+    last_modified: str = ""
+    content_hash: str = ""
 
-    url = SETTINGS.hf_api_base + date_yyyy_mm_dd
+def content_hash(raw: str) -> str:
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _get_with_retry(url: str, headers: Optional[dict] = None) -> requests.Response:
+    # 429/5xx 재시도(backoff, Retry-After)는 공유 세션의 adapter가 처리
+    try:
+        r = session().get(url, headers=headers, timeout=30)
+    except requests.RequestException as e:
+        raise RuntimeError(f"HF fetch failed after retries: {e}") from e
 
-    # 간단한 재시도(backoff): 429/5xx 대비
-    backoffs = [1, 2, 4, 8]
-    last_err = None
+    if r.status_code in (200, 304):
+        return r
+    raise RuntimeError(f"HF HTTP {r.status_code}: {r.text[:300]}")
 
-    for i, sec in enumerate([0] + backoffs):
-        if sec:
-            time.sleep(sec)
+def _save_raw(date_yyyy_mm_dd: str, raw: str):
+    put_raw(date_yyyy_mm_dd, raw)
 
-        try:
-            r = requests.get(url, timeout=30)
-            if r.status_code == 200:
-                raw = r.text
-                if save_raw:
-                    PATHS.raw.mkdir(parents=True, exist_ok=True)
-                    raw_path = PATHS.raw / f"{date_yyyy_mm_dd}.json"
-                    raw_path.write_text(raw, encoding="utf-8")
-                return raw
+def fetch_hf_daily(date_yyyy_mm_dd: str, save_raw: bool = True) -> str:
+
+    url = SETTINGS.hf_api_base + date_yyyy_mm_dd
+    raw = _get_with_retry(url).text
+    if save_raw:
+        _save_raw(date_yyyy_mm_dd, raw)
+    return raw
 
-            if r.status_code in (429, 500, 502, 503, 504):
-                last_err = RuntimeError(f"HF HTTP {r.status_code}: {r.text[:300]}")
-                continue
+def fetch_hf_daily_conditional(
+    date_yyyy_mm_dd: str,
+    etag: str = "",
+    last_modified: str = "",
+    known_hash: str = "",
+    save_raw: bool = True,
+) -> FetchResult:
+    """ETag/Last-Modified 조건부 요청. 바뀐 내용이 있을 때만 raw를 돌려주고 저장한다."""
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
 
-            raise RuntimeError(f"HF HTTP {r.status_code}: {r.text[:300]}")
+    r = _get_with_retry(SETTINGS.hf_api_base + date_yyyy_mm_dd, headers=headers)
+    if r.status_code == 304:
+        return FetchResult(raw=None, status=304, etag=etag, last_modified=last_modified, content_hash=known_hash)
 
-        except Exception as e:
-            last_err = e
-            continue
+    raw = r.text
+    digest = content_hash(raw)
+    new_etag = r.headers.get("ETag", "")
+    new_last_modified = r.headers.get("Last-Modified", "")
+    if digest == known_hash:
+        return FetchResult(raw=None, status=200, etag=new_etag, last_modified=new_last_modified, content_hash=digest)
 
-    raise RuntimeError(f"HF fetch failed after retries: {last_err}")
+    if save_raw:
+        _save_raw(date_yyyy_mm_dd, raw)
+    return FetchResult(raw=raw, status=200, etag=new_etag, last_modified=new_last_modified, content_hash=digest)
 
 def load_raw(date_yyyy_mm_dd: str) -> str:
+    raw = get_raw(date_yyyy_mm_dd)
+    if raw is not None:
+        return raw
+    # 아직 archive-migrate 전인 예전 파일
     p = PATHS.raw / f"{date_yyyy_mm_dd}.json"
     return p.read_text(encoding="utf-8")
@@ -0,0 +1,114 @@
+import threading
+import weakref
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import certifi
+except Exception:
+    certifi = None
+
+# 모든 외부 HTTP(HF fetch, arXiv PDF, Zotero)가 같이 쓰는 세션: keep-alive 연결 재사용,
+# 429/5xx 재시도(Retry-After 존중), 기본 timeout, host별 동시 요청 수 제한.
+
+DEFAULT_TIMEOUT = (10, 60)  # (connect, read) 초
+POOL_MAXSIZE = 32
+DEFAULT_HOST_LIMIT = 8
+HOST_WAIT_SEC = 120  # host 슬롯을 이만큼 못 얻으면 멈춰 있지 말고 Timeout
+HOST_LIMITS = {
+    "arxiv.org": 4,
+    "export.arxiv.org": 4,
+    "api.zotero.org": 4,
+}
+USER_AGENT = "DailyPaper/1.0"
+
+def _retry() -> Retry:
+    # POST는 재시도하지 않음 (Zotero item 생성 등이 중복될 수 있음)
+    return Retry(
+        total=4,
+        connect=4,
+        read=2,
+        status=4,
+        backoff_factor=1.0,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+class PooledSession(requests.Session):
+    def __init__(self):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=POOL_MAXSIZE, max_retries=_retry())
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.headers["User-Agent"] = USER_AGENT
+        if certifi is not None:
+            self.verify = certifi.where()
+        self._host_sems: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_lock = threading.Lock()
+
+    def _host_sem(self, url: str) -> threading.BoundedSemaphore:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._host_lock:
+            sem = self._host_sems.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(HOST_LIMITS.get(host, DEFAULT_HOST_LIMIT))
+                self._host_sems[host] = sem
+            return sem
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+        sem = self._host_sem(url)
+        if not sem.acquire(timeout=HOST_WAIT_SEC):
+            host = urlsplit(url).hostname
+            raise requests.Timeout(f"no free connection slot for {host} after {HOST_WAIT_SEC}s")
+        try:
+            resp = super().request(method, url, *args, **kwargs)
+        except BaseException:
+            sem.release()
+            raise
+        if not kwargs.get("stream"):
+            sem.release()
+            return resp
+
+        # stream이면 body를 끝까지 읽었거나 close했을 때 host 슬롯을 돌려줌 (둘 다 urllib3 release_conn을 거침).
+        # 둘 다 안 하고 버린 응답은 GC될 때 돌려줌 (finalize가 resp를 잡고 있으면 안 되므로 sem만 참조)
+        lock = threading.Lock()
+        held = [True]
+
+        def release():
+            with lock:
+                if not held[0]:
+                    return
+                held[0] = False
+            sem.release()
+
+        hooked = "release_conn" if hasattr(resp.raw, "release_conn") else "close"
+        target = resp.raw if hooked == "release_conn" else resp
+        orig = getattr(target, hooked)
+
+        def hook():
+            try:
+                orig()
+            finally:
+                release()
+
+        setattr(target, hooked, hook)
+        weakref.finalize(resp, release)
+        return resp
+
+_SESSION: Optional[PooledSession] = None
+_SESSION_LOCK = threading.Lock()
+
+def session() -> PooledSession:
+    """프로세스 전체에서 공유하는 세션 (requests.Session은 thread 간 공유해도 됨)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            _SESSION = PooledSession()
+        return _SESSION
@@ -0,0 +1,239 @@
+import json
+import sqlite3
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Optional, Tuple
+
+from .config import PATHS
+from .db import close_db
+
+# Zotero 동기화 / PDF 저장 같은 느린 작업용 영구 큐 (data/db/jobs.sqlite3).
+# 앱은 enqueue만 하고, worker thread들이 꺼내서 실행한다. 프로세스가 죽어도 queued 작업은 남는다.
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+LEASE_SEC = 600  # running인 채로 이 시간 동안 heartbeat가 없으면 (worker가 죽은 것으로 보고) 다시 꺼낼 수 있음
+BACKOFFS = [5, 30, 120]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+  id INTEGER PRIMARY KEY,
+  kind TEXT NOT NULL,
+  key TEXT NOT NULL,
+  payload TEXT NOT NULL,
+  status TEXT NOT NULL,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  run_after REAL NOT NULL DEFAULT 0,
+  locked_until REAL NOT NULL DEFAULT 0,
+  error TEXT NOT NULL DEFAULT '',
+  logs TEXT NOT NULL DEFAULT '',
+  created_at REAL NOT NULL,
+  updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_kind_key ON jobs(kind, key);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, run_after);
+"""
+
+_local = threading.local()
+
+def _connect() -> sqlite3.Connection:
+    path = str(PATHS.jobs)
+    con = getattr(_local, "con", None)
+    if con is not None and getattr(_local, "path", None) == path:
+        return con
+
+    PATHS.jobs.parent.mkdir(parents=True, exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("PRAGMA busy_timeout=30000")
+    con.executescript(SCHEMA)
+    _local.con, _local.path = con, path
+    return con
+
+def _close():
+    con = getattr(_local, "con", None)
+    if con is not None:
+        con.close()
+        _local.con = None
+
+def _close_thread_connections():
+    # worker thread가 끝날 때: 큐 연결 + handler가 쓴 DB 연결 (thread-local이라 다른 스레드는 못 닫음)
+    _close()
+    close_db()
+
+def enqueue(kind: str, key: str, payload: dict, max_attempts: int = 3, redo_done: bool = False) -> int:
+    """(kind, key) 작업을 큐에 넣는다. 이미 queued/running(/done)이면 그대로 두고, failed면 다시 queued로.
+    redo_done=True면 done인 작업도 다시 queued로 (다시 실행해도 안전한 작업용)."""
+    now = time.time()
+    with _connect() as con:
+        con.execute(
+            """
+            INSERT INTO jobs(kind, key, payload, status, max_attempts, created_at, updated_at)
+            VALUES(?,?,?,?,?,?,?)
+            ON CONFLICT(kind, key) DO UPDATE SET
+              payload=excluded.payload, status=excluded.status, attempts=0, run_after=0,
+              error='', max_attempts=excluded.max_attempts, updated_at=excluded.updated_at
+            WHERE jobs.status=? OR (? AND jobs.status=?)
+            """,
+            (kind, key, json.dumps(payload, ensure_ascii=False), QUEUED, max_attempts, now, now, FAILED, redo_done, DONE),
+        )
+        return con.execute("SELECT id FROM jobs WHERE kind=? AND key=?", (kind, key)).fetchone()[0]
+
+def for_key(key: str) -> Dict[str, Tuple[str, str]]:
+    """{kind: (status, error)} — 이 key로 들어간 작업들."""
+    rows = _connect().execute("SELECT kind, status, error FROM jobs WHERE key=?", (key,)).fetchall()
+    return {r[0]: (r[1], r[2]) for r in rows}
+
+def version() -> Tuple[int, float]:
+    """작업 상태가 바뀌면 달라지는 값 (UI 새로고침 판단용)."""
+    row = _connect().execute("SELECT COUNT(*), COALESCE(MAX(updated_at), 0) FROM jobs").fetchone()
+    return row[0], row[1]
+
+def counts() -> Dict[str, int]:
+    rows = _connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+    return {r[0]: r[1] for r in rows}
+
+def recent_failures(limit: int = 20):
+    return _connect().execute(
+        "SELECT kind, key, attempts, error FROM jobs WHERE status=? ORDER BY updated_at DESC LIMIT ?",
+        (FAILED, limit),
+    ).fetchall()
+
+def _claim() -> Optional[Tuple[int, str, str, str, int, int]]:
+    now = time.time()
+    with _connect() as con:
+        rows = con.execute(
+            """
+            UPDATE jobs SET status=?, attempts=attempts+1, locked_until=?, updated_at=?
+            WHERE id=(
+              SELECT id FROM jobs
+              WHERE (status=? AND run_after<=?) OR (status=? AND locked_until<?)
+              ORDER BY run_after, id LIMIT 1
+            )
+            RETURNING id, kind, key, payload, attempts, max_attempts
+            """,
+            (RUNNING, now + LEASE_SEC, now, QUEUED, now, RUNNING, now),
+        ).fetchall()
+    return rows[0] if rows else None
+
+# 작업 소유자는 (id, attempts): 다시 꺼내질 때마다 attempts가 늘어나므로, lease를 잃은 worker의
+# heartbeat/결과 기록은 아무 행도 바꾸지 못한다
+def _heartbeat(job_id: int, attempts: int, stop: threading.Event):
+    try:
+        while not stop.wait(LEASE_SEC / 3):
+            with _connect() as con:
+                renewed = con.execute(
+                    "UPDATE jobs SET locked_until=? WHERE id=? AND attempts=? AND status=?",
+                    (time.time() + LEASE_SEC, job_id, attempts, RUNNING),
+                ).rowcount
+            if not renewed:
+                return
+    finally:
+        _close()
+
+def _finish(job_id: int, attempts: int, status: str, error: str = "", logs: str = "", run_after: float = 0) -> bool:
+    with _connect() as con:
+        return con.execute(
+            """
+            UPDATE jobs SET status=?, error=?, logs=?, run_after=?, locked_until=0, updated_at=?
+            WHERE id=? AND attempts=? AND status=?
+            """,
+            (status, error, logs, run_after, time.time(), job_id, attempts, RUNNING),
+        ).rowcount > 0
+
+def job_key(date: str, pid: str) -> str:
+    return f"{date}|{pid}"
+
+def default_handlers() -> Dict[str, Callable[[dict], object]]:
+    from .pdfcache import save_favorite_pdf
+    from .zotero import add_to_zotero, bulk_add_to_zotero
+
+    return {
+        "favorite": lambda p: save_favorite_pdf(p["card"], p["date"]),
+        "zotero": lambda p: add_to_zotero(p["card"], p["date"]),
+        "zotero_bulk": lambda p: bulk_add_to_zotero(p["cards"], p["date"]),
+    }
+
+def run_one(handlers: Dict[str, Callable[[dict], object]]) -> bool:
+    """작업 하나를 꺼내 실행. 꺼낼 작업이 없으면 False."""
+    job = _claim()
+    if job is None:
+        return False
+
+    job_id, kind, key, payload, attempts, max_attempts = job
+    # 오래 걸리는 작업(큰 섹션 zotero_bulk 등)도 살아 있는 동안은 lease를 계속 연장
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job_id, attempts, stop), daemon=True)
+    beat.start()
+    error = None
+    try:
+        result = handlers[kind](json.loads(payload))
+    except Exception as e:
+        error = e
+    finally:
+        stop.set()
+        beat.join()
+
+    if error is not None:
+        logs = "\n".join(getattr(error, "logs", []) or ["".join(traceback.format_exception(error, limit=3))])
+        if attempts < max_attempts:
+            delay = BACKOFFS[min(attempts - 1, len(BACKOFFS) - 1)]
+            _finish(job_id, attempts, QUEUED, error=str(error)[:2000], logs=logs, run_after=time.time() + delay)
+        else:
+            _finish(job_id, attempts, FAILED, error=str(error)[:2000], logs=logs)
+        return True
+
+    logs = result.get("logs", []) if isinstance(result, dict) else []
+    _finish(job_id, attempts, DONE, logs="\n".join(logs))
+    return True
+
+class JobRunner:
+    """worker thread 여러 개가 큐를 계속 비운다 (daemon thread, 프로세스 종료 시 같이 끝남)."""
+
+    def __init__(self, handlers: Dict[str, Callable[[dict], object]], workers: int = 4, poll_sec: float = 1.0):
+        self.handlers = handlers
+        self.poll_sec = poll_sec
+        self._stop = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"dailypaper-job-{i}", daemon=True) for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _loop(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    busy = run_one(self.handlers)
+                except Exception:
+                    busy = False
+                if not busy:
+                    self._stop.wait(self.poll_sec)
+        finally:
+            _close_thread_connections()
+
+    def stop(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join()
+
+def drain(handlers: Dict[str, Callable[[dict], object]], workers: int = 4):
+    """지금 실행 가능한 작업이 없어질 때까지 돌리고 끝낸다 (CLI용)."""
+    def loop():
+        try:
+            while True:
+                if run_one(handlers):
+                    continue
+                # 재시도 대기 중인 작업이 남아 있으면 기다렸다가 다시
+                if not counts().get(QUEUED):
+                    return
+                time.sleep(1)
+        finally:
+            _close_thread_connections()
+
+    threads = [threading.Thread(target=loop) for _ in range(max(1, workers))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
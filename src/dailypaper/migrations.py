@@ -0,0 +1,191 @@
+import sqlite3
+from typing import Callable, List, Tuple
+
+# PRAGMA user_version 기반 스키마 마이그레이션.
+# 새 변경은 MIGRATIONS 끝에 (버전, 함수)로 추가만 하고 기존 단계는 수정하지 않는다.
+
+
+def _columns(con: sqlite3.Connection, table: str) -> set:
+    return {r[1] for r in con.execute(f"PRAGMA table_info({table})")}
+
+
+def _v1_base(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS papers (
+          date TEXT NOT NULL,
+          pid TEXT NOT NULL,
+          title TEXT,
+          summary TEXT,
+          url TEXT,
+          fetched_at TEXT,
+          PRIMARY KEY(date, pid)
+        )
+        """
+    )
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS annotations (
+          date TEXT NOT NULL,
+          pid TEXT NOT NULL,
+          labels_json TEXT,
+          card_json TEXT,
+          created_at TEXT,
+          PRIMARY KEY(date, pid)
+        )
+        """
+    )
+
+
+def _v2_paper_meta(con: sqlite3.Connection):
+    # 예전 app.py가 요청마다 ALTER TABLE로 붙이던 컬럼 (이미 있으면 건너뜀)
+    cols = _columns(con, "papers")
+    for name in ("submitted_by", "organization", "published_at"):
+        if name not in cols:
+            con.execute(f"ALTER TABLE papers ADD COLUMN {name} TEXT DEFAULT ''")
+
+
+def _v3_paper_labels(con: sqlite3.Connection):
+    # labels_json을 정규화한 테이블: 라벨/날짜 범위 조회를 인덱스로 처리
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS paper_labels (
+          date TEXT NOT NULL,
+          pid TEXT NOT NULL,
+          label TEXT NOT NULL,
+          confidence REAL,
+          PRIMARY KEY(date, pid, label)
+        )
+        """
+    )
+    con.execute("CREATE INDEX IF NOT EXISTS idx_paper_labels_label_date ON paper_labels(label, date)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_paper_labels_pid ON paper_labels(pid)")
+    con.execute(
+        """
+        INSERT OR IGNORE INTO paper_labels(date, pid, label, confidence)
+        SELECT a.date, a.pid, j.value,
+               CASE WHEN json_valid(a.card_json)
+                    THEN json_extract(a.card_json, '$.label_confidence."' || j.value || '"')
+               END
+        FROM annotations a,
+             json_each(CASE WHEN json_valid(a.labels_json) AND json_type(a.labels_json) = 'array'
+                            THEN a.labels_json ELSE '[]' END) j
+        WHERE j.type = 'text'
+        """
+    )
+
+
+# papers + annotations.card_json -> papers_fts 한 행 (rowid = papers.rowid)
+FTS_SOURCE_SELECT = """
+SELECT p.rowid, COALESCE(p.title, ''), COALESCE(p.summary, ''),
+       CASE WHEN json_valid(a.card_json) THEN COALESCE(json_extract(a.card_json, '$.one_liner'), '') ELSE '' END,
+       CASE WHEN json_valid(a.card_json) THEN COALESCE(json_extract(a.card_json, '$.method'), '') ELSE '' END,
+       CASE WHEN json_valid(a.card_json) AND json_type(a.card_json, '$.keywords') = 'array'
+            THEN COALESCE((SELECT group_concat(k.value, ' ') FROM json_each(a.card_json, '$.keywords') k), '')
+            ELSE '' END
+FROM papers p
+LEFT JOIN annotations a
+ON p.date=a.date AND p.pid=a.pid
+"""
+
+
+def _v4_fts(con: sqlite3.Connection):
+    con.execute(
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+          title, summary, one_liner, method, keywords,
+          tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    con.execute("DELETE FROM papers_fts")
+    con.execute(f"INSERT INTO papers_fts(rowid, title, summary, one_liner, method, keywords) {FTS_SOURCE_SELECT}")
+
+
+def _v5_embeddings(con: sqlite3.Connection):
+    # vec: L2 정규화된 float32 little-endian BLOB
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS embeddings (
+          date TEXT NOT NULL,
+          pid TEXT NOT NULL,
+          model TEXT NOT NULL,
+          dim INTEGER NOT NULL,
+          vec BLOB NOT NULL,
+          PRIMARY KEY(date, pid, model)
+        )
+        """
+    )
+
+
+def _v6_meta(con: sqlite3.Connection):
+    # 날짜별 데이터 버전: papers/annotations가 바뀔 때마다 +1 (대시보드 캐시 키)
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS meta (
+          date TEXT PRIMARY KEY,
+          data_version INTEGER NOT NULL DEFAULT 0,
+          updated_at TEXT
+        )
+        """
+    )
+    con.execute("INSERT OR IGNORE INTO meta(date, data_version, updated_at) SELECT DISTINCT date, 1, '' FROM papers")
+
+
+def _v7_fetch_state(con: sqlite3.Connection):
+    # HF 조건부 요청 상태 (ETag / Last-Modified / 내용 해시)
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS fetch_state (
+          date TEXT PRIMARY KEY,
+          etag TEXT NOT NULL DEFAULT '',
+          last_modified TEXT NOT NULL DEFAULT '',
+          content_hash TEXT NOT NULL DEFAULT '',
+          changed_at TEXT
+        )
+        """
+    )
+
+
+def _v8_embedding_text_hash(con: sqlite3.Connection):
+    # 임베딩을 계산한 title+summary의 해시. 기존 행은 ''라서 다음 embed 때 한 번 다시 계산된다
+    con.execute("ALTER TABLE embeddings ADD COLUMN text_hash TEXT NOT NULL DEFAULT ''")
+
+
+MIGRATIONS: List[Tuple[int, Callable[[sqlite3.Connection], None]]] = [
+    (1, _v1_base),
+    (2, _v2_paper_meta),
+    (3, _v3_paper_labels),
+    (4, _v4_fts),
+    (5, _v5_embeddings),
+    (6, _v6_meta),
+    (7, _v7_fetch_state),
+    (8, _v8_embedding_text_hash),
+]
+
+LATEST = MIGRATIONS[-1][0]
+
+
+def schema_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> int:
+    """필요한 단계만 순서대로 적용하고 최종 버전을 반환. 최신이면 읽기 한 번으로 끝난다."""
+    if schema_version(con) >= LATEST:
+        return schema_version(con)
+
+    con.execute("PRAGMA journal_mode=WAL")
+    # 다른 프로세스와 동시에 마이그레이션하지 않도록 write lock을 먼저 잡고 다시 확인
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        current = schema_version(con)
+        for version, step in MIGRATIONS:
+            if version > current:
+                step(con)
+                con.execute(f"PRAGMA user_version={version}")
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return schema_version(con)
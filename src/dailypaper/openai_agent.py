@@ -1,19 +1,37 @@
+import hashlib
 import json
 import time
-from typing import Dict, Any
+import unicodedata
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from openai import OpenAI
 
+from .cache import cache_key, get_cache
 from .config import SETTINGS
 from .parse import Paper
 
+# 프롬프트 문구나 검증 규칙을 바꾸면 올릴 것 (응답 캐시 키에 들어감)
+PROMPT_VERSION = "v1"
+
+REQUIRED_KEYS = [
+    "labels",
+    "label_confidence",
+    "one_liner",
+    "background",
+    "gap",
+    "method",
+    "evidence",
+    "limitations",
+    "keywords",
+]
+
+BACKOFFS = [0, 1, 2, 4]
 
-def analyze_paper(client: OpenAI, paper: Paper) -> Dict[str, Any]:
-    if not SETTINGS.openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is missing (.env 확인)")
 
+def system_prompt() -> str:
     taxonomy = list(SETTINGS.taxonomy)
 
-    system = f"""
+    return f"""
 너는 Hugging Face Daily Papers의 논문을 분석하는 구조화 요약 분석가다.
 입력은 title과 summary(abstract) 뿐이다.
 
@@ -62,7 +80,9 @@ def analyze_paper(client: OpenAI, paper: Paper) -> Dict[str, Any]:
   5~8개 영어 키워드 (소문자, 공백/하이픈 허용)
 """.strip()
 
-    user = f"""title:
+
+def user_prompt(paper: Paper) -> str:
+    return f"""title:
 {paper.title}
 
 summary:
@@ -72,54 +92,226 @@ url:
 {paper.url}
 """.strip()
 
-    backoffs = [0, 1, 2, 4]
+
+def build_messages(paper: Paper) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt()},
+        {"role": "user", "content": user_prompt(paper)},
+    ]
+
+
+def validate_card(obj: Any) -> Dict[str, Any]:
+    if not isinstance(obj, dict):
+        raise ValueError("card is not a JSON object")
+
+    # 최소 검증 (키 누락 방지)
+    for k in REQUIRED_KEYS:
+        if k not in obj:
+            raise ValueError(f"missing key: {k}")
+
+    # labels taxonomy 필터링 (방어)
+    taxonomy = list(SETTINGS.taxonomy)
+    obj["labels"] = [lb for lb in obj.get("labels", []) if lb in taxonomy]
+    if not obj["labels"]:
+        obj["labels"] = ["Other"]
+
+    obj["problem"] = obj.get("background", "")
+    obj["what_is_new"] = obj.get("gap", "")
+
+    return obj
+
+
+def parse_card(text: str) -> Dict[str, Any]:
+    return validate_card(json.loads(text.strip()))
+
+
+def retry_after_seconds(err: Exception) -> Optional[float]:
+    """Retry-After(-ms) 헤더가 있으면 초 단위로 반환, 없으면 None."""
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return max(0.0, float(ms) / 1000.0)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def prompt_version() -> str:
+    digest = hashlib.sha256(system_prompt().encode("utf-8")).hexdigest()[:12]
+    return f"{PROMPT_VERSION}:{digest}"
+
+
+def paper_cache_key(paper: Paper) -> str:
+    return cache_key(SETTINGS.model, prompt_version(), paper.title, paper.summary)
+
+
+def cached_card(paper: Paper) -> Optional[Dict[str, Any]]:
+    cache = get_cache()
+    return cache.get(paper_cache_key(paper)) if cache else None
+
+
+def store_card(paper: Paper, card: Dict[str, Any]):
+    cache = get_cache()
+    if cache:
+        cache.put(paper_cache_key(paper), SETTINGS.model, card)
+
+
+def _complete(client: OpenAI, messages: List[Dict[str, str]], parse: Callable[[str], Any]) -> Any:
     last_err = None
+    delay = 0.0
 
-    for sec in backoffs:
-        if sec:
-            time.sleep(sec)
+    for sec in BACKOFFS:
+        # 서버가 Retry-After를 주면 고정 backoff 대신 그 값을 따른다
+        wait = delay if delay else sec
+        if wait:
+            time.sleep(wait)
         try:
             resp = client.chat.completions.create(
                 model=SETTINGS.model,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
+                messages=messages,
                 temperature=0,
                 response_format={"type": "json_object"},
             )
-
-            text = resp.choices[0].message.content.strip()
-            obj = json.loads(text)
-
-            # 최소 검증 (키 누락 방지)
-            required = [
-                "labels",
-                "label_confidence",
-                "one_liner",
-                "background",
-                "gap",
-                "method",
-                "evidence",
-                "limitations",
-                "keywords",
-            ]
-            for k in required:
-                if k not in obj:
-                    raise ValueError(f"missing key: {k}")
-
-            # labels taxonomy 필터링 (방어)
-            obj["labels"] = [lb for lb in obj.get("labels", []) if lb in taxonomy]
-            if not obj["labels"]:
-                obj["labels"] = ["Other"]
-
-            obj["problem"] = obj.get("background", "")
-            obj["what_is_new"] = obj.get("gap", "")
-
-            return obj
+            return parse(resp.choices[0].message.content)
 
         except Exception as e:
             last_err = e
+            delay = retry_after_seconds(e) or 0.0
             continue
 
     raise RuntimeError(f"OpenAI analyze failed: {last_err}")
+
+
+def analyze_paper(client: OpenAI, paper: Paper) -> Dict[str, Any]:
+    card = cached_card(paper)
+    if card is not None:
+        return card
+
+    if not SETTINGS.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY is missing (.env 확인)")
+
+    card = _complete(client, build_messages(paper), parse_card)
+    store_card(paper, card)
+    return card
+
+
+BATCH_INSTRUCTIONS = """
+[여러 논문 모드]
+- 입력은 papers 배열이며 각 항목에 pid, title, summary, url이 있다.
+- 각 논문을 서로 독립적으로 위 규칙대로 분석하라. 다른 논문의 내용을 섞지 마라.
+- 출력은 {"<pid>": {위 구조}, ...} 형태의 JSON 객체 하나. 입력의 모든 pid를 그대로 키로 사용하라.
+""".strip()
+
+
+def build_batch_messages(papers: List[Paper]) -> List[Dict[str, str]]:
+    payload = {
+        "papers": [
+            {"pid": p.pid, "title": p.title, "summary": p.summary, "url": p.url}
+            for p in papers
+        ]
+    }
+    return [
+        {"role": "system", "content": system_prompt() + "\n\n" + BATCH_INSTRUCTIONS},
+        {"role": "user", "content": json.dumps(payload, ensure_ascii=False)},
+    ]
+
+
+def _parse_object(text: str) -> Dict[str, Any]:
+    obj = json.loads(text.strip())
+    if not isinstance(obj, dict):
+        raise ValueError("response is not a JSON object")
+    return obj
+
+
+def analyze_batch(client: OpenAI, papers: List[Paper]) -> List[Tuple[Paper, Optional[Dict[str, Any]], Optional[Exception]]]:
+    """K개 논문을 한 요청으로 분석. 검증에 실패한 논문만 analyze_paper로 개별 재시도."""
+    results = []
+    pending = []
+    for p in papers:
+        card = cached_card(p)
+        if card is not None:
+            results.append((p, card, None))
+        else:
+            pending.append(p)
+
+    pending_obj = {}
+    if len(pending) > 1:
+        if not SETTINGS.openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is missing (.env 확인)")
+        try:
+            pending_obj = _complete(client, build_batch_messages(pending), _parse_object)
+        except Exception:
+            pending_obj = {}
+
+    for p in pending:
+        try:
+            card = validate_card(pending_obj.get(p.pid))
+            store_card(p, card)
+        except Exception:
+            # fallback: 개별 호출
+            try:
+                card = analyze_paper(client, p)
+            except Exception as e:
+                results.append((p, None, e))
+                continue
+        results.append((p, card, None))
+
+    return results
+
+
+# 번역 대상 문자: 한글/한자/가나/키릴. 악센트 붙은 라틴 문자(Schrödinger)나 그리스 문자(β-VAE)는 영어 키워드로 본다
+_FOREIGN_SCRIPTS = ("HANGUL", "CJK", "HIRAGANA", "KATAKANA", "CYRILLIC")
+
+
+def needs_translation(keywords: Any) -> bool:
+    # analyze_paper가 영어 키워드를 요구하지만 가끔 한글 등이 섞여 나온다
+    if not isinstance(keywords, list):
+        return False
+    return any(
+        not ch.isascii() and unicodedata.name(ch, "").startswith(_FOREIGN_SCRIPTS)
+        for kw in keywords for ch in str(kw)
+    )
+
+
+def translate_keywords_batch(client: OpenAI, items: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """{pid: keywords} 전체를 요청 한 번으로 영어 키워드로 번역. 실패한 pid는 결과에서 빠진다."""
+    if not items:
+        return {}
+    if not SETTINGS.openai_api_key:
+        raise RuntimeError("OPENAI_API_KEY is missing (.env 확인)")
+
+    prompt = f"""
+Translate the keyword phrases of each paper into natural, concise English keywords.
+Rules:
+- Output ONLY a JSON object mapping each pid to a JSON array of strings: {{"<pid>": ["...", ...]}}.
+- Use exactly the pids given in the input, and keep the number and order of keywords.
+- Keep each item short (1~4 words).
+- Use lowercase.
+- Preserve technical terms (e.g., egocentric, slam, state-space).
+Input: {json.dumps(items, ensure_ascii=False)}
+""".strip()
+
+    obj = _complete(client, [{"role": "user", "content": prompt}], _parse_object)
+
+    out = {}
+    for pid in items:
+        kws = obj.get(pid)
+        if isinstance(kws, list) and kws and all(isinstance(k, str) and k.strip() for k in kws):
+            out[pid] = [k.strip().lower() for k in kws]
+    return out
@@ -1,37 +1,134 @@
-from typing import List
-from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import IO, Any, Iterator, List, Optional, Union
+from typing_extensions import TypedDict
+from pydantic import ConfigDict, TypeAdapter, ValidationError, with_config
+import codecs
 import json
 
-class Paper(BaseModel):
+@dataclass(slots=True)
+class Paper:
+    """내부에서 쓰는 논문 레코드 (DB/파이프라인 hot path용, 검증 없음)."""
     pid: str
     title: str
     summary: str = ""
     url: str = ""
 
+# HF raw JSON은 외부 입력이라 여기서만 pydantic으로 검증
+_HF_CONFIG = ConfigDict(coerce_numbers_to_str=True, str_strip_whitespace=True)
+
+@with_config(_HF_CONFIG)
+class HFPaper(TypedDict, total=False):
+    id: Optional[str]
+    title: Optional[str]
+    summary: Optional[str]
+    url: Optional[str]
+
+@with_config(_HF_CONFIG)
+class HFItem(HFPaper, total=False):
+    # 보통은 {"paper": {...}}, 예전 형식은 paper 필드가 최상위에 바로 있음
+    paper: HFPaper
+
+_HF_ITEM = TypeAdapter(HFItem)
+_HF_PAYLOAD = TypeAdapter(List[HFItem])
+
+def _to_paper(item: HFItem) -> Optional[Paper]:
+    pp = item.get("paper", item)
+    title = pp.get("title") or ""
+    if not title:
+        return None
+    pid = pp.get("id") or title
+    url = pp.get("url") or f"https://arxiv.org/abs/{pid}"
+    return Paper(pid, title, pp.get("summary") or "", url)
+
+def _validate_item(item: Any) -> Optional[HFItem]:
+    try:
+        return _HF_ITEM.validate_python(item)
+    except ValidationError:
+        return None
+
 def parse_hf_raw(raw_json_text: str) -> List[Paper]:
-    j = json.loads(raw_json_text)
-    if not isinstance(j, list):
-        raise ValueError("HF response is not a list")
+    try:
+        # JSON 파싱 + 검증을 한 번에 (pydantic-core)
+        items = _HF_PAYLOAD.validate_json(raw_json_text)
+    except ValidationError:
+        # 형식이 어긋난 항목이 섞여 있으면 항목별로 검증하고 그런 항목만 버린다
+        j = json.loads(raw_json_text)
+        if not isinstance(j, list):
+            raise ValueError("HF response is not a list")
+        items = [it for it in map(_validate_item, j) if it is not None]
 
     out: List[Paper] = []
-    for item in j:
-        if isinstance(item, dict) and "paper" in item and isinstance(item["paper"], dict):
-            pp = item["paper"]
-        else:
-            pp = item if isinstance(item, dict) else {}
+    for item in items:
+        p = _to_paper(item)
+        if p is not None:
+            out.append(p)
+    return out
 
-        pid = str(pp.get("id", "")).strip()
-        title = str(pp.get("title", "")).strip()
-        summary = str(pp.get("summary", "")).strip()
-        url = str(pp.get("url", "")).strip()
+_WS = " \t\r\n"
+_END = _WS + ",]"
 
-        if not title:
-            continue
-        if not pid:
-            pid = title  
-        if not url and pid:
-            url = f"https://arxiv.org/abs/{pid}"
+def iter_json_array(stream: IO[Union[str, bytes]], chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """최상위 JSON 배열의 원소를 하나씩 디코딩 (chunk 단위로 읽어서 원소 하나 크기만큼만 메모리에 둠)."""
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buf, pos, eof = "", 0, False
 
-        out.append(Paper(pid=pid, title=title, summary=summary, url=url))
+    def fill() -> bool:
+        nonlocal buf, pos, eof
+        if eof:
+            return False
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk, final=eof)
+        buf, pos = buf[pos:] + chunk, 0
+        return True
 
-    return out
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    if peek() != "[":
+        raise ValueError("HF response is not a list")
+    pos += 1
+    if peek() == "]":
+        return
+
+    while True:
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # 숫자는 chunk 경계에서 잘려도("1." + "5") 앞부분만으로 디코딩되므로,
+                # 뒤에 구분자(, ] 공백)가 보일 때만 값이 끝난 것으로 본다
+                if eof or (end < len(buf) and buf[end] in _END):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+        pos = end
+        yield value
+
+        sep = peek()
+        if sep == ",":
+            pos += 1
+        elif sep == "]":
+            return
+        else:
+            raise ValueError(f"malformed HF response near offset {pos}")
+
+def iter_hf_papers(stream: IO[Union[str, bytes]]) -> Iterator[Paper]:
+    """parse_hf_raw의 스트리밍 버전: 파일/바이트 스트림에서 Paper를 하나씩."""
+    for item in iter_json_array(stream):
+        item = _validate_item(item)
+        p = _to_paper(item) if item is not None else None
+        if p is not None:
+            yield p
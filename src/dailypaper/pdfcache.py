@@ -0,0 +1,191 @@
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Union
+
+from .config import PATHS
+from .httpclient import session
+
+# arXiv PDF 로컬 캐시: 본문은 data/pdfs/<md5 앞 2자리>/<md5>.pdf (내용 주소),
+# arXiv id -> md5 는 data/pdfs/ids/<id>.json. 한 번 받은 PDF는 즐겨찾기/Zotero 업로드가 같이 쓴다.
+
+CHUNK = 1 << 16
+
+# 같은 id를 동시에 두 번 받지 않도록 id별 lock. id마다 만들면 계속 늘어나니 고정 개수를 나눠 쓴다
+_LOCK_STRIPES = 64
+_LOCKS = [threading.Lock() for _ in range(_LOCK_STRIPES)]
+
+@dataclass(frozen=True)
+class CachedPdf:
+    path: Path
+    md5: str
+    size: int
+
+def _key_lock(key: str) -> threading.Lock:
+    return _LOCKS[hash(key) % _LOCK_STRIPES]
+
+def _id_path(key: str) -> Path:
+    safe = re.sub(r"[^A-Za-z0-9._-]", "_", key)
+    return PATHS.pdfs / "ids" / f"{safe}.json"
+
+def _blob_path(md5: str) -> Path:
+    return PATHS.pdfs / md5[:2] / f"{md5}.pdf"
+
+def lookup(key: str) -> Optional[CachedPdf]:
+    try:
+        meta = json.loads(_id_path(key).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return None
+    path = _blob_path(meta["md5"])
+    if not path.exists() or path.stat().st_size != meta["size"]:
+        return None
+    return CachedPdf(path=path, md5=meta["md5"], size=meta["size"])
+
+def _download(pdf_url: str) -> CachedPdf:
+    PATHS.pdfs.mkdir(parents=True, exist_ok=True)
+    tmp = PATHS.pdfs / f".tmp-{os.getpid()}-{threading.get_ident()}.pdf"
+    md5 = hashlib.md5()
+    size = 0
+    try:
+        with session().get(pdf_url, stream=True, timeout=(10, 90)) as r:
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(CHUNK):
+                    md5.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+        if not size:
+            raise RuntimeError(f"Empty PDF: {pdf_url}")
+
+        digest = md5.hexdigest()
+        path = _blob_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp, path)
+        return CachedPdf(path=path, md5=digest, size=size)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+def get_pdf(key: str, pdf_url: str) -> CachedPdf:
+    """key(arXiv id)의 PDF를 캐시에서, 없으면 chunk 단위로 받아서 캐시에 넣고 돌려준다."""
+    with _key_lock(key):
+        hit = lookup(key)
+        if hit is not None:
+            return hit
+
+        pdf = _download(pdf_url)
+        meta_path = _id_path(key)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"md5": pdf.md5, "size": pdf.size, "url": pdf_url}), encoding="utf-8")
+        os.replace(tmp, meta_path)
+        return pdf
+
+class ChainedBody(io.RawIOBase):
+    """bytes 조각과 파일을 이어 붙인 읽기 전용 스트림 (requests data=로 넘기면 Content-Length와 함께 chunk 전송)."""
+
+    def __init__(self, parts: List[Union[bytes, Path]]):
+        self._parts = parts
+        self._len = sum(p.stat().st_size if isinstance(p, Path) else len(p) for p in parts)
+        self._idx = 0
+        self._cur = None
+        self._pos = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def readable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        # requests가 남은 길이(len - tell)로 Content-Length를 정하므로 필요
+        return self._pos
+
+    def _next_part(self) -> bool:
+        if self._cur is not None:
+            self._cur.close()
+            self._cur = None
+        if self._idx >= len(self._parts):
+            return False
+        part = self._parts[self._idx]
+        self._idx += 1
+        self._cur = open(part, "rb") if isinstance(part, Path) else io.BytesIO(part)
+        return True
+
+    def readinto(self, b) -> int:
+        while True:
+            if self._cur is None and not self._next_part():
+                return 0
+            n = self._cur.readinto(b)
+            if n:
+                self._pos += n
+                return n
+            self._cur.close()
+            self._cur = None
+
+    def close(self):
+        if self._cur is not None:
+            self._cur.close()
+            self._cur = None
+        super().close()
+
+INVALID_FILENAME_RE = re.compile(r'[<>:"/\\|?*\x00-\x1F]')
+
+def sanitize_filename(name: str, fallback: str = "paper") -> str:
+    cleaned = INVALID_FILENAME_RE.sub("_", (name or "").strip())
+    cleaned = re.sub(r"\s+", " ", cleaned).rstrip(" .")
+    if not cleaned:
+        cleaned = INVALID_FILENAME_RE.sub("_", fallback).strip() or "paper"
+    return cleaned[:180]
+
+def to_pdf_url(pid: str, url: str) -> str:
+    raw = (url or "").strip()
+    if not raw and pid:
+        return f"https://arxiv.org/pdf/{pid}.pdf"
+    if not raw:
+        return ""
+    if not raw.startswith(("http://", "https://")):
+        raw = "https://" + raw
+
+    if "arxiv.org/abs/" in raw:
+        aid = raw.split("arxiv.org/abs/", 1)[1]
+        aid = aid.split("?", 1)[0].split("#", 1)[0].strip("/")
+        return f"https://arxiv.org/pdf/{aid}.pdf"
+
+    if "arxiv.org/pdf/" in raw:
+        base = raw.split("?", 1)[0].split("#", 1)[0]
+        return base if base.endswith(".pdf") else f"{base}.pdf"
+
+    return raw
+
+def favorite_pdf_path(card: dict, fallback_date: str) -> Path:
+    paper_date = str(card.get("date") or fallback_date)
+    pid = str(card.get("pid") or "").strip()
+    title = str(card.get("title") or "").strip()
+    stem = sanitize_filename(title or pid, fallback=(pid or "paper"))
+    return PATHS.favorites / paper_date / f"{stem}.pdf"
+
+def save_favorite_pdf(card: dict, fallback_date: str):
+    target = favorite_pdf_path(card, fallback_date)
+    if target.exists():
+        return
+
+    pid = str(card.get("pid") or "").strip()
+    url = str(card.get("url") or "").strip()
+    pdf_url = to_pdf_url(pid, url)
+    if not pdf_url:
+        return
+
+    pdf = cached_pdf(pid, pdf_url)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(pdf.path, target)
+
+def cached_pdf(pid: str, pdf_url: str) -> CachedPdf:
+    # arXiv id로 캐시 (id가 없으면 URL 해시)
+    return get_pdf(pid or hashlib.sha1(pdf_url.encode("utf-8")).hexdigest(), pdf_url)
@@ -1,14 +1,43 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 from openai import OpenAI
 
 from .config import PATHS, SETTINGS
-from .fetch_hf import fetch_hf_daily
-from .parse import parse_hf_raw
-from .db import init_db, upsert_papers, list_unannotated, upsert_annotation, load_grouped_titles
-from .openai_agent import analyze_paper
+from .archive import archived_dates, iter_raw, migrate_legacy, open_raw
+from .fetch_hf import fetch_hf_daily_conditional
+from .parse import iter_hf_papers, parse_hf_raw
+from .db import (
+    AnnotationWriter,
+    init_db,
+    upsert_papers,
+    upsert_papers_bulk,
+    list_unannotated,
+    upsert_annotations,
+    load_grouped_titles,
+    list_papers_by_label,
+    label_counts,
+    search_papers,
+    embed_new,
+    similar_papers,
+    latest_date_for,
+    load_annotations,
+    get_fetch_state,
+    put_fetch_state,
+)
+from .cache import get_cache
+from . import jobs
+from .openai_agent import (
+    analyze_batch,
+    analyze_paper,
+    cached_card,
+    needs_translation,
+    store_card,
+    translate_keywords_batch,
+)
 import json
+import os
 
 def yesterday_kst() -> str:
     kst = ZoneInfo("Asia/Seoul")
@@ -16,28 +45,331 @@ def yesterday_kst() -> str:
     y = now - timedelta(days=1)
     return y.strftime("%Y-%m-%d")
 
-def run_for_date(date: str):
+def date_range(start: str, end: str) -> list:
+    d0 = datetime.strptime(start, "%Y-%m-%d").date()
+    d1 = datetime.strptime(end, "%Y-%m-%d").date()
+    if d1 < d0:
+        raise ValueError(f"end date is before start date: {start} > {end}")
+    return [(d0 + timedelta(days=i)).isoformat() for i in range((d1 - d0).days + 1)]
+
+def _annotation_row(date: str, pid: str, card: dict):
+    labels = card.get("labels", [])
+    labels_json = json.dumps(labels, ensure_ascii=False)
+
+    card_json = json.dumps(card, ensure_ascii=False)
+    return date, pid, labels_json, card_json
+
+def _store_fetched(date: str, state, res) -> str:
+    etag, last_modified, _ = state
+    if res.raw is None:
+        if (res.etag, res.last_modified) != (etag, last_modified):
+            put_fetch_state(date, res.etag, res.last_modified, res.content_hash)
+        return f"unchanged(HTTP {res.status})"
+
+    papers = parse_hf_raw(res.raw)
+    changed = upsert_papers(date, papers)
+    put_fetch_state(date, res.etag, res.last_modified, res.content_hash)
+    return f"fetched={len(papers)} changed={changed}"
+
+def _fetch(date: str, state):
+    etag, last_modified, known_hash = state
+    return fetch_hf_daily_conditional(date, etag=etag, last_modified=last_modified, known_hash=known_hash)
+
+def fetch_and_store(date: str) -> str:
+    """HF 조건부 fetch. 내용이 바뀐 경우에만 parse + upsert (바뀐 행만). 진행 상황 문자열 반환."""
+    state = get_fetch_state(date)
+    return _store_fetched(date, state, _fetch(date, state))
+
+def fetch_range(start: str, end: str, workers: int = 8) -> list:
+    """여러 날짜를 동시에 fetch (네트워크만 병렬), 끝나는 날짜부터 메인 스레드에서 저장. 실패한 날짜 반환."""
+    init_db()
+    dates = date_range(start, end)
+    states = {d: get_fetch_state(d) for d in dates}
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = {ex.submit(_fetch, d, states[d]): d for d in dates}
+        for idx, fut in enumerate(as_completed(futures), 1):
+            d = futures[fut]
+            try:
+                status = _store_fetched(d, states[d], fut.result())
+            except Exception as e:
+                failed.append(d)
+                print(f"[{idx}/{len(dates)}] date={d} fail ({e})")
+                continue
+            print(f"[{idx}/{len(dates)}] date={d} {status}")
+    return failed
+
+def _parse_archived(date: str) -> list:
+    # process pool worker: archive에서 읽어서 parse만 (DB 쓰기는 부모 프로세스가 모아서 한다)
+    stream = open_raw(date)
+    if stream is None:
+        raise FileNotFoundError(f"no archived raw for {date}")
+    with stream:
+        return list(iter_hf_papers(stream))
+
+def _iter_parsed(dates: list, workers: int):
+    """(date, papers 또는 예외)를 parse가 끝나는 순서대로."""
+    if workers <= 1:
+        # 한 프로세스에서 할 때는 월 segment를 한 번씩만 열고 날짜 순으로 읽는다 (dates는 archived_dates 결과라 정렬돼 있음)
+        for d, raw in iter_raw(dates[0], dates[-1]):
+            try:
+                yield d, parse_hf_raw(raw)
+            except Exception as e:
+                yield d, e
+        return
+
+    # 부모가 쓰는 속도보다 너무 앞서 나가지 않도록 동시에 걸어두는 날짜 수를 제한
+    todo = iter(dates)
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        pending = {}
+        while True:
+            for d in todo:
+                pending[ex.submit(_parse_archived, d)] = d
+                if len(pending) >= workers * 2:
+                    break
+            if not pending:
+                return
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                yield pending.pop(fut), fut.exception() or fut.result()
+
+def _parsed(dates: list, workers: int, failed: list):
+    for idx, (d, res) in enumerate(_iter_parsed(dates, workers), 1):
+        if isinstance(res, Exception):
+            failed.append(d)
+            print(f"[{idx}/{len(dates)}] date={d} fail ({res})")
+            continue
+        print(f"[{idx}/{len(dates)}] date={d} parsed={len(res)}")
+        yield d, res
+
+def reparse_range(start: str, end: str, workers: int = 0) -> list:
+    """네트워크 없이 archive에 있는 raw만 다시 parse해서 DB에 반영. 실패한 날짜 반환.
+    parse는 process pool에서 날짜별로 병렬, DB 쓰기는 이 프로세스에서 여러 날짜씩 한 transaction으로."""
     init_db()
+    dates = archived_dates(start, end)
+    if not dates:
+        print(f"No archived raw in {start}..{end} (run fetch-range or archive-migrate first)")
+        return []
 
-    raw = fetch_hf_daily(date, save_raw=True)
-    papers = parse_hf_raw(raw)
-    upsert_papers(date, papers)
+    failed: list = []
+    written = upsert_papers_bulk(_parsed(dates, workers or os.cpu_count() or 1, failed))
+    changed = {d: n for d, n in written.items() if n}
+    print(f"[OK] reparsed {len(written)} date(s), changed rows={sum(changed.values())} in {len(changed)} date(s)")
+    return failed
+
+def run_for_date(
+    date: str,
+    workers: int = 1,
+    batch_size: int = 1,
+    use_async: bool = False,
+    rpm: int = 0,
+    tpm: int = 0,
+):
+    if use_async and batch_size > 1:
+        raise ValueError("--async does not support --batch-size > 1")
+
+    init_db()
+
+    fetched = fetch_and_store(date)
 
     todo = list_unannotated(date)
-    print(f"date={date} fetched={len(papers)} to_analyze={len(todo)}")
+    mode = "async" if use_async else f"workers={workers} batch_size={batch_size}"
+    print(f"date={date} {fetched} to_analyze={len(todo)} {mode}")
+
+    failed = analyze_todo(date, todo, workers, batch_size, use_async, rpm, tpm) if todo else []
+    _translate_keywords(date)
+    _embed_new(date)
+
+    if failed:
+        raise RuntimeError(f"analyze failed for {len(failed)} paper(s): {', '.join(failed)}")
+
+def analyze_todo(date: str, todo, workers: int, batch_size: int, use_async: bool, rpm: int, tpm: int) -> list:
+    """todo 논문을 분석해서 저장. 실패한 pid 목록 반환."""
+    failed = []
+    done = 0
+
+    def on_done(p, card, err, flush=True):
+        # 끝난 카드는 메모리에 쌓아두지 않고 바로 commit (WAL + synchronous=NORMAL이라 카드당 트랜잭션도 싸다)
+        nonlocal done
+        done += 1
+        if err is not None:
+            failed.append(p.pid)
+            print(f"[{done}/{len(todo)}] fail: {p.pid} ({err})")
+            return
+        writer.add(*_annotation_row(date, p.pid, card))
+        if flush:
+            writer.flush()
+        print(f"[{done}/{len(todo)}] ok: {p.pid}")
+
+    with AnnotationWriter() as writer:
+        if use_async:
+            from .async_agent import analyze_many
+
+            analyze_many(
+                todo,
+                on_done,
+                concurrency=workers if workers > 1 else None,
+                rpm=rpm or None,
+                tpm=tpm or None,
+            )
+        else:
+            client = OpenAI(api_key=SETTINGS.openai_api_key)
+
+            if workers <= 1 and batch_size <= 1:
+                for p in todo:
+                    on_done(p, analyze_paper(client, p), None)
+            else:
+                # 동시에 최대 workers개 요청만 in-flight, 끝나는 대로 메인 스레드의 writer로 저장 (요청 하나 = commit 하나)
+                # batch_size > 1이면 요청 하나에 논문 여러 편 (검증 실패분은 개별 재요청)
+                if batch_size > 1:
+                    task = analyze_batch
+                    chunks = [todo[i:i + batch_size] for i in range(0, len(todo), batch_size)]
+                else:
+                    task = lambda c, chunk: [(chunk[0], analyze_paper(c, chunk[0]), None)]
+                    chunks = [[p] for p in todo]
+
+                with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                    futures = {ex.submit(task, client, chunk): chunk for chunk in chunks}
+                    for fut in as_completed(futures):
+                        try:
+                            results = fut.result()
+                        except Exception as e:
+                            results = [(p, None, e) for p in futures[fut]]
+                        for p, card, err in results:
+                            on_done(p, card, err, flush=False)
+                        writer.flush()
+
+    _evict_cache()
+    return failed
 
-    client = OpenAI(api_key=SETTINGS.openai_api_key)
+TRANSLATE_CHUNK = 100
 
-    for idx, p in enumerate(todo, 1):
-        card = analyze_paper(client, p)
+def translate_keywords(date: str, client=None) -> int:
+    """영어가 아닌 keywords가 있는 카드만 모아서 번역 후 card_json에 저장. 바뀐 카드 수 반환."""
+    cards = {}
+    for pid, labels_json, card_json in load_annotations(date):
+        try:
+            card = json.loads(card_json) if card_json else {}
+        except Exception:
+            continue
+        if isinstance(card, dict) and needs_translation(card.get("keywords")):
+            cards[pid] = (labels_json, card)
+    if not cards:
+        return 0
 
-        labels = card.get("labels", [])
-        labels_json = json.dumps(labels, ensure_ascii=False)
+    client = client or OpenAI(api_key=SETTINGS.openai_api_key)
+    pids = list(cards)
+    n = 0
+    for i in range(0, len(pids), TRANSLATE_CHUNK):
+        part = {pid: [str(k) for k in cards[pid][1]["keywords"]] for pid in pids[i:i + TRANSLATE_CHUNK]}
+        rows = []
+        for pid, kws in translate_keywords_batch(client, part).items():
+            labels_json, card = cards[pid]
+            card["keywords"] = kws
+            rows.append((date, pid, labels_json, json.dumps(card, ensure_ascii=False)))
+        # chunk마다 바로 저장 (뒤 chunk가 실패해도 앞에서 번역한 건 남음)
+        upsert_annotations(rows)
+        n += len(rows)
+    return n
 
-        card_json = json.dumps(card, ensure_ascii=False)
-        upsert_annotation(date, p.pid, labels_json, card_json)
+def _translate_keywords(date: str):
+    # 대시보드가 렌더링 중에 LLM을 부르지 않도록 여기서 미리 번역해 둔다
+    try:
+        n = translate_keywords(date)
+        if n:
+            print(f"keywords translated={n}")
+    except Exception as e:
+        print(f"keyword translate fail ({e})")
 
-        print(f"[{idx}/{len(todo)}] ok: {p.pid}")
+def _embed_new(date: str):
+    # related papers용 임베딩 (실패해도 분석 결과에는 영향 없음)
+    try:
+        n = embed_new(date)
+        if n:
+            print(f"embedded={n}")
+    except Exception as e:
+        print(f"embed fail ({e})")
+
+def _evict_cache():
+    cache = get_cache()
+    if cache:
+        removed = cache.evict()
+        if removed:
+            print(f"llm cache: evicted {removed}")
+
+def backfill(start: str, end: str, fetch: bool = True, poll_sec: float = 30.0, batch_id: str = "", client=None):
+    """날짜 범위의 미분석 논문을 OpenAI Batch API 한 번으로 처리 (daily run과 별개)."""
+    from .batch import build_batch_file, iter_batch_results, submit_batch, wait_batch
+
+    init_db()
+    client = client or OpenAI(api_key=SETTINGS.openai_api_key)
+
+    written = set()
+    if not batch_id:
+        items = []
+        skip = set(fetch_range(start, end)) if fetch else set()
+        for d in date_range(start, end):
+            if d in skip:
+                continue
+            todo = list_unannotated(d)
+            hits = []
+            for p in todo:
+                card = cached_card(p)
+                if card is not None:
+                    hits.append(_annotation_row(d, p.pid, card))
+                else:
+                    items.append((d, p))
+            upsert_annotations(hits)
+            if hits:
+                written.add(d)
+            print(f"date={d} to_analyze={len(todo) - len(hits)} cache_hits={len(hits)}")
+
+        if not items:
+            print("nothing to analyze")
+            for d in sorted(written):
+                _translate_keywords(d)
+            return
+
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        path = PATHS.batches / f"backfill_{start}_{end}_{stamp}.jsonl"
+        build_batch_file(items, path)
+        batch_id = submit_batch(client, path)
+        print(f"batch submitted: {batch_id} requests={len(items)} file={path}")
+
+    batch = wait_batch(client, batch_id, poll_sec)
+
+    rows = []
+    failed = 0
+    papers = {}
+    for d, pid, card, err in iter_batch_results(client, batch):
+        if card is None:
+            failed += 1
+            print(f"fail: {d} {pid} ({err})")
+            continue
+        if d not in papers:
+            papers[d] = {p.pid: p for p in list_unannotated(d)}
+        if pid in papers[d]:
+            store_card(papers[d][pid], card)
+        rows.append(_annotation_row(d, pid, card))
+        written.add(d)
+    upsert_annotations(rows)
+    print(f"batch={batch_id} status={batch.status} ingested={len(rows)} failed={failed}")
+    _evict_cache()
+    for d in sorted(written):
+        _translate_keywords(d)
+
+def cache_stats(evict: bool = False):
+    cache = get_cache()
+    if cache is None:
+        print("llm cache disabled (LLM_CACHE=0)")
+        return
+    if evict:
+        print(f"evicted={cache.evict()}")
+    stats = cache.stats()
+    lookups = stats["hits"] + stats["misses"]
+    ratio = stats["hits"] / lookups if lookups else 0.0
+    print(f"entries={stats['entries']} hits={stats['hits']} misses={stats['misses']} hit_ratio={ratio:.2%} evictions={stats['evictions']}")
 
 def show_for_date(date: str):
     init_db()
@@ -48,8 +380,83 @@ def show_for_date(date: str):
         for line in buckets[lb]:
             print("- " + line)
 
-def run_yesterday():
-    run_for_date(yesterday_kst())
+def show_label(label: str = "", days: int = 90, min_confidence: float = 0.0):
+    init_db()
+    end = yesterday_kst()
+    start = (datetime.strptime(end, "%Y-%m-%d") - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    if not label:
+        # 라벨을 안 주면 기간 내 라벨별 논문 수
+        print(f"== labels ({start} ~ {end}) ==")
+        for lb, n in label_counts(start, end):
+            print(f"- {lb}: {n}")
+        return
+    rows = list_papers_by_label(label, start, end, min_confidence=min_confidence)
+    print(f"== {label} ({start} ~ {end}, {len(rows)}) ==")
+    for d, pid, title, _, conf in rows:
+        score = f" [{conf:.2f}]" if conf is not None else ""
+        print(f"- {d}  {title}  ({pid}){score}")
+
+def search(query: str, limit: int = 20, start: str = "", end: str = ""):
+    init_db()
+    rows = search_papers(query, limit=limit, start=start or None, end=end or None)
+    print(f"== search: {query} ({len(rows)}) ==")
+    for d, pid, title, _, score in rows:
+        print(f"- {d}  {title}  ({pid}) [{-score:.2f}]")
+
+def translate_keywords_for_date(date: str):
+    init_db()
+    print(f"date={date} keywords translated={translate_keywords(date)}")
+
+def embed(date: str = ""):
+    init_db()
+    print(f"embedded={embed_new(date or None)}")
+
+def show_similar(pid: str, date: str = "", k: int = 10):
+    init_db()
+    date = date or latest_date_for(pid)
+    if not date:
+        print(f"unknown pid: {pid}")
+        return
+    rows = similar_papers(date, pid, k=k)
+    print(f"== similar to {pid} ({date}) ==")
+    for d, p, title, _, score in rows:
+        print(f"- {d}  {title}  ({p}) [{score:.3f}]")
+
+def fetch_range_cmd(start: str, end: str, workers: int = 8):
+    failed = fetch_range(start, end, workers=workers)
+    if failed:
+        raise RuntimeError(f"fetch failed for {len(failed)} date(s): {', '.join(sorted(failed))}")
+
+def reparse_cmd(start: str, end: str, workers: int = 0):
+    failed = reparse_range(start, end, workers=workers)
+    if failed:
+        raise RuntimeError(f"reparse failed for {len(failed)} date(s): {', '.join(sorted(failed))}")
+
+def zotero_sync_cmd(date: str, label: str = "", workers: int = 4):
+    from .zotero import sync_to_zotero
+
+    init_db()
+    res = sync_to_zotero(date, label=label, workers=workers)
+    for line in res["logs"]:
+        print(line)
+    for pid, err in sorted(res["failed"].items()):
+        print(f"- FAILED {pid}: {err[:200]}")
+    print(f"[OK] created={res['created']} skipped={res['skipped']} failed={len(res['failed'])}")
+
+def jobs_cmd(work: bool = False, workers: int = 4):
+    if work:
+        jobs.drain(jobs.default_handlers(), workers=workers)
+    n = jobs.counts()
+    print(" ".join(f"{status}={n.get(status, 0)}" for status in (jobs.QUEUED, jobs.RUNNING, jobs.DONE, jobs.FAILED)))
+    for kind, key, attempts, err in jobs.recent_failures():
+        print(f"- FAILED {kind} {key} attempts={attempts}: {err[:200]}")
+
+def archive_migrate(keep: bool = False):
+    moved = migrate_legacy(delete=not keep)
+    print(f"[OK] archived {moved} raw file(s) into {PATHS.raw}")
+
+def run_yesterday(**kwargs):
+    run_for_date(yesterday_kst(), **kwargs)
 
 def show_yesterday():
     show_for_date(yesterday_kst())
@@ -0,0 +1,63 @@
+import asyncio
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """분당 rate로 채워지는 token bucket. acquire는 FIFO 순서로 대기한다."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0):
+        amount = min(float(amount), self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= amount:
+                        self.tokens -= amount
+                        return
+                    wait = (amount - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+
+    def adjust(self, delta: float):
+        # 예상치와 실제 사용량 차이 보정 (음수면 환불)
+        self._refill(time.monotonic())
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def pause(self, seconds: float):
+        self.blocked_until = max(self.blocked_until, time.monotonic() + max(0.0, seconds))
+
+
+class RateLimiter:
+    """requests-per-minute + tokens-per-minute 두 bucket을 함께 관리."""
+
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    async def acquire(self, est_tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(est_tokens)
+
+    def settle(self, est_tokens: int, used_tokens: int):
+        self.tokens.adjust(used_tokens - est_tokens)
+
+    def pause(self, seconds: float):
+        # 429 + Retry-After: 모든 요청을 함께 멈춘다
+        self.requests.pause(seconds)
+        self.tokens.pause(seconds)
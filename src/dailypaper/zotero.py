@@ -0,0 +1,497 @@
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from .config import PATHS, SETTINGS
+from .db import load_card_dicts
+from .httpclient import session
+from .pdfcache import CachedPdf, ChainedBody, cached_pdf, sanitize_filename, to_pdf_url
+
+ZOTERO_API_KEY = SETTINGS.zotero_api_key
+ZOTERO_USER_ID = SETTINGS.zotero_user_id
+ZOTERO_API_BASE = SETTINGS.zotero_api_base.rstrip("/")
+ZOTERO_WRITE_BATCH = 50  # POST /items 한 번에 넣을 수 있는 최대 개수
+
+class ZoteroSyncError(RuntimeError):
+    def __init__(self, message: str, logs: list[str] | None = None):
+        super().__init__(message)
+        self.logs = logs or []
+
+ZOTERO_FAVORITE_COLLECTION = "DailyPaperFavorite"
+
+def _zotero_url(path: str) -> str:
+    return f"{ZOTERO_API_BASE}/users/{ZOTERO_USER_ID}{path}"
+
+# collection key 캐시 (data/db/zotero_collections.json): 라이브러리 전체 collection 목록을 library version과 함께 저장.
+# TTL 안에서는 네트워크 없이 찾고, TTL이 지나면 If-Modified-Since-Version으로 바뀐 게 있을 때만 다시 받는다.
+COLLECTION_TTL_SEC = 600
+_COLL_LOCK = threading.RLock()
+_COLL_CACHE: dict = {}
+
+def _load_collection_cache() -> dict:
+    global _COLL_CACHE
+    if _COLL_CACHE.get("user") == ZOTERO_USER_ID and _COLL_CACHE.get("path") == str(PATHS.zotero_collections):
+        return _COLL_CACHE
+    cache = {"user": ZOTERO_USER_ID, "version": 0, "checked_at": 0.0, "collections": {}}
+    try:
+        saved = json.loads(PATHS.zotero_collections.read_text(encoding="utf-8"))
+        if saved.get("user") == ZOTERO_USER_ID:
+            cache.update({k: saved[k] for k in ("version", "checked_at", "collections") if k in saved})
+    except (FileNotFoundError, ValueError):
+        pass
+    cache["path"] = str(PATHS.zotero_collections)
+    _COLL_CACHE = cache
+    return cache
+
+def _save_collection_cache(cache: dict):
+    PATHS.zotero_collections.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PATHS.zotero_collections.with_suffix(".tmp")
+    tmp.write_text(json.dumps({k: v for k, v in cache.items() if k != "path"}, ensure_ascii=False), encoding="utf-8")
+    tmp.replace(PATHS.zotero_collections)
+
+def _revalidate_collections(cache: dict, force: bool = False) -> bool:
+    """TTL이 지났거나 force면 서버에 확인. 실제로 확인했으면 True."""
+    if not force and time.time() - cache["checked_at"] < COLLECTION_TTL_SEC:
+        return False
+    rows, version = _zotero_get_all("/collections?format=json", since_version=cache["version"])
+    if rows is not None:
+        cache["collections"] = {
+            str(row["data"].get("key") or row.get("key")): {
+                "name": str(row["data"].get("name") or "").strip(),
+                "parent": str(row["data"].get("parentCollection") or ""),
+            }
+            for row in rows
+            if isinstance(row, dict) and isinstance(row.get("data"), dict)
+        }
+    cache["version"] = version
+    cache["checked_at"] = time.time()
+    _save_collection_cache(cache)
+    return True
+
+def _find_collection(cache: dict, name: str, parent_key: str | None) -> str:
+    for key, c in cache["collections"].items():
+        if c["name"] == name and c["parent"] == (parent_key or ""):
+            return key
+    return ""
+
+def zotero_collection_key_by_name(name: str, parent_key: str | None = None) -> str:
+    collection_name = (name or "").strip()
+    if not collection_name or not (ZOTERO_API_KEY and ZOTERO_USER_ID):
+        return ""
+    with _COLL_LOCK:
+        cache = _load_collection_cache()
+        checked = _revalidate_collections(cache)
+        key = _find_collection(cache, collection_name, parent_key)
+        if not key and not checked:
+            # 캐시에 없으면 다른 곳에서 새로 만들었을 수 있으니 한 번 더 확인
+            _revalidate_collections(cache, force=True)
+            key = _find_collection(cache, collection_name, parent_key)
+        return key
+
+def zotero_get_or_create_collection(name: str, parent_key: str | None, logs: list[str]) -> str:
+    """Get existing collection key or create it. parent_key=None means top-level."""
+    name = (name or "").strip()
+    if not name:
+        return ""
+    # 찾기 ~ 만들기 사이에 다른 worker가 같은 collection을 만들지 않도록 lock 안에서
+    with _COLL_LOCK:
+        key = zotero_collection_key_by_name(name, parent_key)
+        if key:
+            logs.append(f"collection:found name={name} key={key}")
+            return key
+        payload = {"name": name, "parentCollection": parent_key if parent_key else False}
+        logs.append(f"collection:create name={name} parent={parent_key or 'root'}")
+        res = _zotero_post_json("/collections", [payload], timeout=30)
+        key = _zotero_created_key(res)
+        if key:
+            logs.append(f"collection:created key={key}")
+            cache = _load_collection_cache()
+            cache["collections"][key] = {"name": name, "parent": parent_key or ""}
+            _save_collection_cache(cache)
+        return key
+
+def _zotero_api_headers(extra: dict | None = None) -> dict:
+    headers = {
+        "Zotero-API-Key": ZOTERO_API_KEY,
+        "Zotero-API-Version": "3",
+    }
+    if extra:
+        headers.update(extra)
+    return headers
+
+def _zotero_send(method: str, url: str, failure: str, **kwargs) -> requests.Response:
+    """공유 세션으로 요청. 연결 실패나 4xx/5xx는 응답 본문(없으면 failure 메시지)을 담은 RuntimeError로."""
+    try:
+        r = session().request(method, url, **kwargs)
+    except requests.RequestException as e:
+        raise RuntimeError(f"{failure}: {e}") from e
+    if r.status_code >= 400:
+        raise RuntimeError(r.text or f"{failure}: HTTP {r.status_code}")
+    return r
+
+def _zotero_post_json(path: str, payload, timeout: int = 30):
+    r = _zotero_send(
+        "POST",
+        _zotero_url(path),
+        "Zotero HTTP",
+        data=json.dumps(payload).encode("utf-8"),
+        headers=_zotero_api_headers({"Content-Type": "application/json"}),
+        timeout=timeout,
+    )
+    return r.json() if r.text.strip() else {}
+
+def _zotero_delete_item(item_key: str, timeout: int = 20):
+    if not item_key:
+        return
+    _zotero_send("DELETE", _zotero_url(f"/items/{item_key}"), "Zotero delete", headers=_zotero_api_headers(), timeout=timeout)
+
+def _zotero_created_key(write_result: dict) -> str:
+    successful = write_result.get("successful", {}) if isinstance(write_result, dict) else {}
+    row = successful.get("0")
+    if isinstance(row, str):
+        return row
+    if isinstance(row, dict):
+        data = row.get("data", {}) if isinstance(row.get("data"), dict) else {}
+        return str(row.get("key") or data.get("key") or "").strip()
+    return ""
+
+def _zotero_upload_attachment_file(attachment_key: str, filename: str, pdf: CachedPdf, logs: list[str] | None = None):
+    logs = logs if logs is not None else []
+    if not attachment_key:
+        raise RuntimeError("Missing Zotero attachment key")
+    if not pdf.size:
+        raise RuntimeError("Empty PDF file")
+
+    logs.append(f"upload_auth:start attachment={attachment_key} bytes={pdf.size}")
+    r = _zotero_send(
+        "POST",
+        _zotero_url(f"/items/{attachment_key}/file"),
+        "Zotero upload auth failed",
+        headers=_zotero_api_headers({"If-None-Match": "*"}),
+        data={
+            "md5": pdf.md5,
+            "filename": filename,
+            "filesize": str(pdf.size),
+            "mtime": str(int(time.time() * 1000)),
+        },
+        timeout=30,
+    )
+    auth = r.json() if r.text.strip() else {}
+    logs.append(f"upload_auth:ok exists={bool(auth.get('exists'))}")
+
+    if auth.get("exists"):
+        logs.append("upload_auth:exists (already uploaded)")
+        return
+
+    upload_url = str(auth.get("url") or "").strip()
+    upload_key = str(auth.get("uploadKey") or "").strip()
+    if not upload_url or not upload_key:
+        raise RuntimeError(f"Invalid Zotero upload auth response: {auth}")
+
+    prefix = auth.get("prefix", "")
+    suffix = auth.get("suffix", "")
+    content_type = str(auth.get("contentType") or "application/octet-stream")
+    # prefix + 캐시 파일 + suffix를 이어서 스트리밍 (PDF 전체를 메모리에 다시 만들지 않음)
+    upload_body = ChainedBody([
+        prefix.encode("utf-8") if isinstance(prefix, str) else bytes(prefix),
+        pdf.path,
+        suffix.encode("utf-8") if isinstance(suffix, str) else bytes(suffix),
+    ])
+    logs.append("upload_binary:start")
+    with upload_body:
+        r = _zotero_send(
+            "POST",
+            upload_url,
+            "Zotero file upload failed",
+            headers={"Content-Type": content_type},
+            data=upload_body,
+            timeout=(10, 120),
+        )
+    logs.append(f"upload_binary:ok status={r.status_code}")
+
+    logs.append("upload_register:start")
+    r = _zotero_send(
+        "POST",
+        _zotero_url(f"/items/{attachment_key}/file"),
+        "Zotero file register failed",
+        headers=_zotero_api_headers({"If-None-Match": "*"}),
+        data={"upload": upload_key},
+        timeout=30,
+    )
+    logs.append(f"upload_register:ok status={r.status_code}")
+
+def _zotero_item(card: dict, fallback_date: str) -> dict:
+    pid = str(card.get("pid") or "").strip()
+    title = str(card.get("title") or "").strip() or (pid or "Untitled")
+    raw_url = str(card.get("url") or "").strip()
+    abs_url = raw_url.strip()
+    if not abs_url and pid:
+        abs_url = f"https://arxiv.org/abs/{pid}"
+    if abs_url and not abs_url.startswith(("http://", "https://")):
+        abs_url = "https://" + abs_url
+    doi = f"10.48550/arXiv.{pid}" if pid else ""
+    analyzed = card.get("card") if isinstance(card.get("card"), dict) else {}
+    one_liner = str(analyzed.get("one_liner") or "").strip()
+    raw_summary = str(card.get("raw_summary") or "").strip()
+    abstract_note = "\n\n".join(s for s in [one_liner, raw_summary] if s)[:20000]
+    tags = [{"tag": str(lb)} for lb in (card.get("labels") or []) if str(lb).strip()]
+
+    return {
+        "itemType": "preprint",
+        "title": title,
+        "abstractNote": abstract_note,
+        "repository": "arXiv" if pid else "",
+        "archiveID": f"arXiv:{pid}" if pid else "",
+        "date": str(card.get("published_at") or card.get("date") or fallback_date or ""),
+        "DOI": doi,
+        "url": abs_url,
+        "accessDate": "CURRENT_TIMESTAMP",
+        "libraryCatalog": "arXiv.org" if pid else "",
+        "language": "en",
+        "extra": f"arXiv: {pid}" if pid else "",
+        "tags": tags,
+    }
+
+def _zotero_attachment(parent_key: str, filename: str) -> dict:
+    return {
+        "itemType": "attachment",
+        "linkMode": "imported_file",
+        "title": "PDF",
+        "parentItem": parent_key,
+        "accessDate": "CURRENT_TIMESTAMP",
+        "contentType": "application/pdf",
+        "filename": filename,
+    }
+
+def _pdf_filename(card: dict) -> str:
+    pid = str(card.get("pid") or "").strip()
+    title = str(card.get("title") or "").strip() or (pid or "Untitled")
+    return sanitize_filename(title or pid, fallback=(pid or "paper")) + ".pdf"
+
+def _favorite_date_collection(paper_date: str, logs: list[str]) -> str:
+    # 내 라이브러리/DailyPaperFavorite/날짜 구조로 저장
+    logs.append("collection:DailyPaperFavorite/date structure")
+    parent_coll = zotero_get_or_create_collection(ZOTERO_FAVORITE_COLLECTION, None, logs)
+    if not parent_coll:
+        return ""
+    return zotero_get_or_create_collection(paper_date, parent_coll, logs)
+
+def _rollback(keys: list[tuple[str, str]], logs: list[str]):
+    # (kind, key) 목록, attachment -> parent 순서로 넘겨야 함
+    rollback_errors = []
+    for kind, key in keys:
+        if not key:
+            continue
+        try:
+            _zotero_delete_item(key)
+            logs.append(f"rollback:deleted {kind}={key}")
+        except Exception as de:
+            rollback_errors.append(f"{kind}={key}: {de}")
+    if rollback_errors:
+        logs.append("rollback:failed " + " | ".join(rollback_errors))
+
+def add_to_zotero(card: dict, fallback_date: str):
+    if not (ZOTERO_API_KEY and ZOTERO_USER_ID):
+        raise RuntimeError("Zotero env is not configured")
+
+    logs: list[str] = []
+    parent_key = ""
+    attachment_key = ""
+    pid = str(card.get("pid") or "").strip()
+    pdf_url = to_pdf_url(pid, str(card.get("url") or "").strip())
+    item = _zotero_item(card, fallback_date)
+
+    paper_date = str(card.get("date") or fallback_date or "").strip()
+    if paper_date:
+        date_coll = _favorite_date_collection(paper_date, logs)
+        if date_coll:
+            item["collections"] = [date_coll]
+            logs.append(f"collection:assigned date_key={date_coll}")
+
+    try:
+        logs.append("parent_create:start")
+        parent_res = _zotero_post_json("/items", [item], timeout=30)
+        parent_key = _zotero_created_key(parent_res)
+        if not parent_key:
+            raise RuntimeError(f"Failed to create Zotero item: {parent_res}")
+        logs.append(f"parent_create:ok key={parent_key}")
+
+        if not pdf_url:
+            logs.append("pdf_url:missing (metadata-only item)")
+            return {"parent": parent_res, "attachment": None, "logs": logs}
+
+        logs.append(f"pdf_download:start url={pdf_url}")
+        pdf = cached_pdf(pid, pdf_url)
+        logs.append(f"pdf_download:ok bytes={pdf.size} md5={pdf.md5}")
+        filename = _pdf_filename(card)
+        logs.append("attachment_create:start")
+        attach_res = _zotero_post_json("/items", [_zotero_attachment(parent_key, filename)], timeout=30)
+        attachment_key = _zotero_created_key(attach_res)
+        if not attachment_key:
+            raise RuntimeError(f"Failed to create Zotero attachment item: {attach_res}")
+        logs.append(f"attachment_create:ok key={attachment_key}")
+
+        _zotero_upload_attachment_file(attachment_key, filename, pdf, logs=logs)
+        logs.append("zotero_sync:done")
+        return {"parent": parent_res, "attachment": attach_res, "logs": logs}
+    except Exception as e:
+        _rollback([("attachment", attachment_key), ("parent", parent_key)], logs)
+        raise ZoteroSyncError(str(e), logs=logs) from e
+
+def _zotero_get_json(path: str, timeout: int = 30, headers: dict | None = None):
+    """GET 결과 (json, 응답 헤더). 304 Not Modified면 json 자리에 None."""
+    r = _zotero_send("GET", _zotero_url(path), "Zotero HTTP", headers=_zotero_api_headers(headers), timeout=timeout)
+    if r.status_code == 304:
+        return None, r.headers
+    return json.loads(r.text or "null"), r.headers
+
+def _zotero_get_all(path: str, limit: int = 100, since_version: int = 0):
+    """start/limit으로 Total-Results까지 전부 가져온다. (rows, library version) 반환.
+    since_version을 주면 그 뒤로 바뀐 게 없을 때 rows 자리에 None (첫 페이지 요청 한 번으로 끝남)."""
+    rows: list = []
+    version = since_version
+    sep = "&" if "?" in path else "?"
+    while True:
+        cond = {"If-Modified-Since-Version": str(since_version)} if since_version and not rows else None
+        page, headers = _zotero_get_json(f"{path}{sep}limit={limit}&start={len(rows)}", headers=cond)
+        if page is None:
+            return None, since_version
+        version = int(headers.get("Last-Modified-Version") or version)
+        page = page if isinstance(page, list) else []
+        rows.extend(page)
+        total = int(headers.get("Total-Results") or 0)
+        if not page or len(rows) >= total:
+            return rows, version
+
+def _arxiv_id(data: dict) -> str:
+    archive_id = str(data.get("archiveID") or "")
+    if archive_id.startswith("arXiv:"):
+        return archive_id[len("arXiv:"):].strip()
+    m = re.search(r"arXiv:\s*(\S+)", str(data.get("extra") or ""))
+    if m:
+        return m.group(1)
+    doi = str(data.get("DOI") or "")
+    return doi.split("arXiv.", 1)[1] if "arXiv." in doi else ""
+
+def zotero_collection_arxiv_ids(collection_key: str) -> set:
+    rows, _ = _zotero_get_all(f"/collections/{collection_key}/items/top?format=json")
+    ids = {_arxiv_id(row.get("data", {})) for row in rows if isinstance(row, dict)}
+    ids.discard("")
+    return ids
+
+def _zotero_created_keys(write_result: dict, n: int) -> list[str]:
+    """POST /items 결과에서 요청 순서대로 생성된 key (실패한 항목은 "")."""
+    successful = write_result.get("successful", {}) if isinstance(write_result, dict) else {}
+    keys = []
+    for i in range(n):
+        row = successful.get(str(i))
+        if isinstance(row, str):
+            keys.append(row)
+        elif isinstance(row, dict):
+            data = row.get("data", {}) if isinstance(row.get("data"), dict) else {}
+            keys.append(str(row.get("key") or data.get("key") or "").strip())
+        else:
+            keys.append("")
+    return keys
+
+def _zotero_post_items(items: list[dict], logs: list[str], what: str) -> list[str]:
+    keys: list[str] = []
+    for i in range(0, len(items), ZOTERO_WRITE_BATCH):
+        part = items[i:i + ZOTERO_WRITE_BATCH]
+        res = _zotero_post_json("/items", part, timeout=60)
+        part_keys = _zotero_created_keys(res, len(part))
+        failed = res.get("failed", {}) if isinstance(res, dict) else {}
+        logs.append(f"{what}_create:batch size={len(part)} ok={sum(1 for k in part_keys if k)} failed={len(failed)}")
+        keys.extend(part_keys)
+    return keys
+
+def bulk_add_to_zotero(cards: list[dict], fallback_date: str, workers: int = 4) -> dict:
+    """여러 논문을 한 번에: 이미 날짜 collection에 있는 arXiv id는 건너뛰고,
+    parent item을 50개씩, attachment를 50개씩 만든 뒤 PDF는 workers개씩 동시에 업로드."""
+    if not (ZOTERO_API_KEY and ZOTERO_USER_ID):
+        raise RuntimeError("Zotero env is not configured")
+
+    logs: list[str] = []
+    failed: dict[str, str] = {}
+    skipped = 0
+    todo: list[dict] = []
+
+    by_date: dict[str, list[dict]] = {}
+    for card in cards:
+        by_date.setdefault(str(card.get("date") or fallback_date or "").strip(), []).append(card)
+
+    items = []
+    for paper_date, group in by_date.items():
+        coll = _favorite_date_collection(paper_date, logs) if paper_date else ""
+        existing = zotero_collection_arxiv_ids(coll) if coll else set()
+        for card in group:
+            pid = str(card.get("pid") or "").strip()
+            if pid and pid in existing:
+                skipped += 1
+                continue
+            existing.add(pid)
+            item = _zotero_item(card, fallback_date)
+            if coll:
+                item["collections"] = [coll]
+            todo.append(card)
+            items.append(item)
+    logs.append(f"bulk:todo={len(todo)} skipped={skipped}")
+
+    parent_keys = _zotero_post_items(items, logs, "parent")
+    pdf_urls = [to_pdf_url(str(c.get("pid") or "").strip(), str(c.get("url") or "").strip()) for c in todo]
+
+    def fetch_pdf(i: int):
+        return cached_pdf(str(todo[i].get("pid") or "").strip(), pdf_urls[i])
+
+    # PDF 받기 (캐시에 있으면 바로), 실패한 논문은 parent를 지워서 다음 sync 때 다시 시도되게
+    with_pdf = [i for i, k in enumerate(parent_keys) if k and pdf_urls[i]]
+    pdfs = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = {ex.submit(fetch_pdf, i): i for i in with_pdf}
+        for fut in as_completed(futures):
+            i = futures[fut]
+            try:
+                pdfs[i] = fut.result()
+            except Exception as e:
+                failed[todo[i].get("pid", "")] = f"pdf: {e}"
+                _rollback([("parent", parent_keys[i])], logs)
+    for i, k in enumerate(parent_keys):
+        if not k:
+            failed[todo[i].get("pid", "")] = "parent create failed"
+
+    order = sorted(pdfs)
+    attach_keys = _zotero_post_items(
+        [_zotero_attachment(parent_keys[i], _pdf_filename(todo[i])) for i in order], logs, "attachment"
+    )
+
+    def upload(i: int, attachment_key: str):
+        _zotero_upload_attachment_file(attachment_key, _pdf_filename(todo[i]), pdfs[i], logs=logs)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+        futures = {}
+        for i, attachment_key in zip(order, attach_keys):
+            if not attachment_key:
+                failed[todo[i].get("pid", "")] = "attachment create failed"
+                _rollback([("parent", parent_keys[i])], logs)
+                continue
+            futures[ex.submit(upload, i, attachment_key)] = (i, attachment_key)
+        for fut in as_completed(futures):
+            i, attachment_key = futures[fut]
+            try:
+                fut.result()
+            except Exception as e:
+                failed[todo[i].get("pid", "")] = f"upload: {e}"
+                _rollback([("attachment", attachment_key), ("parent", parent_keys[i])], logs)
+
+    created = len(todo) - len(failed)
+    logs.append(f"bulk:done created={created} skipped={skipped} failed={len(failed)}")
+    return {"created": created, "skipped": skipped, "failed": failed, "logs": logs}
+
+def sync_to_zotero(date: str, label: str = "", workers: int = 4) -> dict:
+    """DB에 있는 한 날짜(라벨을 주면 그 라벨만)의 논문을 전부 Zotero로."""
+    cards = load_card_dicts(date, label=label or None)
+    return bulk_add_to_zotero(cards, date, workers=workers)
@@ -0,0 +1,31 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from dailypaper import config  # noqa: E402
+
+@pytest.fixture
+def tmp_paths(tmp_path, monkeypatch):
+    """data/ 아래 경로를 전부 tmp_path로 돌린 PATHS를 dailypaper 모듈들에 심는다."""
+    data = tmp_path / "data"
+    paths = config.Paths(
+        root=tmp_path,
+        data=data,
+        raw=data / "raw",
+        db=data / "db" / "dailypaper.sqlite3",
+        llm_cache=data / "db" / "llm_cache.sqlite3",
+        batches=data / "batches",
+        pdfs=data / "pdfs",
+        jobs=data / "db" / "jobs.sqlite3",
+        zotero_collections=data / "db" / "zotero_collections.json",
+        favorites=tmp_path / "DailyPaperFavorite",
+        logs=tmp_path / "logs",
+    )
+    orig = config.PATHS
+    for name, mod in list(sys.modules.items()):
+        if name.startswith("dailypaper") and getattr(mod, "PATHS", None) is orig:
+            monkeypatch.setattr(mod, "PATHS", paths)
+    return paths
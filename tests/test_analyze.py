@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from dailypaper import db, pipeline
+from dailypaper.parse import Paper
+
+def _card(pid: str) -> dict:
+    return {"labels": ["LLM"], "label_confidence": {"LLM": 0.9}, "one_liner": pid, "keywords": ["llm"]}
+
+@pytest.fixture
+def papers(tmp_paths, monkeypatch):
+    monkeypatch.setattr(pipeline, "OpenAI", lambda **kwargs: None)
+    monkeypatch.setattr(pipeline, "_evict_cache", lambda: None)
+    db.init_db()
+    ps = [Paper(f"2601.0000{i}", f"Title {i}", "s") for i in range(4)]
+    db.upsert_papers("2026-01-05", ps)
+    return ps
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_finished_cards_are_committed_before_the_run_ends(papers, monkeypatch, workers):
+    seen_while_last_running = []
+    fast_done = threading.Event()
+    done = []
+
+    def analyze(client, p):
+        if p.pid == papers[-1].pid:
+            # 앞의 카드들이 끝날 때까지 기다렸다가, 그때 DB에 이미 커밋돼 있는지 (다른 connection으로) 확인
+            assert fast_done.wait(5)
+            seen_while_last_running.extend(pid for pid, _, _ in db.load_annotations("2026-01-05"))
+        else:
+            done.append(p.pid)
+            if len(done) == len(papers) - 1:
+                threading.Timer(0.2, fast_done.set).start()
+        return _card(p.pid)
+
+    monkeypatch.setattr(pipeline, "analyze_paper", analyze)
+    failed = pipeline.analyze_todo("2026-01-05", papers, workers, 1, False, 0, 0)
+
+    assert failed == []
+    assert sorted(seen_while_last_running) == [p.pid for p in papers[:-1]]
+    assert len(db.load_annotations("2026-01-05")) == 4
+
+def test_analyze_todo_returns_failed_pids(papers, monkeypatch):
+    def analyze(client, p):
+        if p.pid == papers[1].pid:
+            raise RuntimeError("bad")
+        return _card(p.pid)
+
+    monkeypatch.setattr(pipeline, "analyze_paper", analyze)
+    failed = pipeline.analyze_todo("2026-01-05", papers, 2, 1, False, 0, 0)
+
+    assert failed == [papers[1].pid]
+    assert sorted(pid for pid, _, _ in db.load_annotations("2026-01-05")) == [
+        p.pid for p in papers if p.pid != papers[1].pid
+    ]
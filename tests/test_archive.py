@@ -0,0 +1,74 @@
+import builtins
+import json
+
+from dailypaper import archive
+
+def _idx_lines(paths, month):
+    return (paths.raw / f"{month}.idx").read_text(encoding="utf-8").splitlines()
+
+def test_put_get_skip_identical_and_last_entry_wins(tmp_paths):
+    assert archive.get_raw("2026-01-05") is None
+    assert archive.open_raw("2026-01-05") is None
+
+    assert archive.put_raw("2026-01-05", '[{"title": "한글"}]')
+    assert archive.put_raw("2026-01-06", "[]")
+    # 같은 내용은 다시 쓰지 않음
+    assert not archive.put_raw("2026-01-05", '[{"title": "한글"}]')
+    assert len(_idx_lines(tmp_paths, "2026-01")) == 2
+
+    # 같은 날짜를 다른 내용으로 다시 쓰면 segment에 덧붙이고 마지막 기록이 유효
+    assert archive.put_raw("2026-01-05", "[1]")
+    assert len(_idx_lines(tmp_paths, "2026-01")) == 3
+    assert archive.get_raw("2026-01-05") == "[1]"
+    with archive.open_raw("2026-01-05") as f:
+        assert f.read() == b"[1]"
+    assert archive.get_raw("2026-01-06") == "[]"
+
+    entries = [json.loads(line) for line in _idx_lines(tmp_paths, "2026-01")]
+    assert entries[0]["offset"] < entries[1]["offset"] < entries[2]["offset"]
+    assert (tmp_paths.raw / "2026-01.seg").stat().st_size == sum(e["length"] for e in entries)
+
+def test_torn_index_line_is_ignored(tmp_paths):
+    archive.put_raw("2026-01-05", "[5]")
+    with open(tmp_paths.raw / "2026-01.idx", "a", encoding="utf-8") as f:
+        f.write('{"date": "2026-01-06", "offs')
+    assert archive.archived_dates() == ["2026-01-05"]
+    assert archive.get_raw("2026-01-05") == "[5]"
+
+def test_archived_dates_and_iter_raw_open_each_segment_once(tmp_paths, monkeypatch):
+    raws = {d: f'["{d}"]' for d in ["2025-12-31", "2026-01-01", "2026-01-15", "2026-02-01", "2026-02-02"]}
+    for d in reversed(list(raws)):
+        archive.put_raw(d, raws[d])
+
+    assert archive.archived_dates() == list(raws)
+    assert archive.archived_dates("2026-01-01", "2026-02-01") == ["2026-01-01", "2026-01-15", "2026-02-01"]
+
+    opened = []
+    real_open = builtins.open
+
+    def spy(path, *args, **kwargs):
+        if str(path).endswith(".seg"):
+            opened.append(str(path).rsplit("/", 1)[1])
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", spy)
+    assert list(archive.iter_raw("2026-01-01")) == [(d, raws[d]) for d in list(raws)[1:]]
+    assert opened == ["2026-01.seg", "2026-02.seg"]
+
+def test_migrate_legacy_moves_and_verifies(tmp_paths):
+    tmp_paths.raw.mkdir(parents=True)
+    (tmp_paths.raw / "2026-01-05.json").write_text('[{"a": 1}]', encoding="utf-8")
+    (tmp_paths.raw / "2026-02-01.json").write_text("[]", encoding="utf-8")
+    (tmp_paths.raw / "notes.json").write_text("x", encoding="utf-8")
+
+    assert archive.migrate_legacy(delete=False) == 2
+    assert (tmp_paths.raw / "2026-01-05.json").exists()
+    assert archive.get_raw("2026-01-05") == '[{"a": 1}]'
+
+    # 다시 돌려도 같은 내용이라 index가 늘지 않고, 이번엔 원본 삭제
+    assert archive.migrate_legacy() == 2
+    assert len(_idx_lines(tmp_paths, "2026-01")) == 1
+    assert sorted(p.name for p in tmp_paths.raw.iterdir()) == [
+        "2026-01.idx", "2026-01.seg", "2026-02.idx", "2026-02.seg", "notes.json",
+    ]
+    assert archive.archived_dates() == ["2026-01-05", "2026-02-01"]
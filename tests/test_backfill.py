@@ -0,0 +1,140 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from dailypaper import cache, db, pipeline
+from dailypaper.batch import build_batch_file, split_custom_id, submit_batch
+from dailypaper.openai_agent import cached_card, store_card
+from dailypaper.parse import Paper
+
+def _card(pid: str) -> dict:
+    return {
+        "labels": ["Robotics"], "label_confidence": {"Robotics": 0.9}, "one_liner": f"about {pid}",
+        "background": "b", "gap": "g", "method": "m", "evidence": "e", "limitations": "l",
+        "keywords": ["robot", "planning"],
+    }
+
+class FakeBatchAPI:
+    """OpenAI files/batches 중 backfill이 쓰는 부분만. 결과는 pid별 outcome으로 정한다:
+    ok | http_error | bad_json | error_file (기본 ok)."""
+
+    def __init__(self, outcomes=None, polls_before_done=0):
+        self.outcomes = outcomes or {}
+        self.polls_before_done = polls_before_done
+        self.uploads = {}
+        self.batches = {}
+        self.outputs = {}
+        self.files = SimpleNamespace(create=self._file_create, content=self._file_content)
+        self.batches_api = SimpleNamespace(create=self._batch_create, retrieve=self._batch_retrieve)
+
+    def client(self):
+        return SimpleNamespace(files=self.files, batches=self.batches_api)
+
+    def _file_create(self, file, purpose):
+        assert purpose == "batch"
+        fid = f"file-{len(self.uploads) + 1}"
+        self.uploads[fid] = file.read().decode("utf-8")
+        return SimpleNamespace(id=fid)
+
+    def _file_content(self, file_id):
+        return SimpleNamespace(text=self.outputs[file_id])
+
+    def _batch_create(self, input_file_id, endpoint, completion_window, metadata):
+        bid = f"batch-{len(self.batches) + 1}"
+        self.batches[bid] = {"input": input_file_id, "polls": 0}
+        return SimpleNamespace(id=bid)
+
+    def _batch_retrieve(self, batch_id):
+        b = self.batches[batch_id]
+        b["polls"] += 1
+        if b["polls"] <= self.polls_before_done:
+            return SimpleNamespace(id=batch_id, status="in_progress", request_counts=None)
+
+        out, err = [], []
+        for line in self.uploads[b["input"]].splitlines():
+            req = json.loads(line)
+            cid = req["custom_id"]
+            kind = self.outcomes.get(split_custom_id(cid)[1], "ok")
+            if kind == "error_file":
+                err.append({"custom_id": cid, "error": {"message": "boom"}})
+            elif kind == "http_error":
+                out.append({"custom_id": cid, "response": {"status_code": 500, "body": {"error": "server"}}})
+            else:
+                content = "not json" if kind == "bad_json" else json.dumps(_card(split_custom_id(cid)[1]))
+                body = {"choices": [{"message": {"content": content}}]}
+                out.append({"custom_id": cid, "response": {"status_code": 200, "body": body}})
+        self.outputs[f"{batch_id}-out"] = "\n".join(json.dumps(r) for r in out)
+        self.outputs[f"{batch_id}-err"] = "\n".join(json.dumps(r) for r in err)
+        return SimpleNamespace(
+            id=batch_id, status="completed", request_counts=None,
+            output_file_id=f"{batch_id}-out", error_file_id=f"{batch_id}-err" if err else None,
+        )
+
+@pytest.fixture
+def store(tmp_paths, monkeypatch):
+    monkeypatch.setattr(cache, "_CACHE", cache.ResponseCache(path=tmp_paths.llm_cache))
+    db.init_db()
+    papers = {
+        "2026-01-05": [Paper(f"2601.0000{i}", f"Title {i}", f"summary {i}") for i in range(3)],
+        "2026-01-06": [Paper(f"2601.1000{i}", f"Other {i}", f"summary {i}") for i in range(3)],
+    }
+    for d, ps in papers.items():
+        db.upsert_papers(d, ps)
+    return papers
+
+def _annotated(date):
+    return {pid: json.loads(card) for pid, _, card in db.load_annotations(date)}
+
+def test_backfill_round_trips_custom_ids_and_keeps_failures_unannotated(store, tmp_paths):
+    store_card(store["2026-01-05"][0], _card("cached"))
+    fake = FakeBatchAPI(outcomes={"2601.00002": "http_error", "2601.10001": "bad_json", "2601.10002": "error_file"})
+
+    pipeline.backfill("2026-01-05", "2026-01-06", fetch=False, poll_sec=0, client=fake.client())
+
+    # 캐시에 있던 논문은 batch에 안 들어감, custom_id는 date|pid
+    (uploaded,) = fake.uploads.values()
+    cids = [json.loads(line)["custom_id"] for line in uploaded.splitlines()]
+    assert cids == ["2026-01-05|2601.00001", "2026-01-05|2601.00002",
+                    "2026-01-06|2601.10000", "2026-01-06|2601.10001", "2026-01-06|2601.10002"]
+    assert list(tmp_paths.batches.glob("backfill_2026-01-05_2026-01-06_*.jsonl"))
+
+    day1, day2 = _annotated("2026-01-05"), _annotated("2026-01-06")
+    assert sorted(day1) == ["2601.00000", "2601.00001"]
+    assert day1["2601.00000"]["one_liner"] == "about cached"
+    assert day1["2601.00001"]["one_liner"] == "about 2601.00001"
+    assert sorted(day2) == ["2601.10000"]
+
+    # 실패한 논문은 미분석으로 남아서 다음 backfill/run 때 다시 잡힌다
+    assert [p.pid for p in db.list_unannotated("2026-01-05")] == ["2601.00002"]
+    assert sorted(p.pid for p in db.list_unannotated("2026-01-06")) == ["2601.10001", "2601.10002"]
+
+    # 성공한 결과는 LLM 캐시에도 들어감
+    assert cached_card(store["2026-01-06"][0])["one_liner"] == "about 2601.10000"
+
+def test_backfill_resumes_existing_batch_without_resubmitting(store):
+    fake = FakeBatchAPI(polls_before_done=2)
+    client = fake.client()
+    items = [(d, p) for d, ps in store.items() for p in ps]
+    path = pipeline.PATHS.batches / "interrupted.jsonl"
+    build_batch_file(items, path)
+    batch_id = submit_batch(client, path)
+
+    pipeline.backfill("2026-01-05", "2026-01-06", fetch=False, poll_sec=0, batch_id=batch_id, client=client)
+
+    assert len(fake.uploads) == 1 and len(fake.batches) == 1
+    assert fake.batches[batch_id]["polls"] == 3
+    assert len(_annotated("2026-01-05")) == 3
+    assert len(_annotated("2026-01-06")) == 3
+    assert db.list_unannotated("2026-01-05") == []
+
+def test_backfill_with_everything_cached_submits_nothing(store):
+    for ps in store.values():
+        for p in ps:
+            store_card(p, _card(p.pid))
+    fake = FakeBatchAPI()
+
+    pipeline.backfill("2026-01-05", "2026-01-06", fetch=False, poll_sec=0, client=fake.client())
+
+    assert fake.uploads == {} and fake.batches == {}
+    assert len(_annotated("2026-01-05")) == 3 and len(_annotated("2026-01-06")) == 3
@@ -0,0 +1,105 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from dailypaper import db, fetch_hf, pipeline
+from dailypaper.archive import archived_dates, get_raw
+from dailypaper.parse import Paper
+
+RAW = json.dumps([{"paper": {"id": "2601.00001", "title": "A", "summary": "a"}},
+                  {"paper": {"id": "2601.00002", "title": "B", "summary": "b"}}])
+
+class StubSession:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append(dict(headers or {}))
+        status, text, resp_headers = self.responses.pop(0)
+        return SimpleNamespace(status_code=status, text=text, headers=resp_headers)
+
+@pytest.fixture
+def stub(tmp_paths, monkeypatch):
+    def install(*responses):
+        s = StubSession(*responses)
+        monkeypatch.setattr(fetch_hf, "session", lambda: s)
+        return s
+    return install
+
+def test_conditional_fetch_304_same_hash_and_changed(stub):
+    s = stub(
+        (200, RAW, {"ETag": '"v1"', "Last-Modified": "Mon"}),
+        (304, "", {}),
+        (200, RAW, {"ETag": '"v2"', "Last-Modified": "Tue"}),
+        (200, RAW.replace('"a"', '"a2"'), {"ETag": '"v3"'}),
+    )
+
+    first = fetch_hf.fetch_hf_daily_conditional("2026-01-05")
+    assert (first.raw, first.status, first.etag) == (RAW, 200, '"v1"')
+    assert get_raw("2026-01-05") == RAW
+
+    # 304: 요청에 조건 헤더, raw 없음, 이전 상태 그대로
+    res = fetch_hf.fetch_hf_daily_conditional("2026-01-05", etag='"v1"', last_modified="Mon", known_hash=first.content_hash)
+    assert s.requests[1] == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon"}
+    assert (res.raw, res.status, res.etag, res.content_hash) == (None, 304, '"v1"', first.content_hash)
+
+    # 200인데 내용이 같으면 raw 없음 (새 ETag는 돌려줌), archive에 다시 쓰지 않음
+    idx = fetch_hf.PATHS.raw / "2026-01.idx"
+    idx_size = idx.stat().st_size
+    res = fetch_hf.fetch_hf_daily_conditional("2026-01-05", etag='"v1"', known_hash=first.content_hash)
+    assert idx.stat().st_size == idx_size
+    assert (res.raw, res.status, res.etag, res.last_modified) == (None, 200, '"v2"', "Tue")
+    assert res.content_hash == first.content_hash
+
+    # 내용이 바뀌면 raw + archive 갱신
+    res = fetch_hf.fetch_hf_daily_conditional("2026-01-05", etag='"v2"', known_hash=first.content_hash)
+    assert res.raw is not None and res.content_hash != first.content_hash
+    assert get_raw("2026-01-05") == res.raw
+    assert archived_dates() == ["2026-01-05"]
+
+def _rows(date):
+    con = db._connect()
+    return {r[0]: r[1:] for r in con.execute("SELECT pid, summary, fetched_at FROM papers WHERE date=?", (date,))}
+
+def test_upsert_writes_only_changed_rows(tmp_paths):
+    db.init_db()
+    papers = [Paper("a", "A", "a"), Paper("b", "B", "b")]
+    assert db.upsert_papers("2026-01-05", papers) == 2
+    assert db.data_version("2026-01-05") == 1
+    before = _rows("2026-01-05")
+
+    # 같은 내용이면 write 없음: fetched_at, data_version 그대로
+    assert db.upsert_papers("2026-01-05", iter(papers)) == 0
+    assert _rows("2026-01-05") == before
+    assert db.data_version("2026-01-05") == 1
+
+    # 하나만 바뀌면 그 행만
+    assert db.upsert_papers("2026-01-05", [Paper("a", "A", "a"), Paper("b", "B", "b2"), Paper("c", "C", "c")]) == 2
+    after = _rows("2026-01-05")
+    assert after["a"] == before["a"]
+    assert after["b"][0] == "b2" and after["b"][1] >= before["b"][1]
+    assert set(after) == {"a", "b", "c"}
+    assert db.data_version("2026-01-05") == 2
+    # FTS도 바뀐 행 기준
+    assert [r[1] for r in db.search_papers("b2")] == ["b"]
+
+def test_fetch_and_store_skips_writes_when_unchanged(stub):
+    db.init_db()
+    stub(
+        (200, RAW, {"ETag": '"v1"'}),
+        (304, "", {}),
+        (200, RAW, {"ETag": '"v2"'}),
+    )
+    assert pipeline.fetch_and_store("2026-01-05") == "fetched=2 changed=2"
+    state = db.get_fetch_state("2026-01-05")
+
+    assert pipeline.fetch_and_store("2026-01-05") == "unchanged(HTTP 304)"
+    assert db.get_fetch_state("2026-01-05") == state
+    assert db.data_version("2026-01-05") == 1
+
+    # 같은 내용에 ETag만 바뀌면 fetch_state만 갱신
+    assert pipeline.fetch_and_store("2026-01-05") == "unchanged(HTTP 200)"
+    assert db.get_fetch_state("2026-01-05") == ('"v2"', "", state[2])
+    assert db.data_version("2026-01-05") == 1
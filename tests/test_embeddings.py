@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from dailypaper import db
+from dailypaper.embeddings import EmbeddingIndex, HashEmbedder, load_index, paper_text
+from dailypaper.parse import Paper
+
+def test_embed_new_reembeds_only_changed_text(tmp_paths):
+    db.init_db()
+    emb = HashEmbedder(dim=64)
+    db.upsert_papers("2026-01-05", [Paper("a", "Robot arms", "grasping"), Paper("b", "Language models", "tokens")])
+
+    assert db.embed_new("2026-01-05", embedder=emb) == 2
+    assert db.embed_new("2026-01-05", embedder=emb) == 0
+    before = load_index(db._connect(), emb.name).vector("2026-01-05", "a").copy()
+
+    # reparse / 재수집으로 초록이 바뀌면 그 논문만 다시 계산
+    db.upsert_papers("2026-01-05", [Paper("a", "Robot arms", "dexterous in-hand manipulation")])
+    assert db.embed_new("2026-01-05", embedder=emb) == 1
+    after = load_index(db._connect(), emb.name).vector("2026-01-05", "a")
+    assert not np.allclose(before, after)
+    assert np.allclose(after, emb.embed([paper_text("Robot arms", "dexterous in-hand manipulation")])[0])
+    assert db.embed_new("2026-01-05", embedder=emb) == 0
+
+def test_top_k_dedupes_pids_listed_on_several_dates():
+    # "dup"이 30개 날짜에 올라와서 상위 후보(k+8개)를 전부 차지하는 경우
+    keys = [(f"2026-01-{i + 1:02d}", "dup") for i in range(30)] + [("2026-02-01", "self"), ("2026-02-01", "b"), ("2026-02-02", "c")]
+    scores = [0.9 - i * 0.001 for i in range(30)] + [1.0, 0.5, 0.4]
+    matrix = np.array([[s, np.sqrt(1 - s * s)] for s in scores], dtype=np.float32)
+    idx = EmbeddingIndex(keys, matrix, (len(keys), len(keys)))
+
+    hits = idx.top_k(np.array([1.0, 0.0], dtype=np.float32), k=3, exclude_pid="self")
+
+    assert [(d, pid) for d, pid, _ in hits] == [("2026-01-01", "dup"), ("2026-02-01", "b"), ("2026-02-02", "c")]
+    assert hits[0][2] == pytest.approx(0.9)
+    assert len(idx.top_k(np.array([1.0, 0.0], dtype=np.float32), k=10)) == 4
@@ -0,0 +1,122 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from dailypaper import config, db, fetch_hf, pipeline
+from dailypaper.archive import get_raw
+
+def _payload(date: str) -> str:
+    return json.dumps([{"paper": {"id": f"{date}-{i}", "title": f"{date} paper {i}", "summary": "s"}} for i in range(3)])
+
+class StubHF:
+    """날짜별 응답 시나리오: ok | 429 | 503 (각각 처음 몇 번 실패 후 200) | 404 | bad."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.lock = threading.Lock()
+        self.hits = {}
+        self.inflight = 0
+        self.max_inflight = 0
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, body=b"", headers=None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        date = parse_qs(urlparse(self.path).query)["date"][0]
+        with stub.lock:
+            stub.hits[date] = n = stub.hits.get(date, 0) + 1
+            stub.inflight += 1
+            stub.max_inflight = max(stub.max_inflight, stub.inflight)
+        try:
+            time.sleep(0.05)
+            kind = stub.plan.get(date, "ok")
+            etag = f'"{date}"'
+            if kind in ("429", "503") and n <= 2:
+                return self._reply(int(kind), headers={"Retry-After": "0"})
+            if kind == "404":
+                return self._reply(404, b"no such date")
+            if kind == "bad":
+                return self._reply(200, b"{not json", {"ETag": etag})
+            if self.headers.get("If-None-Match") == etag:
+                return self._reply(304, headers={"ETag": etag})
+            return self._reply(200, _payload(date).encode(), {"ETag": etag})
+        finally:
+            with stub.lock:
+                stub.inflight -= 1
+
+@pytest.fixture
+def hf(tmp_paths, monkeypatch):
+    def start(plan):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        srv.stub = StubHF(plan)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        base = f"http://127.0.0.1:{srv.server_port}/api/daily_papers?date="
+        monkeypatch.setattr(fetch_hf, "SETTINGS", config.Settings(hf_api_base=base))
+        return srv.stub
+
+    servers = []
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+def test_fetch_range_bounded_pool_retries_and_main_thread_writes(hf, monkeypatch):
+    stub = hf({"2026-01-02": "429", "2026-01-03": "503", "2026-01-04": "404", "2026-01-05": "bad"})
+
+    writers = []
+    for name in ("upsert_papers", "put_fetch_state"):
+        real = getattr(pipeline, name)
+
+        def wrapped(*args, _real=real, _name=name):
+            writers.append((_name, args[0], threading.current_thread() is threading.main_thread()))
+            return _real(*args)
+
+        monkeypatch.setattr(pipeline, name, wrapped)
+
+    failed = pipeline.fetch_range("2026-01-01", "2026-01-08", workers=2)
+
+    assert sorted(failed) == ["2026-01-04", "2026-01-05"]
+    assert stub.max_inflight <= 2
+    # 429/503은 공유 세션이 재시도해서 성공
+    assert stub.hits["2026-01-02"] == 3 and stub.hits["2026-01-03"] == 3
+    assert stub.hits["2026-01-04"] == 1
+
+    ok = ["2026-01-01", "2026-01-02", "2026-01-03", "2026-01-06", "2026-01-07", "2026-01-08"]
+    for d in ok:
+        assert sorted(p.pid for p in db.list_unannotated(d)) == [f"{d}-{i}" for i in range(3)]
+        assert db.get_fetch_state(d)[0] == f'"{d}"'
+        assert db.data_version(d) == 1
+        assert get_raw(d) == _payload(d)
+
+    # DB 쓰기는 전부 메인 스레드, 실패한 날짜는 아무것도 안 씀
+    assert writers and all(main for _, _, main in writers)
+    assert sorted({d for _, d, _ in writers}) == ok
+    for d in failed:
+        assert db.get_fetch_state(d) == ("", "", "")
+        assert db.data_version(d) == 0
+
+def test_fetch_range_rerun_is_conditional(hf):
+    stub = hf({})
+    assert pipeline.fetch_range("2026-01-01", "2026-01-03", workers=3) == []
+    versions = {d: db.data_version(d) for d in ("2026-01-01", "2026-01-02", "2026-01-03")}
+
+    assert pipeline.fetch_range("2026-01-01", "2026-01-03", workers=3) == []
+    assert all(n == 2 for n in stub.hits.values())
+    assert {d: db.data_version(d) for d in versions} == versions
@@ -0,0 +1,71 @@
+import gc
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from dailypaper import httpclient
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = b"x" * 200_000
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        pass  # 다 안 읽고 버린 stream은 client 쪽에서 연결을 끊는다
+
+@pytest.fixture
+def url(monkeypatch):
+    srv = QuietServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setitem(httpclient.HOST_LIMITS, "127.0.0.1", 2)
+    monkeypatch.setattr(httpclient, "HOST_WAIT_SEC", 0.5)
+    yield f"http://127.0.0.1:{srv.server_port}/pdf"
+    srv.shutdown()
+    srv.server_close()
+
+def _free(s, url):
+    return s._host_sem(url)._value
+
+def test_stream_slot_released_on_close_and_on_exhaustion(url):
+    s = httpclient.PooledSession()
+    with s.get(url, stream=True) as r:
+        assert _free(s, url) == 1
+        r.content
+    assert _free(s, url) == 2
+
+    # close 없이 끝까지 읽기만 해도 돌려줌
+    r = s.get(url, stream=True)
+    for _ in r.iter_content(1 << 14):
+        pass
+    assert _free(s, url) == 2
+    r.close()
+    assert _free(s, url) == 2
+
+def test_abandoned_stream_releases_slot_on_gc(url):
+    s = httpclient.PooledSession()
+    for _ in range(5):
+        r = s.get(url, stream=True)
+        del r
+        gc.collect()
+    assert _free(s, url) == 2
+
+def test_exhausted_slots_raise_timeout_instead_of_hanging(url):
+    s = httpclient.PooledSession()
+    held = [s.get(url, stream=True) for _ in range(2)]
+    with pytest.raises(requests.Timeout):
+        s.get(url)
+    held[0].close()
+    assert s.get(url).status_code == 200
+    held[1].close()
+    assert _free(s, url) == 2
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+from dailypaper import db, jobs
+
+@pytest.fixture
+def queue(tmp_paths, monkeypatch):
+    monkeypatch.setattr(jobs, "LEASE_SEC", 0.3)
+    monkeypatch.setattr(jobs, "BACKOFFS", [0.2, 0.4])
+    yield
+    jobs._close()
+
+def _row(key):
+    con = jobs._connect()
+    return con.execute("SELECT status, attempts, run_after, error FROM jobs WHERE key=?", (key,)).fetchone()
+
+def test_dead_workers_job_is_reclaimed_and_its_late_result_ignored(queue):
+    jobs.enqueue("k", "a", {})
+    job_id, _, _, _, attempts, _ = jobs._claim()  # 꺼낸 뒤 죽은 worker (heartbeat 없음)
+    assert jobs._claim() is None
+    time.sleep(0.4)
+
+    ran = []
+    assert jobs.run_one({"k": lambda p: ran.append(1)})
+    assert ran == [1]
+    assert _row("a")[:2] == (jobs.DONE, 2)
+
+    # 되살아난 예전 worker가 결과를 써도 반영되지 않음
+    assert not jobs._finish(job_id, attempts, jobs.FAILED, error="late")
+    assert _row("a")[0] == jobs.DONE
+
+def test_live_workers_job_is_not_reclaimed_past_the_lease(queue):
+    jobs.enqueue("k", "a", {})
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(p):
+        calls.append(1)
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=jobs.run_one, args=({"k": slow},))
+    t.start()
+    assert started.wait(5)
+
+    # lease(0.3초)의 몇 배가 지나도 heartbeat 덕분에 다른 worker가 못 꺼냄
+    other = []
+
+    def poll():
+        deadline = time.time() + 1.2
+        while time.time() < deadline:
+            other.append(jobs.run_one({"k": slow}))
+            time.sleep(0.05)
+        jobs._close()
+
+    p = threading.Thread(target=poll)
+    p.start()
+    p.join()
+    release.set()
+    t.join()
+
+    assert not any(other)
+    assert calls == [1]
+    assert _row("a")[:2] == (jobs.DONE, 1)
+
+def test_failures_back_off_then_fail_after_max_attempts(queue):
+    jobs.enqueue("k", "a", {}, max_attempts=3)
+
+    def boom(p):
+        raise RuntimeError("nope")
+
+    handlers = {"k": boom}
+    for attempt, delay in [(1, 0.2), (2, 0.4)]:
+        before = time.time()
+        assert jobs.run_one(handlers)
+        status, attempts, run_after, error = _row("a")
+        assert (status, attempts, error) == (jobs.QUEUED, attempt, "nope")
+        assert run_after >= before + delay
+        # backoff 동안은 꺼내지지 않음
+        assert not jobs.run_one(handlers)
+        time.sleep(run_after - time.time() + 0.05)
+
+    assert jobs.run_one(handlers)
+    assert _row("a")[:2] == (jobs.FAILED, 3)
+    assert not jobs.run_one(handlers)
+    assert jobs.recent_failures()[0][:3] == ("k", "a", 3)
+
+    # failed는 다시 enqueue하면 처음부터
+    jobs.enqueue("k", "a", {})
+    assert _row("a")[:2] == (jobs.QUEUED, 0)
+
+@pytest.mark.parametrize("use_runner", [True, False])
+def test_worker_threads_close_their_connections_on_exit(queue, monkeypatch, use_runner):
+    for key in ("a", "b", "c"):
+        jobs.enqueue("k", key, {})
+    used, closed = set(), {"db": set(), "jobs": set()}
+    real_close_db, real_close = jobs.close_db, jobs._close
+
+    def touch_db(p):
+        # zotero handler처럼 thread-local DB 연결을 씀
+        db._connect()
+        used.add(threading.get_ident())
+        time.sleep(0.1)
+
+    def spy(name, real):
+        def wrapped():
+            closed[name].add(threading.get_ident())
+            real()
+        return wrapped
+
+    monkeypatch.setattr(jobs, "close_db", spy("db", real_close_db))
+    monkeypatch.setattr(jobs, "_close", spy("jobs", real_close))
+
+    if use_runner:
+        runner = jobs.JobRunner({"k": touch_db}, workers=2, poll_sec=0.05)
+        deadline = time.time() + 5
+        while jobs.counts().get(jobs.DONE, 0) < 3 and time.time() < deadline:
+            time.sleep(0.05)
+        runner.stop()
+    else:
+        jobs.drain({"k": touch_db}, workers=2)
+
+    assert jobs.counts().get(jobs.DONE) == 3
+    assert used and used <= closed["db"] and used <= closed["jobs"]
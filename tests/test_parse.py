@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+
+from dailypaper.parse import iter_hf_papers, iter_json_array, parse_hf_raw
+
+PAYLOAD = json.dumps(
+    [
+        1.5, -4.5, 2.5e3, 0, -0.25e-2, 10, True, None, "문자열 \\\" ,]",
+        {"paper": {"id": "2601.00001", "title": "  Robot ", "summary": "x" * 50, "upvotes": -3.75}},
+        {"id": 2601.00002, "title": "Flat", "score": 1e-7},
+        [1, [2.25, {"a": -1}]],
+        123456789,
+    ],
+    ensure_ascii=False,
+)
+
+@pytest.mark.parametrize("as_bytes", [False, True])
+def test_iter_json_array_matches_json_loads_at_every_chunk_size(as_bytes):
+    expected = json.loads(PAYLOAD)
+    data = PAYLOAD.encode("utf-8") if as_bytes else PAYLOAD
+    for size in range(1, len(data) + 1):
+        stream = io.BytesIO(data) if as_bytes else io.StringIO(data)
+        assert list(iter_json_array(stream, size)) == expected, size
+
+@pytest.mark.parametrize("text", ["[1.5]", "[2.5e3]", "[-4.5]", "[1, 2.5e3]", "[ 7 ]", "[]", " [ ] "])
+def test_iter_json_array_small_payloads(text):
+    for size in range(1, len(text) + 1):
+        assert list(iter_json_array(io.StringIO(text), size)) == json.loads(text)
+
+@pytest.mark.parametrize("text", ["{}", "[1 2]", "[1,", "[1.5x]"])
+def test_iter_json_array_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), 1))
+
+def test_iter_hf_papers_matches_parse_hf_raw():
+    papers = json.loads(PAYLOAD)[9:11] * 3
+    text = json.dumps(papers)
+    assert list(iter_hf_papers(io.BytesIO(text.encode("utf-8")))) == parse_hf_raw(text)
+    assert [p.pid for p in parse_hf_raw(text)] == ["2601.00001", "2601.00002"] * 3
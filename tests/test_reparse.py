@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from dailypaper import db, pipeline
+from dailypaper.archive import put_raw
+from dailypaper.parse import Paper
+
+DATES = [f"2026-01-{d:02d}" for d in range(1, 13)]
+
+def _raw(date, summary="s"):
+    return json.dumps([{"paper": {"id": f"{date}-{i}", "title": f"T{i}", "summary": summary}} for i in range(3)])
+
+@pytest.fixture
+def archived(tmp_paths):
+    db.init_db()
+    for d in DATES:
+        put_raw(d, _raw(d))
+    put_raw("2026-01-13", "{broken")
+    return DATES
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reparse_bumps_only_changed_dates(archived, monkeypatch, workers):
+    # 이미 DB에 있는 날짜: 01은 같은 내용, 02는 초록이 다름
+    db.upsert_papers("2026-01-01", [Paper(f"2026-01-01-{i}", f"T{i}", "s", f"https://arxiv.org/abs/2026-01-01-{i}") for i in range(3)])
+    db.upsert_papers("2026-01-02", [Paper(f"2026-01-02-{i}", f"T{i}", "old", f"https://arxiv.org/abs/2026-01-02-{i}") for i in range(3)])
+    assert db.data_version("2026-01-01") == db.data_version("2026-01-02") == 1
+
+    # 동시에 걸어두는 날짜 수 (process pool 경로)
+    windows = []
+    real_wait = pipeline.wait
+
+    def spy(fs, *args, **kwargs):
+        windows.append(len(fs))
+        return real_wait(fs, *args, **kwargs)
+
+    monkeypatch.setattr(pipeline, "wait", spy)
+
+    failed = pipeline.reparse_range("2026-01-01", "2026-01-31", workers=workers)
+
+    assert failed == ["2026-01-13"]
+    assert db.data_version("2026-01-01") == 1
+    assert db.data_version("2026-01-02") == 2
+    for d in DATES[2:]:
+        assert db.data_version(d) == 1
+        assert len(db.list_unannotated(d)) == 3
+    assert db.data_version("2026-01-13") == 0
+
+    if workers > 1:
+        assert windows and max(windows) <= workers * 2
+    else:
+        assert windows == []
+
+    # 다시 돌리면 바뀐 게 없어서 아무 날짜도 버전이 안 오름
+    before = {d: db.data_version(d) for d in DATES}
+    assert pipeline.reparse_range("2026-01-01", "2026-01-31", workers=workers) == ["2026-01-13"]
+    assert {d: db.data_version(d) for d in DATES} == before
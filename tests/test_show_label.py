@@ -0,0 +1,25 @@
+import json
+
+from dailypaper import db, pipeline
+from dailypaper.parse import Paper
+
+def test_show_label_lists_papers_or_counts_per_label(tmp_paths, monkeypatch, capsys):
+    db.init_db()
+    monkeypatch.setattr(pipeline, "yesterday_kst", lambda: "2026-01-10")
+    labels = {"a": ["Robotics", "LLM"], "b": ["Robotics"], "c": ["LLM"], "d": ["Robotics"]}
+    for date, pids in [("2026-01-10", "abc"), ("2025-12-01", "d")]:
+        db.upsert_papers(date, [Paper(pid, pid.upper(), "s") for pid in pids])
+        db.upsert_annotations([(date, pid, json.dumps(labels[pid]), "{}") for pid in pids])
+
+    assert sorted(db.label_counts("2026-01-01", "2026-01-10")) == [("LLM", 2), ("Robotics", 2)]
+    assert db.label_counts() == [("Robotics", 3), ("LLM", 2)]
+
+    pipeline.show_label(days=10)
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "== labels (2026-01-01 ~ 2026-01-10) =="
+    assert sorted(out[1:]) == ["- LLM: 2", "- Robotics: 2"]
+
+    pipeline.show_label("Robotics", days=10)
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "== Robotics (2026-01-01 ~ 2026-01-10, 2) =="
+    assert [line.split()[2] for line in out[1:]] == ["A", "B"]
@@ -0,0 +1,24 @@
+import pytest
+
+from dailypaper.openai_agent import needs_translation
+
+@pytest.mark.parametrize("keywords", [
+    ["world model", "RLHF"],
+    ["Schrödinger bridge", "Hénon map", "Gödel", "naïve Bayes"],
+    ["β-VAE", "µP", "Erdős–Rényi graph"],
+    [],
+    "강화학습",  # list가 아니면 건드리지 않음
+    None,
+])
+def test_english_keywords_are_left_alone(keywords):
+    assert not needs_translation(keywords)
+
+@pytest.mark.parametrize("keywords", [
+    ["world model", "강화학습"],
+    ["扩散模型"],
+    ["拡散モデル", "トランスフォーマー"],
+    ["обучение с подкреплением"],
+    ["diffusion", 3, "ㅋ"],
+])
+def test_non_latin_keywords_need_translation(keywords):
+    assert needs_translation(keywords)
@@ -0,0 +1,247 @@
+import itertools
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from dailypaper import zotero
+
+USER = "1"
+
+class FakeZotero:
+    """Zotero Web API 중 bulk sync가 쓰는 부분만 흉내 내는 localhost 서버 상태."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seq = itertools.count(1)
+        self.version = 1
+        self.collections = {}
+        self.items = {}
+        self.item_batches = []
+        self.uploads = []
+        self.deleted = []
+        self.pdf_gets = 0
+        self.reject_titles = set()  # POST /items에서 failed로 돌려줄 title
+        self.fail_upload = set()  # upload auth에서 500을 돌려줄 filename
+
+    def new_key(self) -> str:
+        return f"K{next(self.seq):07d}"
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, code, obj=None, headers=None):
+        body = b"" if obj is None else json.dumps(obj).encode()
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.send_header("Last-Modified-Version", str(self.server.z.version))
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        z = self.server.z
+        u = urlparse(self.path)
+        q = parse_qs(u.query)
+        start, limit = int(q.get("start", ["0"])[0]), int(q.get("limit", ["25"])[0])
+
+        if u.path.startswith("/pdf/"):
+            with z.lock:
+                z.pdf_gets += 1
+            body = b"%PDF-" + u.path.encode() * 100
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        if u.path == f"/users/{USER}/collections":
+            since = self.headers.get("If-Modified-Since-Version")
+            if since and int(since) >= z.version:
+                return self._reply(304)
+            rows = [
+                {"key": k, "data": {"key": k, "name": c["name"], "parentCollection": c["parent"]}}
+                for k, c in z.collections.items()
+            ]
+            return self._reply(200, rows[start:start + limit], {"Total-Results": len(rows)})
+
+        m = re.match(rf"/users/{USER}/collections/(\w+)/items/top$", u.path)
+        if m:
+            rows = [
+                {"key": k, "data": d}
+                for k, d in z.items.items()
+                if m.group(1) in d.get("collections", []) and d["itemType"] != "attachment"
+            ]
+            return self._reply(200, rows[start:start + limit], {"Total-Results": len(rows)})
+        self._reply(404, {})
+
+    def do_POST(self):
+        z = self.server.z
+        path = urlparse(self.path).path
+        body = self._body()
+
+        if path == "/upload":
+            z.uploads.append(body)
+            return self._reply(201)
+
+        if path == f"/users/{USER}/collections":
+            out = {}
+            with z.lock:
+                for i, o in enumerate(json.loads(body)):
+                    key = z.new_key()
+                    z.collections[key] = {"name": o["name"], "parent": o["parentCollection"]}
+                    out[str(i)] = {"key": key}
+                z.version += 1
+            return self._reply(200, {"successful": out, "failed": {}})
+
+        if path == f"/users/{USER}/items":
+            objs = json.loads(body)
+            if len(objs) > 50:
+                return self._reply(413, {})
+            ok, failed = {}, {}
+            with z.lock:
+                z.item_batches.append(len(objs))
+                for i, o in enumerate(objs):
+                    if o.get("title") in z.reject_titles:
+                        failed[str(i)] = {"code": 400, "message": "rejected"}
+                        continue
+                    key = z.new_key()
+                    z.items[key] = o
+                    ok[str(i)] = {"key": key}
+            return self._reply(200, {"successful": ok, "failed": failed})
+
+        m = re.match(rf"/users/{USER}/items/(\w+)/file$", path)
+        if m:
+            form = parse_qs(body.decode())
+            if "upload" in form:
+                return self._reply(204)
+            if form.get("filename", [""])[0] in z.fail_upload:
+                return self._reply(500, {})
+            port = self.server.server_port
+            return self._reply(200, {
+                "url": f"http://127.0.0.1:{port}/upload", "uploadKey": "u",
+                "prefix": "PRE", "suffix": "SUF", "contentType": "application/pdf",
+            })
+        self._reply(404, {})
+
+    def do_DELETE(self):
+        z = self.server.z
+        key = urlparse(self.path).path.rsplit("/", 1)[1]
+        with z.lock:
+            z.deleted.append(key)
+            z.items.pop(key, None)
+        self._reply(204)
+
+@pytest.fixture
+def fake(tmp_paths, monkeypatch):
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.z = FakeZotero()
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    base = f"http://127.0.0.1:{srv.server_port}"
+    monkeypatch.setattr(zotero, "ZOTERO_API_BASE", base)
+    monkeypatch.setattr(zotero, "ZOTERO_API_KEY", "key")
+    monkeypatch.setattr(zotero, "ZOTERO_USER_ID", USER)
+    monkeypatch.setattr(zotero, "_COLL_CACHE", {})
+    srv.z.base = base
+    yield srv.z
+    srv.shutdown()
+    srv.server_close()
+
+def _cards(z, n, start=0, date="2026-02-01"):
+    return [
+        {
+            "date": date, "pid": f"2602.{i:05d}", "title": f"Paper {i}", "url": f"{z.base}/pdf/{i}.pdf",
+            "labels": ["LLM"], "card": {"one_liner": f"one {i}"}, "raw_summary": "s",
+        }
+        for i in range(start, start + n)
+    ]
+
+def _papers(z):
+    return {d["archiveID"]: k for k, d in z.items.items() if d["itemType"] != "attachment"}
+
+def _attachments(z):
+    return [d for d in z.items.values() if d["itemType"] == "attachment"]
+
+def test_bulk_batches_by_50_and_skips_on_rerun(fake):
+    res = zotero.bulk_add_to_zotero(_cards(fake, 70), "2026-02-01", workers=4)
+    assert (res["created"], res["skipped"], res["failed"]) == (70, 0, {})
+    # parent 50+20, attachment 50+20
+    assert fake.item_batches == [50, 20, 50, 20]
+    assert len(fake.uploads) == 70
+    assert all(b.startswith(b"PRE%PDF-") and b.endswith(b"SUF") for b in fake.uploads)
+
+    # 이미 날짜 collection에 있는 70편은 건너뛰고 새 30편만
+    fake.item_batches.clear()
+    res = zotero.bulk_add_to_zotero(_cards(fake, 100), "2026-02-01", workers=4)
+    assert (res["created"], res["skipped"], res["failed"]) == (30, 70, {})
+    assert fake.item_batches == [30, 30]
+    assert len(_papers(fake)) == 100
+
+    # 같은 collection은 한 번만 만들어짐 (DailyPaperFavorite, 2026-02-01)
+    assert sorted(c["name"] for c in fake.collections.values()) == ["2026-02-01", "DailyPaperFavorite"]
+
+def test_created_keys_stay_aligned_when_items_fail(fake):
+    cards = _cards(fake, 5)
+    fake.reject_titles.add("Paper 1")
+    res = zotero.bulk_add_to_zotero(cards, "2026-02-01")
+    assert res["failed"] == {"2602.00001": "parent create failed"}
+    assert res["created"] == 4
+
+    # attachment마다 자기 논문 parent에 붙었는지 (filename == parent title)
+    for att in _attachments(fake):
+        parent = fake.items[att["parentItem"]]
+        assert att["filename"] == parent["title"] + ".pdf"
+    assert "arXiv:2602.00001" not in _papers(fake)
+
+def test_rollback_on_pdf_failure(fake):
+    cards = _cards(fake, 3)
+    cards[1]["url"] = f"{fake.base}/missing/1.pdf"
+    res = zotero.bulk_add_to_zotero(cards, "2026-02-01")
+    assert list(res["failed"]) == ["2602.00001"]
+    assert res["failed"]["2602.00001"].startswith("pdf:")
+    assert "arXiv:2602.00001" not in _papers(fake)
+    assert len(fake.deleted) == 1
+    assert len(_attachments(fake)) == 2
+
+def test_rollback_on_upload_failure_and_retry(fake):
+    cards = _cards(fake, 3)
+    fake.fail_upload.add("Paper 2.pdf")
+    res = zotero.bulk_add_to_zotero(cards, "2026-02-01")
+    assert list(res["failed"]) == ["2602.00002"]
+    assert res["failed"]["2602.00002"].startswith("upload:")
+    # attachment, parent 둘 다 지워져서 남은 건 성공한 2편뿐
+    assert len(fake.deleted) == 2
+    assert sorted(_papers(fake)) == ["arXiv:2602.00000", "arXiv:2602.00001"]
+    assert len(_attachments(fake)) == 2
+
+    # 다시 돌리면 실패했던 논문만 새로 만들어지고, PDF는 캐시에서
+    fake.fail_upload.clear()
+    pdf_gets = fake.pdf_gets
+    res = zotero.bulk_add_to_zotero(cards, "2026-02-01")
+    assert (res["created"], res["skipped"], res["failed"]) == (1, 2, {})
+    assert fake.pdf_gets == pdf_gets
+    assert len(_papers(fake)) == 3
+
+def test_sync_to_zotero_uses_db_cards(fake, monkeypatch):
+    seen = []
+
+    def load(date, label=None):
+        seen.append((date, label))
+        return _cards(fake, 2, date=date)
+
+    monkeypatch.setattr(zotero, "load_card_dicts", load)
+    res = zotero.sync_to_zotero("2026-02-02", label="LLM")
+    assert seen == [("2026-02-02", "LLM")]
+    assert res["created"] == 2
+    assert "2026-02-02" in [c["name"] for c in fake.collections.values()]